@@ -0,0 +1,318 @@
+"""AI analysis of a completed PHQ-9, independent of the UI.
+
+AnalysisService ties together the analysis cache, a model backend (the
+shared Gemini model registry by default, see analysis_backends.py), the retry
+policy and the circuit breaker behind one analyze() call.
+Concurrent requests for the same cache key are coalesced into one model call
+(see singleflight.py), so a group submitting identical answers at once costs
+one generate_content call rather than one each. Calls that do reach the
+model first pass token-bucket admission (see ratelimit.py) so bursts queue
+briefly, or fall back, instead of running into provider rate limits. With
+PHQ9_AI_BATCH_SIZE above 1, distinct requests arriving together are
+micro-batched into multi-prompt calls (BatchedBackend), each admitted once.
+Prompts are rendered from the versioned templates in prompts.py.
+It makes no Streamlit calls, so the app's background workers and the HTTP
+API use the same code path. Problems are reported as a warning string next
+to the fallback analysis rather than raised.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from analysis_backends import AnalysisBackend, BatchedBackend, LocalBackend, ModelUnavailableError, StubBackend
+from analysis_cache import AnalysisCache, make_cache_key
+from content import get_fallback_analysis
+from gemini_client import DEFAULT_MODEL_NAME, GeminiRegistry
+from prompts import PromptTemplate, get_prompt_template, prompt_from_env, token_budget_from_env
+from resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, call_with_retries, is_retryable
+from ratelimit import AdmissionController, AdmissionRejectedError, SQLiteTokenBucket, TokenBucket
+from shared_state import backend_from_env
+from singleflight import SingleFlight
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+def cache_from_env() -> AnalysisCache:
+    """Analysis cache configured from PHQ9_CACHE_* environment variables.
+
+    With PHQ9_SHARED_STATE set, the shared tier comes from that backend so
+    every worker sees every cached analysis.
+    """
+    ttl = float(os.getenv('PHQ9_CACHE_TTL_SECONDS') or 0) or None
+    disk_max_entries = int(os.getenv('PHQ9_CACHE_DISK_MAX_ENTRIES', '100000'))
+    backend = backend_from_env()
+    return AnalysisCache(
+        memory_size=int(os.getenv('PHQ9_CACHE_MEMORY_SIZE', '512')),
+        disk_path=os.getenv('PHQ9_CACHE_PATH') or None,
+        disk_max_entries=disk_max_entries,
+        ttl=ttl,
+        shared_tier=backend.cache_tier(disk_max_entries, ttl) if backend else None
+    )
+
+
+def breaker_from_env() -> CircuitBreaker:
+    """Circuit breaker configured from PHQ9_BREAKER_* environment variables"""
+    return CircuitBreaker(
+        failure_threshold=int(os.getenv('PHQ9_BREAKER_FAILURES', '5')),
+        reset_timeout=float(os.getenv('PHQ9_BREAKER_COOLDOWN_SECONDS', '30'))
+    )
+
+
+def retry_policy_from_env() -> RetryPolicy:
+    """Deadline and retry settings for a single AI analysis"""
+    return RetryPolicy(
+        max_attempts=int(os.getenv('PHQ9_AI_MAX_ATTEMPTS', '3')),
+        attempt_timeout=float(os.getenv('PHQ9_AI_TIMEOUT_SECONDS', '20')),
+        deadline=float(os.getenv('PHQ9_AI_DEADLINE_SECONDS', '45'))
+    )
+
+
+def admission_from_env() -> Optional[AdmissionController]:
+    """Token-bucket admission configured from PHQ9_AI_RATE_* variables; None when disabled (the default)"""
+    # Off unless a deployment opts in with its provider quota
+    rate = float(os.getenv('PHQ9_AI_RATE_PER_SECOND', '0'))
+    if rate <= 0:
+        return None
+    burst = float(os.getenv('PHQ9_AI_RATE_BURST', '5'))
+    backend = backend_from_env()
+    shared_path = os.getenv('PHQ9_AI_RATE_LIMIT_PATH')
+    if backend is not None:
+        bucket = backend.token_bucket(rate, burst)
+    elif shared_path:
+        bucket = SQLiteTokenBucket(shared_path, rate, burst)
+    else:
+        bucket = TokenBucket(rate, burst)
+    session_rate = float(os.getenv('PHQ9_AI_SESSION_RATE_PER_MINUTE', '0')) / 60
+    return AdmissionController(
+        bucket,
+        max_wait=float(os.getenv('PHQ9_AI_RATE_MAX_WAIT_MS', '2000')) / 1000,
+        session_rate=session_rate or None,
+        session_burst=float(os.getenv('PHQ9_AI_SESSION_RATE_BURST', '3')),
+        share_sessions=backend is not None
+    )
+
+
+def analysis_backend_from_env(key_provider: Callable[[], Optional[str]],
+                              model_name: Optional[str] = None) -> AnalysisBackend:
+    """Model backend selected by PHQ9_ANALYSIS_BACKEND: gemini (default), local or stub"""
+    kind = os.getenv('PHQ9_ANALYSIS_BACKEND', 'gemini')
+    if kind == 'gemini':
+        model_name = model_name or os.getenv('GEMINI_MODEL') or DEFAULT_MODEL_NAME
+        return GeminiRegistry(key_provider, model_name, api_endpoint=os.getenv('GEMINI_API_ENDPOINT') or None)
+    if kind == 'local':
+        return LocalBackend.from_env()
+    if kind == 'stub':
+        return StubBackend(latency=float(os.getenv('PHQ9_STUB_LATENCY_SECONDS', '0')))
+    raise ValueError(f"Unknown analysis backend: {kind!r}")
+
+
+def build_analysis_prompt(responses: Dict, total_score: int, language: str) -> str:
+    """Prompt sent to the model for one assessment, from the default template"""
+    return get_prompt_template().render(responses, total_score, language)
+
+
+class AnalysisStream:
+    """Chunks of a streamed analysis, written by a worker and read by the script thread"""
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._finished = False
+        self._condition = threading.Condition()
+
+    def append(self, chunk: str):
+        with self._condition:
+            self._chunks.append(chunk)
+            self._condition.notify_all()
+
+    def finish(self):
+        with self._condition:
+            self._finished = True
+            self._condition.notify_all()
+
+    def text(self) -> str:
+        with self._condition:
+            return ''.join(self._chunks)
+
+    def iter_text(self, timeout: float):
+        """Yield the accumulated text each time new chunks arrive, until finished or timed out"""
+        deadline = time.monotonic() + timeout
+        seen = 0
+        while True:
+            with self._condition:
+                while len(self._chunks) == seen and not self._finished:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    self._condition.wait(remaining)
+                if len(self._chunks) == seen:
+                    return
+                seen = len(self._chunks)
+                text = ''.join(self._chunks)
+            yield text
+
+
+class AnalysisService:
+    """Everything needed to turn an assessment into an AI analysis"""
+
+    def __init__(self, cache: AnalysisCache, registry: AnalysisBackend, breaker: CircuitBreaker,
+                 retry_policy: Callable[[], RetryPolicy] = retry_policy_from_env,
+                 admission: Optional[AdmissionController] = None,
+                 prompt: Optional[PromptTemplate] = None, token_budget: Optional[int] = None):
+        self.cache = cache
+        self.registry = registry
+        self.breaker = breaker
+        self.retry_policy = retry_policy
+        self.admission = admission
+        self.prompt = prompt or get_prompt_template()
+        self.token_budget = token_budget
+        self.flights = SingleFlight()
+
+    @classmethod
+    def from_env(cls, key_provider: Callable[[], Optional[str]],
+                 model_name: Optional[str] = None) -> 'AnalysisService':
+        """Build a service from environment configuration"""
+        registry = analysis_backend_from_env(key_provider, model_name)
+        # Token-bucket admission guards the provider's quota; local and stub backends have none
+        admission = admission_from_env() if registry.name == 'gemini' else None
+        # The local backend batches its forward passes itself
+        if int(os.getenv('PHQ9_AI_BATCH_SIZE', '1')) > 1 and registry.name != 'local':
+            registry = BatchedBackend.from_env(registry, admission)
+        return cls(cache_from_env(), registry, breaker_from_env(),
+                   admission=admission, prompt=prompt_from_env(),
+                   token_budget=token_budget_from_env())
+
+    def backend_stats(self) -> Dict:
+        """Which backend and model serve analyses, with micro-batching counters when it batches"""
+        batcher = getattr(self.registry, 'batcher', None)
+        return {
+            'name': self.registry.name,
+            'model_name': self.registry.model_name,
+            'batching': batcher.stats() if batcher is not None else None,
+        }
+
+    def cache_key(self, responses: Dict, language: str) -> str:
+        # The template identity includes a hash of its text, so editing a prompt invalidates its entries
+        return make_cache_key(responses, language, self.registry.model_name, self.prompt.identity)
+
+    def analyze(self, responses: Dict, total_score: int, language: str,
+                stream: Optional[AnalysisStream] = None,
+                session_id: Optional[str] = None) -> Tuple[str, Optional[str]]:
+        """Produce the AI analysis and an optional warning for the user.
+
+        When a stream is given, the model is called in streaming mode and each
+        chunk is appended to it as it arrives. session_id selects the
+        per-session rate limit, if one is configured.
+        """
+        try:
+            with tracer.span('ai_analysis'):
+                return self._analyze(responses, total_score, language, stream, session_id)
+        finally:
+            if stream is not None:
+                stream.finish()
+
+    def _analyze(self, responses: Dict, total_score: int, language: str,
+                 stream: Optional[AnalysisStream], session_id: Optional[str]) -> Tuple[str, Optional[str]]:
+        # Identical answers in the same language always produce the same prompt
+        cache_key = self.cache_key(responses, language)
+        cached = self.cache.get(cache_key)
+        tracer.count('analysis_cache_lookups', result='miss' if cached is None else 'hit')
+        if cached is not None:
+            return cached, None
+
+        # Only the leader streams from the model; waiters receive the finished result
+        result, _ = self.flights.do(
+            cache_key, lambda: self._generate(cache_key, responses, total_score, language, stream, session_id)
+        )
+        return result
+
+    def _generate(self, cache_key: str, responses: Dict, total_score: int, language: str,
+                  stream: Optional[AnalysisStream], session_id: Optional[str]) -> Tuple[str, Optional[str]]:
+        # A call that finished just before this one became leader may have filled the cache.
+        # _analyze already counted this lookup as a miss, so the re-check is not counted again
+        cached = self.cache.get(cache_key, record=False)
+        if cached is not None:
+            return cached, None
+
+        try:
+            # Reuse the shared model; the Gemini SDK (or local runtime) is imported and configured on first use
+            try:
+                model = self.registry.get_model()
+            except ModelUnavailableError as e:
+                return get_fallback_analysis(total_score, language), str(e)
+
+            # Wait briefly for a provider quota token, or fall back straight away. A batching
+            # backend takes the token once per batch, so only the session's own limit applies here
+            batched = isinstance(self.registry, BatchedBackend) and self.registry.admission is not None
+            if self.admission is not None and not self.admission.admit(session_id, global_quota=not batched):
+                return get_fallback_analysis(total_score, language), "⚠️ AI analysis is busy right now. Using fallback analysis."
+
+            try:
+                prompt = self.prompt.render(responses, total_score, language)
+                tracer.observe('prompt_chars', len(prompt))
+                if self.token_budget is not None or tracer.enabled:
+                    prompt_tokens = self.prompt.estimate_tokens(responses, language)
+                    tracer.observe('prompt_tokens_estimate', prompt_tokens, version=self.prompt.version)
+                    if self.token_budget is not None and prompt_tokens > self.token_budget:
+                        tracer.count('prompt_over_budget', version=self.prompt.version)
+                        logger.warning("Prompt v%s for %s is ~%d tokens, over the budget of %d",
+                                       self.prompt.version, language, prompt_tokens, self.token_budget)
+
+                # Generate response with a deadline, retries and the circuit breaker
+                def generate(timeout: float) -> str:
+                    request_options = {'timeout': timeout}
+                    mode = 'unary' if stream is None else 'stream'
+                    started = time.perf_counter()
+                    outcome = 'error'
+                    try:
+                        if stream is not None:
+                            # Only a fully received stream is cached; a broken one falls back
+                            for chunk in model.generate_content(prompt, stream=True, request_options=request_options):
+                                if not stream.text():
+                                    tracer.observe('gemini_first_chunk_seconds', time.perf_counter() - started)
+                                stream.append(chunk.text)
+                            text = stream.text().strip()
+                        else:
+                            response = model.generate_content(prompt, request_options=request_options)
+                            text = response.text.strip() if response and response.text else ''
+                        outcome = 'ok'
+                        return text
+                    finally:
+                        tracer.observe('gemini_latency_seconds', time.perf_counter() - started,
+                                       mode=mode, outcome=outcome)
+
+                def retryable(error: BaseException) -> bool:
+                    # Streamed text is already on screen, so a stream that broke midway is not retried
+                    return is_retryable(error) and (stream is None or not stream.text())
+
+                def admit_retry():
+                    # A retry is another upstream call, so it takes a global token like the first attempt
+                    if not self.admission.admit():
+                        raise AdmissionRejectedError("No provider quota left for a retry")
+
+                try:
+                    policy = self.retry_policy()
+                    before_retry = admit_retry if self.admission is not None and not batched else None
+                    analysis = self.breaker.call(lambda: call_with_retries(generate, policy, retryable,
+                                                                           before_retry=before_retry))
+                    if analysis:
+                        tracer.observe('response_chars', len(analysis))
+                        self.cache.set(cache_key, analysis)
+                        return analysis, None
+                except AdmissionRejectedError:
+                    return get_fallback_analysis(total_score, language), "⚠️ AI analysis is busy right now. Using fallback analysis."
+                except CircuitOpenError:
+                    return get_fallback_analysis(total_score, language), "⚠️ AI analysis is temporarily unavailable. Using fallback analysis."
+                except Exception as e:
+                    return get_fallback_analysis(total_score, language), "⚠️ AI analysis failed. Using fallback analysis."
+
+            except Exception as e:
+                return get_fallback_analysis(total_score, language), "⚠️ Could not initialize AI model. Using fallback analysis."
+
+        except Exception as e:
+            return get_fallback_analysis(total_score, language), "⚠️ AI analysis encountered an error. Using fallback analysis."
+
+        # Final fallback if we somehow get here
+        return get_fallback_analysis(total_score, language), None
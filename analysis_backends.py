@@ -0,0 +1,320 @@
+"""Pluggable model backends for the AI analysis.
+
+AnalysisService needs two things from a backend: ``model_name``, which is part
+of every cache key, and ``get_model()``, which returns an object with the
+Gemini SDK's ``generate_content(prompt, stream=False, request_options=None)``
+shape (a response, or an iterable of chunks when streaming, with ``.text``).
+PHQ9_ANALYSIS_BACKEND selects one:
+- gemini (default): GeminiRegistry in gemini_client.py
+- local: LocalBackend, a small causal language model run on CPU inside this
+  process, for air-gapped deployments and cost control. Needs ``torch`` and
+  ``transformers``, imported on first use, and a model directory (or hub id)
+  in PHQ9_LOCAL_MODEL. Linear layers are quantized to int8, and concurrent
+  prompts are micro-batched (see batching.py) into one generate() call, so a
+  burst of finished assessments shares each forward pass.
+- stub: StubBackend, deterministic canned text with optional latency, for
+  tests, dry runs and benchmarks
+
+BatchedBackend wraps a remote backend so concurrent requests share provider
+calls: prompts collected within a short window are sent as one structured
+prompt that asks for a JSON array of {"id", "answer"} objects, and each
+answer is fanned back to the caller whose request id it echoes - never by
+position, so a reordered reply cannot hand one person another's analysis. A
+batch takes one admission token, so the same quota serves several analyses.
+Answers that are missing, or whose id is unknown or repeated, are requested
+again one by one.
+"""
+
+import abc
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from batching import MicroBatcher
+from ratelimit import AdmissionController, AdmissionRejectedError
+from tracing import tracer
+
+BATCH_INSTRUCTIONS = (
+    "Below are {count} independent requests, each between <request id=\"N\"> and </request> tags. "
+    "Answer every request exactly as if it were the only one, following its own instructions and language. "
+    "Reply with only a JSON array of {count} objects, one per request, each of the form "
+    "{{\"id\": N, \"answer\": \"...\"}} where N is the request's id and answer is the complete answer to it."
+)
+
+
+class ModelUnavailableError(Exception):
+    """Raised when a backend cannot provide a usable model"""
+
+
+class AnalysisBackend(abc.ABC):
+    """Interface for analysis backends"""
+
+    name = 'backend'
+    model_name = 'unknown'
+
+    @abc.abstractmethod
+    def get_model(self):
+        """A model with generate_content(); raises ModelUnavailableError when there is none"""
+
+
+class ModelResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _StubModel:
+    def __init__(self, name: str, latency: float):
+        self.name = name
+        self.latency = latency
+
+    def generate_content(self, prompt: str, stream: bool = False, request_options=None):
+        if self.latency:
+            time.sleep(self.latency)
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]
+        response = ModelResponse(f"[stub analysis from {self.name} for prompt {digest} of {len(prompt)} characters]")
+        return [response] if stream else response
+
+
+class StubBackend(AnalysisBackend):
+    """Answers every prompt with text derived only from the prompt; no model, no network"""
+
+    name = 'stub'
+
+    def __init__(self, model_name: str = 'stub', latency: float = 0.0):
+        # Stub text is keyed under its own model name so it cannot be served as a real analysis
+        self.model_name = model_name
+        self.latency = latency
+
+    def get_model(self) -> _StubModel:
+        return _StubModel(self.model_name, self.latency)
+
+
+class _LocalModel:
+    def __init__(self, backend: 'LocalBackend'):
+        self.backend = backend
+
+    def generate_content(self, prompt: str, stream: bool = False, request_options=None):
+        timeout = (request_options or {}).get('timeout')
+        future = self.backend.batcher.submit(prompt)
+        try:
+            text = future.result(timeout)
+        except TimeoutError:
+            # Still queued: drop it from its batch rather than generate text nobody reads
+            future.cancel()
+            raise
+        response = ModelResponse(text)
+        return [response] if stream else response
+
+
+class LocalBackend(AnalysisBackend):
+    """A causal LM on CPU through transformers, with int8 weights and micro-batched generation"""
+
+    name = 'local'
+
+    def __init__(self, model_path: str, max_batch: int = 8, window: float = 0.025,
+                 max_new_tokens: int = 256, threads: Optional[int] = None, quantize: bool = True):
+        self.model_path = model_path
+        # Keyed by the model's directory name, so hosts with different mount points share cache entries
+        self.model_name = 'local:' + (os.path.basename(model_path.rstrip('/\\')) or model_path)
+        self.max_new_tokens = max_new_tokens
+        self.threads = threads
+        self.quantize = quantize
+        self.batcher = MicroBatcher(self.generate_batch, max_batch=max_batch, window=window, name='local')
+        self._runtime = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'LocalBackend':
+        """Local backend configured from PHQ9_LOCAL_* environment variables"""
+        model_path = os.getenv('PHQ9_LOCAL_MODEL')
+        if not model_path:
+            raise ValueError("PHQ9_ANALYSIS_BACKEND=local needs PHQ9_LOCAL_MODEL (a model directory or hub id)")
+        threads = int(os.getenv('PHQ9_LOCAL_THREADS', '0'))
+        return cls(
+            model_path,
+            max_batch=int(os.getenv('PHQ9_LOCAL_MAX_BATCH', '8')),
+            window=float(os.getenv('PHQ9_LOCAL_BATCH_WINDOW_MS', '25')) / 1000,
+            max_new_tokens=int(os.getenv('PHQ9_LOCAL_MAX_NEW_TOKENS', '256')),
+            threads=threads or None,
+            quantize=os.getenv('PHQ9_LOCAL_QUANTIZE', '1') == '1',
+        )
+
+    def _load(self):
+        if self._runtime is not None:
+            return self._runtime
+        with self._lock:
+            if self._runtime is None:
+                try:
+                    import torch
+                    from transformers import AutoModelForCausalLM, AutoTokenizer
+                except ImportError as e:
+                    raise ModelUnavailableError(
+                        "⚠️ Local model runtime not installed (needs torch and transformers). Running in fallback mode."
+                    ) from e
+                try:
+                    if self.threads:
+                        torch.set_num_threads(self.threads)
+                    tokenizer = AutoTokenizer.from_pretrained(self.model_path)
+                    # Left padding keeps every prompt's last token at the end of its row
+                    tokenizer.padding_side = 'left'
+                    if tokenizer.pad_token is None:
+                        tokenizer.pad_token = tokenizer.eos_token
+                    # int8 dynamic quantization works from float32 weights, whatever the checkpoint stores
+                    model = AutoModelForCausalLM.from_pretrained(self.model_path).float()
+                    model.eval()
+                    if self.quantize:
+                        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                except Exception as e:
+                    raise ModelUnavailableError("⚠️ Could not load the local model. Using fallback analysis.") from e
+                self._runtime = (torch, tokenizer, model)
+        return self._runtime
+
+    def get_model(self) -> _LocalModel:
+        """Load the model on first use; raises ModelUnavailableError when it cannot be"""
+        self._load()
+        return _LocalModel(self)
+
+    def _chat(self, tokenizer, prompt: str) -> str:
+        if getattr(tokenizer, 'chat_template', None):
+            return tokenizer.apply_chat_template([{'role': 'user', 'content': prompt}],
+                                                 tokenize=False, add_generation_prompt=True)
+        return prompt
+
+    def generate_batch(self, prompts: List[str]) -> List[str]:
+        """Greedy completions for several prompts in one padded generate() call"""
+        torch, tokenizer, model = self._load()
+        inputs = tokenizer([self._chat(tokenizer, prompt) for prompt in prompts],
+                           return_tensors='pt', padding=True)
+        with torch.inference_mode():
+            output = model.generate(**inputs, max_new_tokens=self.max_new_tokens, do_sample=False,
+                                    pad_token_id=tokenizer.pad_token_id)
+        completions = tokenizer.batch_decode(output[:, inputs['input_ids'].shape[1]:], skip_special_tokens=True)
+        return [text.strip() for text in completions]
+
+
+def combine_prompts(prompts: Sequence[str]) -> str:
+    """One prompt asking for a JSON array with an answer to each of several prompts"""
+    parts = [BATCH_INSTRUCTIONS.format(count=len(prompts))]
+    parts.extend(f'<request id="{i}">\n{prompt}\n</request>' for i, prompt in enumerate(prompts, 1))
+    return '\n\n'.join(parts)
+
+
+def parse_batch_response(text: str, count: int) -> List[Optional[str]]:
+    """Answers from a reply to combine_prompts(), in request order.
+
+    Each answer is placed by the id it echoes, never by its position. None
+    marks a request whose answer is missing or empty, or whose id appears
+    more than once, so it can be asked again on its own.
+    """
+    # Models sometimes wrap the array in a code fence or a sentence
+    start, end = text.find('['), text.rfind(']')
+    entries = []
+    if 0 <= start < end:
+        try:
+            entries = json.loads(text[start:end + 1])
+        except ValueError:
+            entries = []
+    if not isinstance(entries, list):
+        entries = []
+    answers: List[Optional[str]] = [None] * count
+    seen = set()
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        request_id, answer = entry.get('id'), entry.get('answer')
+        if isinstance(request_id, str) and request_id.strip().isdigit():
+            request_id = int(request_id)
+        if isinstance(request_id, bool) or not isinstance(request_id, int) or not 1 <= request_id <= count:
+            continue
+        if request_id in seen:
+            # Two answers claim the same request: trust neither
+            answers[request_id - 1] = None
+            continue
+        seen.add(request_id)
+        answers[request_id - 1] = answer.strip() if isinstance(answer, str) and answer.strip() else None
+    return answers
+
+
+def _response_text(response) -> str:
+    return response.text.strip() if response and response.text else ''
+
+
+class _BatchedModel:
+    def __init__(self, backend: 'BatchedBackend'):
+        self.backend = backend
+
+    def generate_content(self, prompt: str, stream: bool = False, request_options=None):
+        timeout = (request_options or {}).get('timeout')
+        future = self.backend.batcher.submit((prompt, timeout))
+        try:
+            text = future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+        # Batched replies arrive whole, so a streaming caller gets them as a single chunk
+        response = ModelResponse(text)
+        return [response] if stream else response
+
+
+class BatchedBackend(AnalysisBackend):
+    """Micro-batches another backend's calls into multi-prompt requests"""
+
+    def __init__(self, inner: AnalysisBackend, max_batch: int = 4, window: float = 0.05, concurrency: int = 8,
+                 admission: Optional[AdmissionController] = None, json_mode: bool = False):
+        self.inner = inner
+        self.name = inner.name
+        # Same template, same model: batched answers share cache entries with single ones
+        self.model_name = inner.model_name
+        self.admission = admission
+        # Ask the API for a JSON reply (response_mime_type); not every model supports it
+        self.json_mode = json_mode
+        self.batcher = MicroBatcher(self.generate_batch, max_batch=max_batch, window=window,
+                                    name=f'{inner.name}_batch', concurrency=concurrency)
+
+    @classmethod
+    def from_env(cls, inner: AnalysisBackend, admission: Optional[AdmissionController]) -> 'BatchedBackend':
+        """Batching configured from PHQ9_AI_BATCH_* environment variables"""
+        return cls(
+            inner,
+            max_batch=int(os.getenv('PHQ9_AI_BATCH_SIZE', '4')),
+            window=float(os.getenv('PHQ9_AI_BATCH_WINDOW_MS', '50')) / 1000,
+            concurrency=int(os.getenv('PHQ9_AI_BATCH_CONCURRENCY', '8')),
+            admission=admission,
+            json_mode=os.getenv('PHQ9_AI_BATCH_JSON_MODE', '0') == '1',
+        )
+
+    def get_model(self) -> _BatchedModel:
+        # Surface a missing key or SDK to the caller now rather than from inside a batch
+        self.inner.get_model()
+        return _BatchedModel(self)
+
+    def _admit(self):
+        if self.admission is not None and not self.admission.admit():
+            raise AdmissionRejectedError("No provider quota for this batch")
+
+    def generate_batch(self, items: List[Tuple[str, Optional[float]]]) -> List:
+        """Answers for (prompt, timeout) items, from one provider call where possible"""
+        prompts = [prompt for prompt, _ in items]
+        timeouts = [timeout for _, timeout in items if timeout]
+        options = {'timeout': max(timeouts)} if timeouts else None
+        self._admit()
+        model = self.inner.get_model()
+        if len(prompts) == 1:
+            return [_response_text(model.generate_content(prompts[0], request_options=options))]
+
+        extra = {'generation_config': {'response_mime_type': 'application/json'}} if self.json_mode else {}
+        reply = model.generate_content(combine_prompts(prompts), request_options=options, **extra)
+        answers: List = parse_batch_response(_response_text(reply), len(prompts))
+        missing = [i for i, answer in enumerate(answers) if answer is None]
+        tracer.count('batch_answers', len(prompts) - len(missing), outcome='batched')
+        for i in missing:
+            try:
+                self._admit()
+                answers[i] = _response_text(model.generate_content(prompts[i], request_options=options))
+                tracer.count('batch_answers', outcome='retried_alone')
+            except Exception as e:
+                answers[i] = e
+        return answers
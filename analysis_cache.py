@@ -0,0 +1,218 @@
+"""Content-addressed cache for AI analysis results.
+
+Analyses are keyed on everything that shapes the prompt (the response vector,
+language, model name and prompt version), so a rerun of the results page or a
+second user with identical answers is served without calling the model again.
+
+The cache has two tiers:
+- an in-process LRU, always on
+- an optional shared tier: a SQLite file shared by every session on the
+  host, with TTL and size-based eviction, or a Redis-compatible server shared
+  by every worker that points at it (see shared_state.py)
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def make_cache_key(responses: Dict[int, int], language: str, model_name: str, prompt_version: str) -> str:
+    """Build a stable key for an analysis request"""
+    payload = json.dumps(
+        {
+            'responses': [[int(i), int(score)] for i, score in sorted(responses.items())],
+            'language': language,
+            'model': model_name,
+            'prompt_version': str(prompt_version),
+        },
+        separators=(',', ':'),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class MemoryTier:
+    """Thread-safe LRU with an optional TTL"""
+
+    def __init__(self, max_entries: int = 512, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteTier:
+    """On-disk tier backed by a single SQLite file.
+
+    Entries older than ``ttl`` seconds are ignored and removed on read. Once the
+    table grows past ``max_entries`` the least recently used rows are deleted.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100_000, ttl: Optional[float] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS analysis_cache ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' created_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_analysis_cache_accessed ON analysis_cache (accessed_at)')
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, created_at FROM analysis_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                self._conn.execute('DELETE FROM analysis_cache WHERE key = ?', (key,))
+                return None
+            self._conn.execute('UPDATE analysis_cache SET accessed_at = ? WHERE key = ?', (now, key))
+            return value
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO analysis_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, value, now, now),
+            )
+            count = self._conn.execute('SELECT COUNT(*) FROM analysis_cache').fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    'DELETE FROM analysis_cache WHERE key IN ('
+                    ' SELECT key FROM analysis_cache ORDER BY accessed_at LIMIT ?)',
+                    (overflow,),
+                )
+                self.evictions += overflow
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM analysis_cache').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RedisTier:
+    """Tier in a Redis-compatible server, shared by every worker using it.
+
+    Entries expire through the server after ``ttl`` seconds; the size bound is
+    the server's own maxmemory policy. ``client`` is a redis-py client created
+    with decode_responses=True.
+    """
+
+    def __init__(self, client, prefix: str = 'phq9:analysis:', ttl: Optional[float] = None):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: str):
+        self.client.set(self.prefix + key, value, px=int(self.ttl * 1000) if self.ttl else None)
+
+    def __len__(self) -> int:
+        # SCAN walks the keyspace, so this is for the admin panel rather than hot paths
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + '*', count=1000))
+
+    def close(self):
+        pass
+
+
+class AnalysisCache:
+    """Two-tier analysis cache with hit/miss counters"""
+
+    def __init__(self, memory_size: int = 512, disk_path: Optional[str] = None,
+                 disk_max_entries: int = 100_000, ttl: Optional[float] = None, shared_tier=None):
+        self.memory = MemoryTier(max_entries=memory_size, ttl=ttl)
+        # A prebuilt shared tier (SQLiteTier or RedisTier) takes the place of disk_path
+        if shared_tier is None and disk_path:
+            shared_tier = SQLiteTier(disk_path, max_entries=disk_max_entries, ttl=ttl)
+        self.disk = shared_tier
+        self._stats = {'hits': 0, 'misses': 0, 'memory_hits': 0, 'disk_hits': 0, 'sets': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, *names: str):
+        with self._stats_lock:
+            for name in names:
+                self._stats[name] += 1
+
+    def get(self, key: str, record: bool = True) -> Optional[str]:
+        """Look up an analysis; record=False re-checks without touching the hit/miss counters"""
+        value = self.memory.get(key)
+        if value is not None:
+            if record:
+                self._count('hits', 'memory_hits')
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+                if record:
+                    self._count('hits', 'disk_hits')
+                return value
+        if record:
+            self._count('misses')
+        return None
+
+    def set(self, key: str, value: str):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+        self._count('sets')
+
+    def stats(self) -> Dict[str, float]:
+        """Return a snapshot of the cache counters"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['memory_entries'] = len(self.memory)
+        stats['memory_evictions'] = self.memory.evictions
+        if self.disk is not None:
+            stats['disk_entries'] = len(self.disk)
+            stats['disk_evictions'] = self.disk.evictions
+        return stats
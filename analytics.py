@@ -0,0 +1,172 @@
+"""Aggregate analytics over stored screenings.
+
+The SQLite response store keeps a rollup table next to the raw rows: one row
+per (day, language, total score) with the assessment count, the number of
+positive item-9 answers and the sum of every item. A watermark records the
+last response id folded in, and refresh_rollups() aggregates only the rows
+after it, so the store updates the rollups in the same transaction as each
+batch it writes and existing databases are caught up on first open.
+
+Dashboards read the rollups, never the responses table: a query touches at
+most days x languages x 28 rows, whatever the number of assessments. Score
+distributions, severity mix by language, item means and item-9 positive
+rates all follow from those sums, and the severity band is derived from the
+total score.
+
+Usage:
+    python analytics.py data/phq9_responses.db --days 30
+    python analytics.py data/phq9_responses.db --start 2024-01-01 --end 2024-03-31 --language French
+"""
+
+import argparse
+import datetime
+import json
+import sqlite3
+import sys
+from typing import Dict, List, Optional, Sequence
+
+from scoring import MAX_TOTAL_SCORE, NUM_ITEMS, SAFETY_ITEM, SEVERITY_LEVELS, get_severity_level
+
+ITEM_SUMS = [f's{i + 1}' for i in range(NUM_ITEMS)]
+_WATERMARK = 'rollup_daily'
+
+
+def ensure_rollups(conn: sqlite3.Connection):
+    """Create the rollup and watermark tables if they are missing"""
+    sums = ', '.join(f'{column} INTEGER NOT NULL' for column in ITEM_SUMS)
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS rollup_daily ('
+        ' day TEXT NOT NULL,'
+        ' language TEXT NOT NULL,'
+        ' total_score INTEGER NOT NULL,'
+        ' n INTEGER NOT NULL,'
+        f' item9_positive INTEGER NOT NULL, {sums},'
+        ' PRIMARY KEY (day, language, total_score)) WITHOUT ROWID'
+    )
+    conn.execute('CREATE TABLE IF NOT EXISTS rollup_state (name TEXT PRIMARY KEY, last_id INTEGER NOT NULL)')
+
+
+def refresh_rollups(conn: sqlite3.Connection) -> int:
+    """Fold responses written since the watermark into the rollups; returns rows folded in.
+
+    Runs inside the caller's transaction when there is one, so a store can
+    update its rows and rollups atomically. Otherwise it takes the write lock
+    before reading the watermark, so concurrent refreshes never fold a row twice.
+    """
+    if not conn.in_transaction:
+        conn.execute('BEGIN IMMEDIATE')
+    row = conn.execute('SELECT last_id FROM rollup_state WHERE name = ?', (_WATERMARK,)).fetchone()
+    last_id = row[0] if row else 0
+    new_last_id, count = conn.execute(
+        'SELECT MAX(id), COUNT(*) FROM responses WHERE id > ?', (last_id,)
+    ).fetchone()
+    if not count:
+        return 0
+    item_sums = ', '.join(f'SUM(COALESCE(q{i + 1}, 0))' for i in range(NUM_ITEMS))
+    updates = ', '.join(f'{column} = {column} + excluded.{column}' for column in ('n', 'item9_positive', *ITEM_SUMS))
+    conn.execute(
+        f'INSERT INTO rollup_daily (day, language, total_score, n, item9_positive, {", ".join(ITEM_SUMS)}) '
+        f'SELECT substr(timestamp, 1, 10), language, total_score, COUNT(*), '
+        f'SUM(COALESCE(q{SAFETY_ITEM + 1}, 0) > 0), {item_sums} '
+        'FROM responses WHERE id > ? AND id <= ? GROUP BY 1, 2, 3 '
+        f'ON CONFLICT (day, language, total_score) DO UPDATE SET {updates}',
+        (last_id, new_last_id),
+    )
+    conn.execute(
+        'INSERT INTO rollup_state (name, last_id) VALUES (?, ?) '
+        'ON CONFLICT (name) DO UPDATE SET last_id = MAX(last_id, excluded.last_id)',
+        (_WATERMARK, new_last_id),
+    )
+    return count
+
+
+def _window(start: Optional[str], end: Optional[str], languages: Optional[Sequence[str]]):
+    """WHERE clause and parameters for a day range and language filter"""
+    clauses, params = [], []
+    if start:
+        clauses.append('day >= ?')
+        params.append(start)
+    if end:
+        clauses.append('day <= ?')
+        params.append(end)
+    if languages:
+        clauses.append(f'language IN ({", ".join("?" * len(languages))})')
+        params.extend(languages)
+    return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+
+def query_rollups(conn: sqlite3.Connection, start: Optional[str] = None, end: Optional[str] = None,
+                  languages: Optional[Sequence[str]] = None) -> Dict:
+    """Dashboard figures for an inclusive day range (ISO dates) and optional languages.
+
+    Returns a JSON-safe dict with the assessment count, score distribution
+    (index = total score), severity mix by language, item means, the item-9
+    positive rate and a per-day series.
+    """
+    where, params = _window(start, end, languages)
+    distribution = [0] * (MAX_TOTAL_SCORE + 1)
+    severity_by_language: Dict[str, Dict[str, int]] = {}
+    for language, score, n in conn.execute(
+        f'SELECT language, total_score, SUM(n) FROM rollup_daily{where} GROUP BY language, total_score', params
+    ):
+        distribution[score] += n
+        mix = severity_by_language.setdefault(language, dict.fromkeys(SEVERITY_LEVELS, 0))
+        mix[get_severity_level(score)] += n
+
+    daily: List[Dict] = []
+    totals = [0] * (2 + NUM_ITEMS)
+    item_sums = ', '.join(f'SUM({column})' for column in ITEM_SUMS)
+    for day, n, score_sum, positive, *sums in conn.execute(
+        f'SELECT day, SUM(n), SUM(total_score * n), SUM(item9_positive), {item_sums} '
+        f'FROM rollup_daily{where} GROUP BY day ORDER BY day', params
+    ):
+        daily.append({'day': day, 'assessments': n, 'mean_score': score_sum / n, 'item9_positive_rate': positive / n})
+        for i, value in enumerate((n, positive, *sums)):
+            totals[i] += value
+
+    count, positive = totals[0], totals[1]
+    return {
+        'window': {'start': start, 'end': end, 'languages': list(languages) if languages else None},
+        'assessments': count,
+        'score_distribution': distribution,
+        'severity_by_language': severity_by_language,
+        'item_means': [value / count for value in totals[2:]] if count else [None] * NUM_ITEMS,
+        'item9_positive_rate': positive / count if count else None,
+        'daily': daily,
+    }
+
+
+def load_summary(path: str, start: Optional[str] = None, end: Optional[str] = None,
+                 languages: Optional[Sequence[str]] = None) -> Dict:
+    """Open a response database, bring its rollups up to date and query them"""
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            ensure_rollups(conn)
+            refresh_rollups(conn)
+        return query_rollups(conn, start, end, languages)
+    finally:
+        conn.close()
+
+
+def days_ago(days: int) -> str:
+    """ISO date of the first day in a window of the last ``days`` days, today included"""
+    return (datetime.date.today() - datetime.timedelta(days=days - 1)).isoformat()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize stored PHQ-9 screenings from the rollup tables")
+    parser.add_argument('database', help="The app's SQLite response store")
+    parser.add_argument('--days', type=int, help="Only the last N days, today included")
+    parser.add_argument('--start', help="First day, YYYY-MM-DD")
+    parser.add_argument('--end', help="Last day, YYYY-MM-DD")
+    parser.add_argument('--language', action='append', help="Restrict to a language (repeatable)")
+    args = parser.parse_args(argv)
+
+    start = days_ago(args.days) if args.days else args.start
+    print(json.dumps(load_summary(args.database, start, args.end, args.language), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,384 @@
+"""JSON HTTP API for PHQ-9 scoring and AI analysis.
+
+A plain ASGI application with no web framework, so scoring requests cost a
+JSON decode, a table lookup and a JSON encode - none of Streamlit's
+per-session script re-execution. AI analysis goes through the same
+AnalysisService as the UI (shared cache, model registry and circuit breaker)
+and runs on a thread pool so the event loop is never blocked by a model call.
+
+Endpoints (all POST bodies are JSON):
+    GET  /health
+    GET  /metrics              Prometheus text (timings and counters, with PHQ9_TRACING=1)
+    GET  /v1/metrics           cache, coalescing, rate limiting and circuit breaker counters
+    POST /v1/severity-level    {"score": 12}
+    POST /v1/severity-info     {"score": 12, "language": "English"}
+    POST /v1/recommendations   {"score": 12, "language": "English"}
+    POST /v1/score             {"responses": [0, 1, 2, 3, 0, 1, 2, 3, 0], "language": "English"}
+    POST /v1/analysis          {"responses": [...], "language": "English"}
+    POST /v1/batch/score       {"assessments": [{"responses": [...]}, ...], "include_content": false}
+    POST /v1/batch/analysis    {"assessments": [{"responses": [...], "language": "French"}, ...]}
+
+"responses" is either a list of nine answers or a {question_index: answer}
+object, each answer 0-3. "language" defaults to English. Analysis requests
+may send an X-Client-Id header, which selects the per-client rate limit when
+PHQ9_AI_SESSION_RATE_PER_MINUTE is set.
+
+Run with:
+    uvicorn api:app --workers 4
+    python api.py --port 8000
+"""
+
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ai_analysis import AnalysisService
+from content import (
+    DEFAULT_LANGUAGE,
+    TRANSLATIONS,
+    get_professional_recommendations,
+    get_severity_info,
+)
+from scoring import MAX_ITEM_SCORE, MAX_TOTAL_SCORE, NUM_ITEMS, SEVERITY_LEVELS, get_severity_level, score_matrix
+from tracing import file_exporter_from_env, tracer
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = int(os.getenv('PHQ9_API_MAX_BODY_BYTES', str(4 * 1024 * 1024)))
+MAX_BATCH_SCORE = int(os.getenv('PHQ9_API_MAX_BATCH_SCORE', '10000'))
+MAX_BATCH_ANALYSIS = int(os.getenv('PHQ9_API_MAX_BATCH_ANALYSIS', '50'))
+
+_JSON_HEADERS = [(b'content-type', b'application/json; charset=utf-8')]
+
+# X-Client-Id of the request being handled, for per-client rate limiting
+_client_id: ContextVar[Optional[str]] = ContextVar('client_id', default=None)
+
+
+class APIError(Exception):
+    """Reported to the client as a JSON error with the given HTTP status"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# --- Request validation ---
+
+def parse_language(body: Dict) -> str:
+    language = body.get('language', DEFAULT_LANGUAGE)
+    # Lists and objects are unhashable, so check the type before the registry lookup
+    if not isinstance(language, str) or language not in TRANSLATIONS:
+        raise APIError(400, f"Unsupported language {language!r}; expected one of: {', '.join(TRANSLATIONS)}")
+    return language
+
+
+def parse_score(body: Dict) -> int:
+    score = body.get('score')
+    if isinstance(score, bool) or not isinstance(score, int) or not 0 <= score <= MAX_TOTAL_SCORE:
+        raise APIError(400, f"'score' must be an integer between 0 and {MAX_TOTAL_SCORE}")
+    return score
+
+
+def parse_responses(value) -> Dict[int, int]:
+    """Accept a list of nine answers or a {question_index: answer} object"""
+    if isinstance(value, list):
+        items = dict(enumerate(value))
+    elif isinstance(value, dict):
+        try:
+            items = {int(k): v for k, v in value.items()}
+        except (TypeError, ValueError):
+            raise APIError(400, "'responses' keys must be question indexes 0-8")
+    else:
+        raise APIError(400, f"'responses' must be a list of {NUM_ITEMS} answers or an object keyed by question index")
+    if sorted(items) != list(range(NUM_ITEMS)):
+        raise APIError(400, f"'responses' must contain exactly {NUM_ITEMS} answers")
+    for i, answer in items.items():
+        if isinstance(answer, bool) or not isinstance(answer, int) or not 0 <= answer <= MAX_ITEM_SCORE:
+            raise APIError(400, f"Answer to question {i + 1} must be an integer between 0 and {MAX_ITEM_SCORE}")
+    return {i: items[i] for i in range(NUM_ITEMS)}
+
+
+def parse_assessments(body: Dict, limit: int) -> List[Dict]:
+    assessments = body.get('assessments')
+    if not isinstance(assessments, list) or not assessments:
+        raise APIError(400, "'assessments' must be a non-empty list")
+    if len(assessments) > limit:
+        raise APIError(400, f"At most {limit} assessments per request")
+    if not all(isinstance(item, dict) for item in assessments):
+        raise APIError(400, "Every assessment must be an object")
+    return assessments
+
+
+def severity_payload(score: int, language: str) -> Dict:
+    level, description, css_class = get_severity_info(score, language)
+    return {'level': level, 'description': description, 'css_class': css_class}
+
+
+# --- Shared AI service ---
+
+_service: Optional[AnalysisService] = None
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_service() -> AnalysisService:
+    """One AnalysisService per process, built from environment configuration"""
+    global _service
+    if _service is None:
+        _service = AnalysisService.from_env(lambda: os.getenv('GEMINI_API_KEY'))
+    return _service
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('PHQ9_AI_WORKERS', '8')), thread_name_prefix='phq9-api-ai'
+        )
+    return _executor
+
+
+async def analyze(responses: Dict[int, int], language: str) -> Dict:
+    total_score = sum(responses.values())
+    loop = asyncio.get_running_loop()
+    analysis, warning = await loop.run_in_executor(
+        get_executor(), get_service().analyze, responses, total_score, language, None, _client_id.get()
+    )
+    return {
+        'total_score': total_score,
+        'severity': get_severity_level(total_score),
+        'analysis': analysis,
+        'warning': warning,
+    }
+
+
+# --- Handlers ---
+
+async def handle_health(body: Dict) -> Dict:
+    return {'status': 'ok'}
+
+
+async def handle_metrics(body: Dict) -> Dict:
+    service = get_service()
+    return {
+        'cache': service.cache.stats(),
+        'single_flight': service.flights.stats(),
+        'admission': service.admission.stats() if service.admission is not None else None,
+        'circuit_breaker': service.breaker.snapshot(),
+        'backend': service.backend_stats(),
+    }
+
+
+async def handle_severity_level(body: Dict) -> Dict:
+    score = parse_score(body)
+    return {'score': score, 'severity': get_severity_level(score)}
+
+
+async def handle_severity_info(body: Dict) -> Dict:
+    score = parse_score(body)
+    return dict(severity_payload(score, parse_language(body)), score=score, severity=get_severity_level(score))
+
+
+async def handle_recommendations(body: Dict) -> Dict:
+    score = parse_score(body)
+    language = parse_language(body)
+    return {
+        'score': score,
+        'severity': get_severity_level(score),
+        'recommendations_html': get_professional_recommendations(score, language),
+    }
+
+
+async def handle_score(body: Dict) -> Dict:
+    responses = parse_responses(body.get('responses'))
+    language = parse_language(body)
+    total_score = sum(responses.values())
+    return {
+        'total_score': total_score,
+        'severity': get_severity_level(total_score),
+        'severity_info': severity_payload(total_score, language),
+        'item9_positive': responses[NUM_ITEMS - 1] > 0,
+        'recommendations_html': get_professional_recommendations(total_score, language),
+    }
+
+
+async def handle_analysis(body: Dict) -> Dict:
+    return await analyze(parse_responses(body.get('responses')), parse_language(body))
+
+
+async def handle_batch_score(body: Dict) -> Dict:
+    """Score many assessments in one vectorized pass"""
+    assessments = parse_assessments(body, MAX_BATCH_SCORE)
+    include_content = bool(body.get('include_content', False))
+    items = np.empty((len(assessments), NUM_ITEMS), dtype=np.int8)
+    languages = []
+    for row, assessment in enumerate(assessments):
+        try:
+            responses = parse_responses(assessment.get('responses'))
+            languages.append(parse_language(assessment))
+        except APIError as e:
+            raise APIError(400, f"Assessment {row}: {e.message}")
+        items[row] = [responses[i] for i in range(NUM_ITEMS)]
+
+    scored = score_matrix(items, max_missing=0)
+    results = []
+    for row, (total, code, item9) in enumerate(zip(
+            scored['total_score'].tolist(), scored['severity'].tolist(), scored['item9_positive'].tolist())):
+        result = {'total_score': total, 'severity': SEVERITY_LEVELS[code], 'item9_positive': item9}
+        if include_content:
+            result['severity_info'] = severity_payload(total, languages[row])
+            result['recommendations_html'] = get_professional_recommendations(total, languages[row])
+        results.append(result)
+    return {'count': len(results), 'results': results}
+
+
+async def handle_batch_analysis(body: Dict) -> Dict:
+    """Run analyses for several assessments concurrently on the shared AI service"""
+    assessments = parse_assessments(body, MAX_BATCH_ANALYSIS)
+    parsed = []
+    for row, assessment in enumerate(assessments):
+        try:
+            parsed.append((parse_responses(assessment.get('responses')), parse_language(assessment)))
+        except APIError as e:
+            raise APIError(400, f"Assessment {row}: {e.message}")
+    results = await asyncio.gather(*(analyze(responses, language) for responses, language in parsed))
+    return {'count': len(results), 'results': list(results)}
+
+
+ROUTES = {
+    '/health': ('GET', handle_health),
+    '/v1/metrics': ('GET', handle_metrics),
+    '/v1/severity-level': ('POST', handle_severity_level),
+    '/v1/severity-info': ('POST', handle_severity_info),
+    '/v1/recommendations': ('POST', handle_recommendations),
+    '/v1/score': ('POST', handle_score),
+    '/v1/analysis': ('POST', handle_analysis),
+    '/v1/batch/score': ('POST', handle_batch_score),
+    '/v1/batch/analysis': ('POST', handle_batch_analysis),
+}
+
+
+# --- ASGI plumbing ---
+
+async def read_json_body(receive) -> Dict:
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise APIError(400, "Client disconnected")
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise APIError(413, f"Request body larger than {MAX_BODY_BYTES} bytes")
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            break
+    raw = b''.join(chunks)
+    if not raw:
+        return {}
+    try:
+        body = json.loads(raw)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise APIError(400, "Request body is not valid JSON")
+    if not isinstance(body, dict):
+        raise APIError(400, "Request body must be a JSON object")
+    return body
+
+
+async def send_text(send, status: int, text: str):
+    data = text.encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'text/plain; version=0.0.4; charset=utf-8'),
+                    (b'content-length', str(len(data)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': data})
+
+
+async def send_json(send, status: int, payload: Dict, headers: Optional[List] = None):
+    data = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': _JSON_HEADERS + [(b'content-length', str(len(data)).encode())] + (headers or []),
+    })
+    await send({'type': 'http.response.body', 'body': data})
+
+
+async def lifespan(receive, send):
+    exporter = None
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            exporter = file_exporter_from_env(tracer)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if exporter is not None:
+                exporter.close()
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    if scope['path'] == '/metrics' and scope['method'] == 'GET':
+        await send_text(send, 200, tracer.render_prometheus())
+        return
+
+    route = ROUTES.get(scope['path'].rstrip('/') or '/')
+    if route is None:
+        await send_json(send, 404, {'error': f"Not found: {scope['path']}"})
+        return
+    method, handler = route
+    if scope['method'] != method:
+        await send_json(send, 405, {'error': f"Use {method} for {scope['path']}"},
+                        [(b'allow', method.encode())])
+        return
+    client_id = dict(scope.get('headers') or []).get(b'x-client-id')
+    _client_id.set(client_id.decode('latin-1') if client_id else None)
+    try:
+        body = await read_json_body(receive) if method == 'POST' else {}
+        with tracer.span('api', route=scope['path']):
+            payload = await handler(body)
+    except APIError as e:
+        await send_json(send, e.status, {'error': e.message})
+        return
+    except Exception:
+        logger.exception("Unhandled error in %s", scope['path'])
+        await send_json(send, 500, {'error': "Internal server error"})
+        return
+    await send_json(send, 200, payload)
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve the PHQ-9 JSON API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes (default 1)")
+    args = parser.parse_args(argv)
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("Serving the API requires uvicorn: pip install uvicorn")
+    uvicorn.run('api:app', host=args.host, port=args.port, workers=args.workers, access_log=False)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -9,136 +9,68 @@ st.set_page_config(
 )
 
 import json
-import datetime
-from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
 import os
+import threading
+import time
+import uuid
 
-# Try to import Google Generative AI with proper error handling
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
-    st.warning("⚠️ Google Generative AI package not installed properly. Running in fallback mode.")
+from ai_analysis import AnalysisService, AnalysisStream
+from analytics import days_ago, load_summary
+from assessment import Assessment
+from content import (
+    TRANSLATIONS,
+    get_fallback_analysis,
+    get_option_labels,
+    get_professional_recommendations,
+    get_question_cards,
+    get_question_header,
+    get_severity_info,
+)
+from fragments import get_fragment, measure, record_bytes
+from gemini_client import DEFAULT_MODEL_NAME
+from shared_state import backend_from_env, issue_resume_token, redeem_resume_token
+from storage import BatchingWriter, create_store
+from tracing import FileExporter, file_exporter_from_env, traced, tracer
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+@st.cache_resource
+def get_stylesheet_markup() -> str:
+    """Markup that applies the app stylesheet, built once per process.
+
+    With static file serving enabled (see .streamlit/config.toml) this is a
+    small <link> tag and the browser caches the stylesheet; otherwise the CSS
+    is read from disk once and inlined.
+    """
+    if st.get_option('server.enableStaticServing'):
+        return '<link rel="stylesheet" href="app/static/styles.css">'
+    with open(os.path.join(STATIC_DIR, 'styles.css'), encoding='utf-8') as f:
+        return f'<style>\n{f.read()}</style>'
 
 # Custom CSS for styling
-st.markdown("""
-<style>
-    .main {
-        background: linear-gradient(180deg, #87CEEB 0%, #98FF98 100%);
-        min-height: 100vh;
-    }
-    
-    .stApp {
-        background: linear-gradient(180deg, #87CEEB 0%, #98FF98 100%);
-    }
-    
-    .question-card {
-        background: white;
-        padding: 2rem;
-        border-radius: 15px;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        margin: 1rem 0;
-        max-width: 800px;
-        margin-left: auto;
-        margin-right: auto;
-    }
-    
-    .title-header {
-        text-align: center;
-        color: #333333;
-        font-size: 2.5rem;
-        font-weight: bold;
-        margin-bottom: 1rem;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
-    }
-    
-    .subtitle {
-        text-align: center;
-        color: #555555;
-        font-size: 1.2rem;
-        margin-bottom: 2rem;
-    }
-    
-    .progress-bar {
-        background-color: #e0e0e0;
-        border-radius: 10px;
-        height: 10px;
-        margin: 1rem 0;
-    }
-    
-    .progress-fill {
-        background: linear-gradient(90deg, #4682B4, #87CEFA);
-        height: 100%;
-        border-radius: 10px;
-        transition: width 0.3s ease;
-    }
-    
-    .encouragement-box {
-        background: linear-gradient(135deg, #E8F4FD, #F0F8FF);
-        border-left: 4px solid #4682B4;
-        padding: 1rem;
-        margin: 1rem 0;
-        border-radius: 8px;
-        font-style: italic;
-        color: #2C3E50;
-    }
-    
-    .result-card {
-        background: white;
-        padding: 2rem;
-        border-radius: 15px;
-        box-shadow: 0 6px 12px rgba(0, 0, 0, 0.15);
-        margin: 1rem 0;
-        text-align: center;
-    }
-    
-    .severity-low { border-left: 6px solid #28a745; }
-    .severity-mild { border-left: 6px solid #ffc107; }
-    .severity-moderate { border-left: 6px solid #fd7e14; }
-    .severity-severe { border-left: 6px solid #dc3545; }
-    
-    .nav-button {
-        background: #4682B4;
-        color: white;
-        padding: 0.75rem 2rem;
-        border: none;
-        border-radius: 25px;
-        font-size: 1.1rem;
-        font-weight: bold;
-        cursor: pointer;
-        transition: all 0.3s ease;
-        margin: 0.5rem;
-    }
-    
-    .nav-button:hover {
-        background: #87CEFA;
-        transform: translateY(-2px);
-        box-shadow: 0 4px 8px rgba(70, 130, 180, 0.3);
-    }
-    
-    .footer {
-        text-align: center;
-        color: #666;
-        font-size: 0.9rem;
-        margin-top: 3rem;
-        padding: 2rem;
-        background: rgba(255, 255, 255, 0.1);
-        border-radius: 10px;
-    }
-    
-    .language-selector {
-        position: fixed;
-        top: 20px;
-        right: 20px;
-        z-index: 1000;
-        background: white;
-        padding: 0.5rem;
-        border-radius: 10px;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(get_stylesheet_markup(), unsafe_allow_html=True)
+
+# Reruns only the decorated region when a widget inside it changes (Streamlit >= 1.37);
+# elsewhere every interaction reruns the whole script as before
+fragment = getattr(st, 'fragment', None) or (lambda fn: fn)
+
+# A pending AI card reruns on its own timer, so waiting for the model never blocks the
+# page's buttons; without st.fragment the whole page is rerun on the same interval instead
+AI_POLL_SECONDS = float(os.getenv('PHQ9_AI_POLL_SECONDS', '0.5'))
+polling_fragment = st.fragment(run_every=AI_POLL_SECONDS) if hasattr(st, 'fragment') else (lambda fn: fn)
+
+def show_markup(body: str, unsafe_allow_html: bool = False):
+    """st.markdown that counts the bytes it sends toward the render_bytes metric"""
+    record_bytes(len(body.encode('utf-8')))
+    st.markdown(body, unsafe_allow_html=unsafe_allow_html)
+
+def show_fragment(name: str, unsafe_allow_html: bool = True):
+    """Render a static region from the per-process fragment cache"""
+    html, size = get_fragment(name, st.session_state.language)
+    record_bytes(size)
+    st.markdown(html, unsafe_allow_html=unsafe_allow_html)
 
 # Initialize session state
 if 'current_page' not in st.session_state:
@@ -149,403 +81,177 @@ if 'responses' not in st.session_state:
     st.session_state.responses = {}
 if 'current_question' not in st.session_state:
     st.session_state.current_question = 0
-if 'total_score' not in st.session_state:
-    st.session_state.total_score = 0
+if 'assessment' not in st.session_state:
+    st.session_state.assessment = None
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 
-# Language translations
-TRANSLATIONS = {
-    'English': {
-        'title': 'PHQ-9 Mental Health Screening',
-        'subtitle': 'Professional Depression Assessment Tool',
-        'start_button': 'Start Assessment',
-        'next_button': 'Next Question',
-        'back_button': 'Previous Question',
-        'submit_button': 'Complete Assessment',
-        'home': 'Home',
-        'about': 'About',
-        'resources': 'Resources',
-        'privacy_note': '🔒 Your data is encrypted and never shared without consent.',
-        'encouragement_1': "You're taking an important step for your mental health. 💚",
-        'encouragement_2': "Every question helps us understand how you're feeling. You're doing great! 🌟",
-        'encouragement_3': "Remember, seeking help is a sign of strength, not weakness. 💪",
-        'questions': [
-            "Little interest or pleasure in doing things",
-            "Feeling down, depressed, or hopeless",
-            "Trouble falling or staying asleep, or sleeping too much",
-            "Feeling tired or having little energy",
-            "Poor appetite or overeating",
-            "Feeling bad about yourself or that you are a failure or have let yourself or your family down",
-            "Trouble concentrating on things, such as reading the newspaper or watching television",
-            "Moving or speaking so slowly that other people could have noticed, or the opposite - being so fidgety or restless that you have been moving around a lot more than usual",
-            "Thoughts that you would be better off dead, or of hurting yourself"
-        ],
-        'options': ['Not at all', 'Several days', 'More than half the days', 'Nearly every day'],
-        'result_title': 'Your PHQ-9 Assessment Results',
-        'ai_analysis': 'AI Analysis and Recommendations',
-        'score_display': 'Your PHQ-9 Score',
-        'analyzing': '🤖 AI is analyzing your responses...',
-        'personalized_analysis': 'Personalized Analysis',
-        'response_breakdown': 'Response Breakdown',
-        'professional_recommendations': 'Professional Recommendations',
-        'take_again': 'Take Again',
-        'view_resources': 'View Resources'
-    },
-    'French': {
-        'title': 'Dépistage de Santé Mentale PHQ-9',
-        'subtitle': 'Outil Professionnel d\'Évaluation de la Dépression',
-        'start_button': 'Commencer l\'Évaluation',
-        'next_button': 'Question Suivante',
-        'back_button': 'Question Précédente',
-        'submit_button': 'Terminer l\'Évaluation',
-        'home': 'Accueil',
-        'about': 'À Propos',
-        'resources': 'Ressources',
-        'privacy_note': '🔒 Vos données sont cryptées et jamais partagées sans consentement.',
-        'encouragement_1': "Vous franchissez une étape importante pour votre santé mentale. 💚",
-        'encouragement_2': "Chaque question nous aide à comprendre comment vous vous sentez. Vous faites du bon travail! 🌟",
-        'encouragement_3': "Rappelez-vous, demander de l'aide est un signe de force, pas de faiblesse. 💪",
-        'questions': [
-            "Peu d'intérêt ou de plaisir à faire des choses",
-            "Se sentir déprimé(e), triste ou désespéré(e)",
-            "Difficultés à s'endormir ou à rester endormi(e), ou dormir trop",
-            "Se sentir fatigué(e) ou avoir peu d'énergie",
-            "Manque d'appétit ou manger trop",
-            "Se sentir mal dans sa peau ou penser qu'on est un(e) raté(e) ou qu'on a déçu sa famille",
-            "Difficultés à se concentrer sur des choses comme lire le journal ou regarder la télévision",
-            "Bouger ou parler si lentement que d'autres personnes l'ont remarqué, ou au contraire être si agité(e) qu'on bouge beaucoup plus que d'habitude",
-            "Penser qu'on serait mieux mort(e) ou penser à se faire du mal"
-        ],
-        'options': ['Jamais', 'Plusieurs jours', 'Plus de la moitié des jours', 'Presque tous les jours'],
-        'result_title': 'Vos Résultats d\'Évaluation PHQ-9',
-        'ai_analysis': 'Analyse IA et Recommandations',
-        'score_display': 'Votre Score PHQ-9',
-        'analyzing': '🤖 L\'IA analyse vos réponses...',
-        'personalized_analysis': 'Analyse Personnalisée',
-        'response_breakdown': 'Répartition des Réponses',
-        'professional_recommendations': 'Recommandations Professionnelles',
-        'take_again': 'Reprendre',
-        'view_resources': 'Voir les Ressources'
-    },
-    'Yoruba': {
-        'title': 'PHQ-9 Ayewo Ilera Opolo',
-        'subtitle': 'Ohun Elo Alamọdaju fun Ayewo Ibanuje',
-        'start_button': 'Bere Ayewo',
-        'next_button': 'Ibeere To Tele',
-        'back_button': 'Ibeere To Koja',
-        'submit_button': 'Pari Ayewo',
-        'home': 'Ile',
-        'about': 'Nipa Wa',
-        'resources': 'Awọn Ohun Elo',
-        'privacy_note': '🔒 A ti fi ohun elo idena pamọ data rẹ, a ko pin si ẹnikẹni laisi ẹ gbọ.',
-        'encouragement_1': "O n gbe igbesẹ pataki fun ilera ọpọlọ rẹ. 💚",
-        'encouragement_2': "Gbogbo ibeere n ran wa lọwọ lati loye bi o ṣe rilara. O n ṣe daradara! 🌟",
-        'encouragement_3': "Ranti pe, wiwa iranlọwọ jẹ ami agbara, kii ṣe ailera. 💪",
-        'questions': [
-            "Aifẹ tabi idunnu kekere ninu ṣiṣe awọn nkan",
-            "Rilara aibalẹ, ibanuje, tabi ainireti",
-            "Iṣoro lati sun tabi duro ninu oorun, tabi sisun pupọ ju",
-            "Rilara arẹ tabi ni agbara kekere",
-            "Ebi ko si tabi jijẹ pupọ ju",
-            "Rilara buburu nipa ara ẹ tabi pe o jẹ asikuna tabi ti jẹ ki ẹbi rẹ ṣe tabi sofo",
-            "Iṣoro lati kojuumọ si awọn nkan bi kika iwe iroyin tabi wiwo tẹlifisiọnu",
-            "Gbigbe tabi sọrọ kia titi ti awọn eniyan miiran le ṣe akiyesi, tabi idakeji - jijẹ alarabara tabi ainisimi titi ti o ti n gbe ju iwọntunwọnsi",
-            "Ero pe o yoo dara julọ ti o ba ku, tabi lati ṣe ara rẹ ni ipalara"
-        ],
-        'options': ['Rara', 'Ọjọ diẹ', 'Ju ọpọ ọjọ lọ', 'Fẹrẹẹ gbogbo ọjọ'],
-        'result_title': 'Awọn Abajade Ayewo PHQ-9 Rẹ',
-        'ai_analysis': 'Itupalẹ AI ati Awọn Iṣeduro',
-        'score_display': 'Awọn Abajade PHQ-9 Rẹ',
-        'analyzing': '🤖 AI n ṣe itupalẹ awọn idahun rẹ...',
-        'personalized_analysis': 'Itupalẹ Ti ara ẹni',
-        'response_breakdown': 'Ipin Awọn Idahun',
-        'professional_recommendations': 'Awọn Iṣeduro Ọprofessionals',
-        'take_again': 'Tun Gba',
-        'view_resources': 'Wo Awọn Ohun Elo'
-    },
-    'Igbo': {
-        'title': 'PHQ-9 Nyocha Ahụike Uche',
-        'subtitle': 'Ngwa Ọkachamara Maka Nyocha Ịda Mba',
-        'start_button': 'Malite Nyocha',
-        'next_button': 'Ajụjụ Na-eso',
-        'back_button': 'Ajụjụ Gara Aga',
-        'submit_button': 'Mechaa Nyocha',
-        'home': 'Ụlọ',
-        'about': 'Gbasara Anyị',
-        'resources': 'Ihe Ndị Dị Mkpa',
-        'privacy_note': '🔒 Ezonọ data gị ma ọ dịghị onye anyị na-ekerịta ya na ya na-enweghị nkwenye gị.',
-        'encouragement_1': "Ị na-eme nzọụkwụ dị mkpa maka ahụike uche gị. 💚",
-        'encouragement_2': "Ajụjụ ọ bụla na-enyere anyị aka ịghọta otú ị na-eche. Ị na-eme nke ọma! 🌟",
-        'encouragement_3': "Cheta na ịchọ enyemaka bụ ihe ngosi nke ike, ọ bụghị adịghị ike. 💪",
-        'questions': [
-            "Obere mmasị ma ọ bụ obi ụtọ n'ime ihe ndị na-eme",
-            "Ịda mba, obi mwute, ma ọ bụ enweghị olileanya",
-            "Nsogbu ịrahụ ụra ma ọ bụ ịnọgide na ụra, ma ọ bụ ihi ụra nke ukwuu",
-            "Ike gwụ ma ọ bụ inwe obere ume",
-            "Agụụ na-adịghị ma ọ bụ iri nri nke ukwuu",
-            "Inwe mmetụta ọjọọ gbasara onwe gị ma ọ bụ iche na ị bụ onye dara ada ma ọ bụ meela ka ezinụlọ gị kwaa ákwá",
-            "Nsogbu ilekwasị uche n'ihe ndị dị ka ịgụ akwụkwọ akụkọ ma ọ bụ ikiri telivishọn",
-            "Ịkwagharị ma ọ bụ ikwu okwu nke nwayọọ nke na ndị ọzọ nwere ike ịchọpụta, ma ọ bụ ihe megidere ya - inwe nsogbu ma ọ bụ enweghị izu ike nke na ị na-akwagharị karịa ka ị na-emebu",
-            "Echiche na ọ ga-aka mma ma ọ bụrụ na ị nwụọ, ma ọ bụ icheta imerụ onwe gị ahụ"
-        ],
-        'options': ['Ọ dịghị ma ọlị', 'Ụbọchị ole na ole', 'Ihe karịrị ọkara ụbọchị', 'Ihe fọrọ nke nta ka ọ bụrụ kwa ụbọchị'],
-        'result_title': 'Nsonaazụ Nyocha PHQ-9 Gị',
-        'ai_analysis': 'Nnyocha AI na Ntụziaka',
-        'score_display': 'Nsonaazụ PHQ-9 Gị',
-        'analyzing': '🤖 AI na-enyocha azịza gị...',
-        'personalized_analysis': 'Nyocha Nkeonwe',
-        'response_breakdown': 'Nkewa Azịza',
-        'professional_recommendations': 'Nkwado Ọkachamara',
-        'take_again': 'Weghachite',
-        'view_resources': 'Lee Ihe Ndi Di Mkpa'
-    },
-    'Hausa': {
-        'title': 'PHQ-9 Binciken Lafiyar Hankali',
-        'subtitle': 'Kayan Aiki na Ƙwararru don Gwajin Baƙin Ciki',
-        'start_button': 'Fara Gwaji',
-        'next_button': 'Tambaya Ta Gaba',
-        'back_button': 'Tambaya Ta Baya',
-        'submit_button': 'Kammala Gwaji',
-        'home': 'Gida',
-        'about': 'Game da Mu',
-        'resources': 'Kayan Aiki',
-        'privacy_note': '🔒 An ɓoye bayananku kuma ba a raba su ba sai da amincewarku.',
-        'encouragement_1': "Kuna ɗaukar muhimmin mataki don lafiyar hankalinku. 💚",
-        'encouragement_2': "Kowace tambaya tana taimaka mana mu fahimci yadda kuke ji. Kuna yin kyau! 🌟",
-        'encouragement_3': "Ku tuna cewa, neman taimako alama ce ta ƙarfi, ba rauni ba. 💪",
-        'questions': [
-            "Ƙarancin sha'awa ko jin daɗi wajen yin abubuwa",
-            "Jin baƙin ciki, damuwa, ko rashin bege",
-            "Matsala wajen yin barci ko ci gaba da barci, ko yin barci da yawa",
-            "Jin gajiya ko samun ƙarancin kuzari",
-            "Rashin ci ko cin abinci da yawa",
-            "Jin mummunan abu game da kanku ko tunanin cewa kun gaza ko kun ba da kunya ga danginku",
-            "Matsala wajen mai da hankali kan abubuwa kamar karanta jarida ko kallon talabijin",
-            "Motsi ko yin magana a hankali har sauran mutane sun lura, ko akasin haka - zama marasa natsuwa ko damuwa har kun yi motsi fiye da yadda kuka saba",
-            "Tunanin cewa zai fi kyau ku mutu, ko tunanin cutar da kanku"
-        ],
-        'options': ['Ba ko kaɗan', 'Kwanaki kaɗan', 'Fiye da rabin kwanaki', 'Kusan kowace rana'],
-        'result_title': 'Sakamakon Gwajin PHQ-9 Naku',
-        'ai_analysis': 'Bincike na AI da Shawarwari',
-        'score_display': 'Sakamakon PHQ-9 Naku',
-        'analyzing': '🤖 AI na nazarin amsoshin ku...',
-        'personalized_analysis': 'Nazarin Musamman',
-        'response_breakdown': 'Rarraba Amsoshi',
-        'professional_recommendations': 'Shawarwari Masana',
-        'take_again': 'Sake ɗauka',
-        'view_resources': 'Duba Kayan Aiki'
-    }
-}
-
-# Gemini API configuration (placeholder - user needs to add their API key)
-def configure_gemini_api():
-    """Configure Gemini API with error handling"""
+def read_secret(section: str, key: str) -> Optional[str]:
+    """Read a value from .streamlit/secrets.toml, or None if it is not configured"""
     try:
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            st.warning("⚠️ Gemini API key not found. Please set the GEMINI_API_KEY environment variable for AI analysis.")
-            return False
-        genai.configure(api_key=api_key)
-        return True
-    except Exception as e:
-        st.warning("⚠️ Error configuring Gemini API. Falling back to basic analysis.")
-        return False
+        return st.secrets[section][key]
+    except Exception:
+        return None
 
-def get_ai_analysis(responses: Dict, total_score: int, language: str) -> str:
-    """Get AI analysis using Gemini API with professional prompting"""
-    # Check if Gemini is available
-    if not GEMINI_AVAILABLE:
-        return get_fallback_analysis(total_score, language)
-        
-    try:
-        # Try to configure the API
-        if not configure_gemini_api():
-            return get_fallback_analysis(total_score, language)
-            
-        # Create the model and prepare response data
-        try:
-            model = genai.GenerativeModel('gemini-pro')
-            
-            # Prepare response data for analysis
-            response_text = ""
-            t = TRANSLATIONS[language]
-            for i, response_score in responses.items():
-                question = t['questions'][i]
-                answer = t['options'][response_score]
-                response_text += f"Q{i+1}: {question} - Answer: {answer} (Score: {response_score})\n"
-            
-            # Professional prompt for Gemini
-            prompt = f"""
-            You are a licensed clinical psychologist and mental health professional with expertise in depression assessment and the PHQ-9 screening tool. 
+# Gemini API configuration - the environment takes precedence over secrets.toml
+def get_gemini_api_key() -> Optional[str]:
+    """Current Gemini API key; re-read on every call so keys can be rotated live"""
+    return os.getenv('GEMINI_API_KEY') or read_secret('api_keys', 'gemini_api_key')
 
-            PATIENT CONTEXT:
-            - A patient has completed the PHQ-9 depression screening questionnaire
-            - Total PHQ-9 Score: {total_score}/27
-            - Language: {language}
-            
-            DETAILED RESPONSES:
-            {response_text}
-            
-            INSTRUCTIONS:
-            Please provide a professional, compassionate, and evidence-based analysis following these guidelines:
+@st.cache_resource
+def get_analysis_service() -> AnalysisService:
+    """Process-wide AI analysis service: cache, model backend and circuit breaker.
 
-            1. **Professional Tone**: Write as a healthcare professional would - caring but clinical
-            2. **Severity Assessment**: Based on standard PHQ-9 scoring:
-               - 0-4: Minimal depression
-               - 5-9: Mild depression  
-               - 10-14: Moderate depression
-               - 15-27: Severe depression
-            
-            3. **Key Elements to Include**:
-               - Brief interpretation of the score in context
-               - Identify specific symptom patterns from responses
-               - Provide appropriate level of urgency for professional help
-               - Suggest 2-3 specific, actionable next steps
-               - Include reassurance and hope where appropriate
-               
-            4. **Important Limitations**:
-               - Emphasize this is a screening tool, not a diagnosis
-               - Recommend professional evaluation for definitive assessment
-               - If score is 15+, emphasize urgency of professional help
-               - If item 9 (self-harm thoughts) > 0, prioritize safety planning
-            
-            5. **Cultural Sensitivity**: 
-               - Be mindful of cultural context for {language} speakers
-               - Use appropriate, respectful language
-               
-            6. **Length**: Keep response to 150-200 words, clear and focused
-            
-            Please respond in {language} and provide professional mental health guidance appropriate for this PHQ-9 assessment.
-            """
-            
-            # Generate response with timeout handling
-            try:
-                response = model.generate_content(prompt)
-                if response and response.text:
-                    return response.text.strip()
-            except Exception as e:
-                st.warning(f"⚠️ AI analysis failed. Using fallback analysis.")
-                return get_fallback_analysis(total_score, language)
-                
-        except Exception as e:
-            st.warning("⚠️ Could not initialize AI model. Using fallback analysis.")
-            return get_fallback_analysis(total_score, language)
-            
-    except Exception as e:
-        st.warning("⚠️ AI analysis encountered an error. Using fallback analysis.")
-        return get_fallback_analysis(total_score, language)
+    Shared by all sessions; service.cache.stats(), service.flights.stats(),
+    service.admission.stats() and service.breaker.snapshot() are the
+    monitoring surface.
+    """
+    model_name = os.getenv('GEMINI_MODEL') or read_secret('app', 'gemini_model') or DEFAULT_MODEL_NAME
+    return AnalysisService.from_env(get_gemini_api_key, model_name)
 
-    # Final fallback if we somehow get here
-    return get_fallback_analysis(total_score, language)
+@st.cache_resource
+def get_analysis_executor() -> ThreadPoolExecutor:
+    """Worker pool shared by all sessions for background AI analysis"""
+    return ThreadPoolExecutor(
+        max_workers=int(os.getenv('PHQ9_AI_WORKERS', '8')),
+        thread_name_prefix='phq9-ai'
+    )
 
-def get_fallback_analysis(total_score: int, language: str) -> str:
-    """Fallback professional analysis when API is unavailable"""
-    severity = get_severity_level(total_score)
-    
-    fallback_analysis = {
-        'English': {
-            'minimal': f"Your PHQ-9 score of {total_score} suggests minimal depression symptoms. This is encouraging! Continue maintaining healthy habits like regular exercise, good sleep, and social connections. Monitor your mood and don't hesitate to reach out for support if symptoms change.",
-            'mild': f"Your PHQ-9 score of {total_score} indicates mild depression symptoms. Consider discussing your feelings with a healthcare provider. Focus on self-care activities, maintain regular routines, and consider counseling as a preventive measure.",
-            'moderate': f"Your PHQ-9 score of {total_score} suggests moderate depression symptoms. It's important to seek professional help from a mental health provider or your primary care doctor. They can discuss treatment options including therapy and possibly medication.",
-            'severe': f"Your PHQ-9 score of {total_score} indicates severe depression symptoms. Please seek immediate professional help. Contact your doctor, a mental health professional, or a crisis helpline. Effective treatments are available and can significantly improve how you feel."
-        },
-        'French': {
-            'minimal': f"Votre score PHQ-9 de {total_score} suggère des symptômes de dépression minimaux. C'est encourageant! Continuez à maintenir des habitudes saines comme l'exercice régulier, un bon sommeil et des liens sociaux.",
-            'mild': f"Votre score PHQ-9 de {total_score} indique des symptômes de dépression légère. Envisagez de parler de vos sentiments avec un professionnel de santé. Concentrez-vous sur les activités d'autosoins.",
-            'moderate': f"Votre score PHQ-9 de {total_score} suggère des symptômes de dépression modérée. Il est important de chercher l'aide d'un professionnel de la santé mentale ou de votre médecin traitant.",
-            'severe': f"Votre score PHQ-9 de {total_score} indique des symptômes de dépression sévère. Veuillez chercher une aide professionnelle immédiate. Contactez votre médecin ou une ligne d'assistance d'urgence."
-        },
-        'Yoruba': {
-            'minimal': f"Aami PHQ-9 rẹ ti {total_score} fi han pe o ni awọn aami iba je kekere. Eyi jẹ́ ìmọ̀lára dáradára! Tẹsiwaju pẹlu awọn ìwà tó dára bii ìdárayá déédéé, oorun tó dára, àti ìbágbépọ̀.",
-            'mild': f"Aami PHQ-9 rẹ ti {total_score} fi han pe o ni awọn aami iba je díẹ̀. Ro nipa sísọ̀rọ̀ nípa ìmọ̀lára rẹ pẹ̀lú oníṣègùn. Ṣe àkíyèsí ìtọ́jú ara rẹ.",
-            'moderate': f"Aami PHQ-9 rẹ ti {total_score} fi han pe o ni awọn aami iba je àárín. O ṣe pàtàkì láti wá ìrànlọ́wọ́ ọ̀jọ́gbọ́n lọ́dọ̀ oníṣègùn ọpọlọ tàbí oníṣègùn rẹ.",
-            'severe': f"Aami PHQ-9 rẹ ti {total_score} fi han pe o ni awọn aami iba je pupọ. Jọ̀wọ́ wá ìrànlọ́wọ́ ọ̀jọ́gbọ́n lẹ́sẹ̀kẹsẹ̀. Pe oníṣègùn rẹ tàbí nọ́mbà ìrànlọ́wọ́ pàjáwìrì."
-        },
-        'Igbo': {
-            'minimal': f"Skọọ PHQ-9 gị nke {total_score} na-egosi na ị nwere mgbaàmà nke nweda mmụọ dị ala. Nke a na-agba ume! Gaa n'ihu na-edebe omume ahụike dị mma dị ka egwuregwu, ụra ọma, na mmekọrịta mmadụ.",
-            'mild': f"Skọọ PHQ-9 gị nke {total_score} na-egosi na ị nwere mgbaàmà nke nweda mmụọ dị mfe. Chee banyere ịkọrọ onye nlekọta ahụike mmetụta gị. Chụọ anya na omume nlekọta onwe gị.",
-            'moderate': f"Skọọ PHQ-9 gị nke {total_score} na-egosi na ị nwere mgbaàmà nke nweda mmụọ dị n'etiti. Ọ dị mkpa ịchọta enyemaka ọkachamara site n'aka onye na-ahụ maka ahụike uche ma ọ bụ dọkịta gị.",
-            'severe': f"Skọọ PHQ-9 gị nke {total_score} na-egosi na ị nwere mgbaàmà nke nweda mmụọ dị ukwuu. Biko chọta enyemaka ọkachamara ozugbo. Kpọtụrụ dọkịta gị ma ọ bụ ahụ nke enyemaka mberede."
-        },
-        'Hausa': {
-            'minimal': f"Tambarin PHQ-9 na {total_score} yana nuna alamun rashin kwarin hankali na ƙasa. Wannan yana ban ƙarfafa! Ci gaba da kiyaye al'adun lafiya kamar motsa jiki akai-akai, barci mai kyau, da haɗin kai.",
-            'mild': f"Tambarin PHQ-9 na {total_score} yana nuna alamun rashin kwarin hankali na tsakiya. Ka yi tunani game da magana da likita game da yadda kake ji. Mai da hankali kan ayyukan kula da kanka.",
-            'moderate': f"Tambarin PHQ-9 na {total_score} yana nuna alamun rashin kwarin hankali matsakaici. Yana da muhimmanci a nemi taimakon ƙwararru daga mai ba da lafiyar hankali ko likitanka.",
-            'severe': f"Tambarin PHQ-9 na {total_score} yana nuna alamun rashin kwarin hankali mai tsanani. Da fatan za a nemi taimakon ƙwararru nan take. Tuntuɓi likitanka ko layin agaji na gaggawa."
-        }
-    }
-    
-    lang_analysis = fallback_analysis.get(language, fallback_analysis['English'])
-    return lang_analysis.get(severity, lang_analysis['minimal'])
+def submit_ai_analysis(responses: Dict, total_score: int, language: str) -> Dict:
+    """Start the AI analysis in the background and remember it for the results page"""
+    responses = dict(responses)
+    request_key = (tuple(sorted(responses.items())), total_score, language)
+    stream = AnalysisStream() if os.getenv('PHQ9_AI_STREAMING', '1') == '1' else None
+    future = get_analysis_executor().submit(
+        get_analysis_service().analyze, responses, total_score, language, stream,
+        st.session_state.session_id
+    )
+    # The results page stops waiting and shows the fallback once the deadline passes
+    deadline = time.monotonic() + float(os.getenv('PHQ9_AI_WAIT_SECONDS', '60'))
+    st.session_state.ai_job = {'key': request_key, 'future': future, 'stream': stream, 'deadline': deadline}
+    return st.session_state.ai_job
 
-def get_severity_level(score: int) -> str:
-    """Determine severity level based on PHQ-9 score"""
-    if score <= 4:
-        return 'minimal'
-    elif score <= 9:
-        return 'mild'
-    elif score <= 14:
-        return 'moderate'
-    else:
-        return 'severe'
+def get_ai_analysis_job(responses: Dict, total_score: int, language: str) -> Dict:
+    """Return the pending analysis job for these answers, submitting one if needed"""
+    request_key = (tuple(sorted(responses.items())), total_score, language)
+    job = st.session_state.get('ai_job')
+    if job is None or job['key'] != request_key:
+        return submit_ai_analysis(responses, total_score, language)
+    return job
 
-def get_severity_info(score: int, language: str) -> Tuple[str, str, str]:
-    """Get severity information including level, description, and CSS class"""
-    severity = get_severity_level(score)
-    
-    severity_info = {
-        'English': {
-            'minimal': ('Minimal Depression', 'Your symptoms suggest minimal or no depression. Keep up the good work with self-care!', 'severity-low'),
-            'mild': ('Mild Depression', 'Your symptoms suggest mild depression. Consider speaking with a healthcare provider.', 'severity-mild'),
-            'moderate': ('Moderate Depression', 'Your symptoms suggest moderate depression. Professional help is recommended.', 'severity-moderate'),
-            'severe': ('Severe Depression', 'Your symptoms suggest severe depression. Please seek immediate professional help.', 'severity-severe')
-        },
-        'French': {
-            'minimal': ('Dépression Minimale', 'Vos symptômes suggèrent une dépression minimale ou inexistante. Continuez vos soins personnels!', 'severity-low'),
-            'mild': ('Dépression Légère', 'Vos symptômes suggèrent une dépression légère. Envisagez de parler à un professionnel.', 'severity-mild'),
-            'moderate': ('Dépression Modérée', 'Vos symptômes suggèrent une dépression modérée. Une aide professionnelle est recommandée.', 'severity-moderate'),
-            'severe': ('Dépression Sévère', 'Vos symptômes suggèrent une dépression sévère. Cherchez une aide professionnelle immédiate.', 'severity-severe')
-        },
-        'Yoruba': {
-            'minimal': ('Ìbànújẹ́ Kékeré', 'Àwọn àmì rẹ fi hàn pé o ní ìbànújẹ́ kékeré tàbí kò sí. Tẹ̀síwájú pẹ̀lú ìtọ́jú ara rẹ!', 'severity-low'),
-            'mild': ('Ìbànújẹ́ Díẹ̀', 'Àwọn àmì rẹ fi hàn pé o ní ìbànújẹ́ díẹ̀. Rò ó láti bá oníṣègùn sọ̀rọ̀.', 'severity-mild'),
-            'moderate': ('Ìbànújẹ́ Àárín', 'Àwọn àmì rẹ fi hàn pé o ní ìbànújẹ́ àárín. A dábàá ìrànlọ́wọ́ oníṣègùn.', 'severity-moderate'),
-            'severe': ('Ìbànújẹ́ Púpọ̀', 'Àwọn àmì rẹ fi hàn pé o ní ìbànújẹ́ púpọ̀. Jọ̀wọ́ wá ìrànlọ́wọ́ oníṣègùn lẹ́sẹ̀kẹsẹ̀.', 'severity-severe')
-        },
-        'Igbo': {
-            'minimal': ('Nweda Mmụọ Nta', 'Ọrịa gị na-egosi na ị nwere nweda mmụọ nta ma ọ bụ ọ dịghị. Gaa n\'ihu na-elekọta onwe gị!', 'severity-low'),
-            'mild': ('Nweda Mmụọ Mfe', 'Ọrịa gị na-egosi na ị nwere nweda mmụọ mfe. Chee maka ịgwa dọkịta.', 'severity-mild'),
-            'moderate': ('Nweda Mmụọ N\'etiti', 'Ọrịa gị na-egosi na ị nwere nweda mmụọ n\'etiti. Anyị na-atụ aro enyemaka ọkachamara.', 'severity-moderate'),
-            'severe': ('Nweda Mmụọ Ukwuu', 'Ọrịa gị na-egosi na ị nwere nweda mmụọ ukwuu. Biko chọọ enyemaka ọkachamara ozugbo.', 'severity-severe')
-        },
-        'Hausa': {
-            'minimal': ('Rashin Kwarin Hankalin Dan Kadan', 'Alamomin ka na nuna rashin kwarin hankali na ƙasa. Ci gaba da kula da kanka!', 'severity-low'),
-            'mild': ('Rashin Kwarin Hankalin Sau-Sau', 'Alamomin ka na nuna rashin kwarin hankali sau-sau. Ka yi tunani ka yi magana da likita.', 'severity-mild'),
-            'moderate': ('Rashin Kwarin Hankalin Matsakaici', 'Alamomin ka na nuna rashin kwarin hankali matsakaici. Ana ba da shawarar neman taimako na likita.', 'severity-moderate'),
-            'severe': ('Rashin Kwarin Hankalin Gaske', 'Alamomin ka na nuna rashin kwarin hankali mai tsanani. Don Allah nemi taimakon likita nan take.', 'severity-severe')
-        }
-    }
-    
-    lang_info = severity_info.get(language, severity_info['English'])
-    return lang_info.get(severity, lang_info['minimal'])
+def get_storage_path(backend: str) -> str:
+    """Where the response store lives for a backend"""
+    default_path = os.path.join('data', 'phq9_responses.db' if backend == 'sqlite' else 'phq9_responses.jsonl')
+    return os.getenv('PHQ9_STORAGE_PATH', default_path)
+
+def get_analytics_path() -> Optional[str]:
+    """SQLite response store the analytics read, or None if responses go elsewhere"""
+    shared = backend_from_env()
+    if shared is not None:
+        return shared.responses_path
+    if os.getenv('PHQ9_STORAGE_BACKEND', 'sqlite') != 'sqlite':
+        return None
+    return get_storage_path('sqlite')
 
-def save_response_data(responses: Dict, total_score: int, language: str):
-    """Save response data (in a real app, this would save to a database)"""
-    timestamp = datetime.datetime.now().isoformat()
-    data = {
-        'timestamp': timestamp,
-        'language': language,
-        'responses': responses,
-        'total_score': total_score,
-        'severity': get_severity_level(total_score)
-    }
-    # In a real application, save this to a secure database
-    # For demo, we'll just store in session state
+@st.cache_resource
+def get_response_writer() -> Optional[BatchingWriter]:
+    """Background writer persisting completed screenings; None when storage is disabled"""
+    backend = os.getenv('PHQ9_STORAGE_BACKEND', 'sqlite')
+    if backend == 'none':
+        return None
+    # Workers behind a load balancer write to the shared backend instead of a local file
+    shared = backend_from_env()
+    store = shared.response_store() if shared is not None else create_store(backend, get_storage_path(backend))
+    return BatchingWriter(
+        store,
+        max_queue=int(os.getenv('PHQ9_STORAGE_QUEUE_SIZE', '10000')),
+        batch_size=int(os.getenv('PHQ9_STORAGE_BATCH_SIZE', '200')),
+        flush_interval=float(os.getenv('PHQ9_STORAGE_FLUSH_SECONDS', '0.5'))
+    )
+
+def save_response_data(assessment: Assessment):
+    """Save a completed assessment to the session and queue it for durable storage"""
     if 'saved_responses' not in st.session_state:
         st.session_state.saved_responses = []
-    st.session_state.saved_responses.append(data)
+    st.session_state.saved_responses.append(assessment)
+    
+    # Written in batches by a background thread, so this never waits on disk
+    writer = get_response_writer()
+    if writer is not None:
+        writer.submit(assessment.to_record())
+
+@st.cache_resource
+def get_session_store():
+    """Shared session snapshots for non-sticky load balancing; None when sessions are sticky"""
+    backend = backend_from_env()
+    if backend is None or os.getenv('PHQ9_STICKY_SESSIONS', '1') == '1':
+        return None
+    return backend.session_store()
+
+def session_snapshot() -> str:
+    """The part of the session needed to resume it on another worker"""
+    assessment = st.session_state.assessment
+    return json.dumps({
+        'page': st.session_state.current_page,
+        'language': st.session_state.language,
+        'question': st.session_state.current_question,
+        'responses': sorted(st.session_state.responses.items()),
+        'assessment': assessment.to_json() if assessment is not None else None,
+    }, separators=(',', ':'), ensure_ascii=False)
+
+def resume_token_ttl() -> float:
+    return float(os.getenv('PHQ9_SESSION_RESUME_TTL_SECONDS', '900'))
+
+def restore_shared_session():
+    """Redeem the resume token in the URL and reload its session, once per session.
+
+    The URL only ever holds a single-use token: redeeming it swaps in a fresh
+    one, and the session id itself never leaves the server.
+    """
+    store = get_session_store()
+    if store is None or st.session_state.get('shared_session_restored'):
+        return
+    st.session_state.shared_session_restored = True
+    token = st.query_params.get('resume')
+    session_id = redeem_resume_token(store, token) if token else None
+    if session_id is not None:
+        st.session_state.session_id = session_id
+    st.session_state.resume_token = issue_resume_token(store, st.session_state.session_id, resume_token_ttl())
+    st.query_params['resume'] = st.session_state.resume_token
+    snapshot = store.load(session_id) if session_id is not None else None
+    if snapshot is None:
+        return
+    data = json.loads(snapshot)
+    st.session_state.current_page = data['page']
+    st.session_state.language = data['language']
+    st.session_state.current_question = data['question']
+    st.session_state.responses = {int(i): score for i, score in data['responses']}
+    st.session_state.assessment = Assessment.from_json(data['assessment']) if data['assessment'] else None
+    st.session_state.shared_session_snapshot = snapshot
+
+def save_shared_session():
+    """Store the session snapshot if it changed since the last save, keeping the resume token alive"""
+    store = get_session_store()
+    if store is None:
+        return
+    snapshot = session_snapshot()
+    if snapshot != st.session_state.get('shared_session_snapshot'):
+        session_id = st.session_state.session_id
+        store.save(session_id, snapshot, float(os.getenv('PHQ9_SESSION_TTL_SECONDS', '86400')))
+        issue_resume_token(store, session_id, resume_token_ttl(), token=st.session_state.get('resume_token'))
+        st.session_state.shared_session_snapshot = snapshot
+
+# Set while main() runs; each session's script runs in its own thread
+_full_run = threading.local()
+
+def save_fragment_session():
+    """Save from the end of a fragment, but only on its own reruns; a full run saves once, at the end of main()"""
+    if not getattr(_full_run, 'active', False):
+        save_shared_session()
 
 def show_language_selector():
     """Display language selector"""
+    # Listing languages reads only the catalog directory; a language is loaded when first selected
     languages = list(TRANSLATIONS.keys())
     selected_lang = st.selectbox(
         "🌐 Language / Langue / Èdè / Asụsụ / Harshe",
@@ -558,12 +264,18 @@ def show_language_selector():
         st.session_state.language = selected_lang
         st.rerun()
 
+@fragment
+@measure('home')
 def show_home_page():
-    """Display the home page"""
+    """Display the home page.
+
+    A fragment: the Home / About / Resources buttons rerun only this region,
+    not the sidebar and footer.
+    """
     t = TRANSLATIONS[st.session_state.language]
     
-    st.markdown(f'<h1 class="title-header">{t["title"]}</h1>', unsafe_allow_html=True)
-    st.markdown(f'<p class="subtitle">{t["subtitle"]}</p>', unsafe_allow_html=True)
+    show_markup(f'<h1 class="title-header">{t["title"]}</h1>', unsafe_allow_html=True)
+    show_markup(f'<p class="subtitle">{t["subtitle"]}</p>', unsafe_allow_html=True)
     
     # Navigation menu
     col1, col2, col3, col4 = st.columns(4)
@@ -580,12 +292,12 @@ def show_home_page():
         if st.button("🔄 Reset", key="nav_reset"):
             # Reset all session state
             for key in list(st.session_state.keys()):
-                if key not in ['language']:
+                if key not in ['language', 'session_id', 'shared_session_restored', 'resume_token']:
                     del st.session_state[key]
             st.session_state.current_page = 'home'
             st.session_state.responses = {}
             st.session_state.current_question = 0
-            st.session_state.total_score = 0
+            st.session_state.assessment = None
             st.rerun()
     
     # Main content based on current page
@@ -595,39 +307,15 @@ def show_home_page():
         show_about_page(t)
     elif st.session_state.current_page == 'resources':
         show_resources_page(t)
+    # Fragment reruns skip main(), which saves the session otherwise
+    save_fragment_session()
 
 def show_main_home_content(t):
     """Show main home page content"""
-    st.markdown("""
-    <div class="question-card">
-        <h3>🧠 Professional Mental Health Assessment</h3>
-        <p>The PHQ-9 is a widely used, validated tool for screening depression. It takes just a few minutes to complete and provides valuable insights into your mental health.</p>
-        
-        <h4>✨ What makes this tool special:</h4>
-        <ul>
-            <li>🤖 AI-powered analysis and personalized recommendations</li>
-            <li>🌍 Multi-language support (English, French, Yoruba, Igbo, Hausa)</li>
-            <li>🔒 Complete privacy and data security</li>
-            <li>📱 Mobile-optimized experience</li>
-            <li>💡 Educational resources and support information</li>
-        </ul>
-        
-        <h4>🎯 This assessment is for you if:</h4>
-        <ul>
-            <li>You're experiencing changes in mood or energy</li>
-            <li>You want to monitor your mental health</li>
-            <li>Your healthcare provider recommended a depression screening</li>
-            <li>You're seeking professional guidance on your mental wellness</li>
-        </ul>
-    </div>
-    """, unsafe_allow_html=True)
+    show_fragment('home')
     
     # Encouragement message
-    st.markdown(f"""
-    <div class="encouragement-box">
-        💚 Taking care of your mental health is just as important as taking care of your physical health. You're taking a positive step by being here.
-    </div>
-    """, unsafe_allow_html=True)
+    show_fragment('home_encouragement')
     
     # Start button
     col1, col2, col3 = st.columns([1,2,1])
@@ -636,98 +324,36 @@ def show_main_home_content(t):
             st.session_state.current_page = 'questionnaire'
             st.session_state.current_question = 0
             st.session_state.responses = {}
-            st.session_state.total_score = 0
+            st.session_state.assessment = None
             st.rerun()
 
 def show_about_page(t):
     """Show about page"""
-    st.markdown("""
-    <div class="question-card">
-        <h3>📋 About the PHQ-9 Assessment</h3>
-        
-        <h4>What is PHQ-9?</h4>
-        <p>The Patient Health Questionnaire-9 (PHQ-9) is a multipurpose instrument for screening, diagnosing, monitoring and measuring the severity of depression. It's one of the most validated tools in mental health screening.</p>
-        
-        <h4>🎯 How it works:</h4>
-        <ul>
-            <li><strong>9 Questions:</strong> Based on the 9 DSM-IV criteria for depression</li>
-            <li><strong>4-Point Scale:</strong> From "not at all" to "nearly every day"</li>
-            <li><strong>Score Range:</strong> 0-27 points total</li>
-            <li><strong>Severity Levels:</strong> Minimal (0-4), Mild (5-9), Moderate (10-14), Severe (15-27)</li>
-        </ul>
-        
-        <h4>🤖 AI Enhancement:</h4>
-        <p>Our tool uses advanced AI to provide personalized insights and recommendations based on your responses, making the assessment more meaningful and actionable.</p>
-        
-        <h4>🌍 Accessibility:</h4>
-        <p>Available in multiple languages to serve diverse communities and ensure everyone can access mental health screening in their preferred language.</p>
-        
-        <h4>⚠️ Important Notes:</h4>
-        <ul>
-            <li>This tool is for screening purposes only</li>
-            <li>It does not replace professional medical diagnosis</li>
-            <li>Always consult with healthcare providers for proper evaluation</li>
-            <li>If you're in crisis, seek immediate help</li>
-        </ul>
-    </div>
-    """, unsafe_allow_html=True)
+    show_fragment('about')
 
 def show_resources_page(t):
     """Show resources page"""
-    st.markdown("""
-    <div class="question-card">
-        <h3>📚 Mental Health Resources</h3>
-        
-        <h4>🚨 Crisis Resources:</h4>
-        <ul>
-            <li><strong>National Suicide Prevention Lifeline:</strong> 988 (US)</li>
-            <li><strong>Crisis Text Line:</strong> Text HOME to 741741</li>
-            <li><strong>International Association for Suicide Prevention:</strong> <a href="https://www.iasp.info/resources/Crisis_Centres/">Find local crisis centers</a></li>
-        </ul>
-        
-        <h4>🏥 Professional Help:</h4>
-        <ul>
-            <li>Talk to your primary care physician</li>
-            <li>Contact a mental health professional</li>
-            <li>Reach out to your local community health center</li>
-            <li>Consider online therapy platforms (BetterHelp, Talkspace, etc.)</li>
-        </ul>
-        
-        <h4>💪 Self-Care Strategies:</h4>
-        <ul>
-            <li><strong>Exercise:</strong> Regular physical activity can improve mood</li>
-            <li><strong>Sleep:</strong> Maintain consistent sleep schedules</li>
-            <li><strong>Nutrition:</strong> Eat balanced, nutritious meals</li>
-            <li><strong>Social Connection:</strong> Stay connected with friends and family</li>
-            <li><strong>Mindfulness:</strong> Practice meditation or deep breathing</li>
-            <li><strong>Hobbies:</strong> Engage in activities you enjoy</li>
-        </ul>
-        
-        <h4>📖 Educational Resources:</h4>
-        <ul>
-            <li><a href="https://www.nimh.nih.gov/health/topics/depression">National Institute of Mental Health - Depression</a></li>
-            <li><a href="https://www.who.int/news-room/fact-sheets/detail/depression">World Health Organization - Depression Facts</a></li>
-            <li><a href="https://www.nami.org/About-Mental-Illness/Mental-Health-Conditions/Depression">NAMI - Depression Information</a></li>
-        </ul>
-        
-        <h4>📱 Mental Health Apps:</h4>
-        <ul>
-            <li><strong>Mood tracking:</strong> Daylio, Moodpath</li>
-            <li><strong>Meditation:</strong> Headspace, Calm</li>
-            <li><strong>Therapy:</strong> BetterHelp, Talkspace</li>
-            <li><strong>Crisis support:</strong> Crisis Text Line app</li>
-        </ul>
-    </div>
-    """, unsafe_allow_html=True)
+    show_fragment('resources')
+
+def go_to_question(step: int):
+    """Back / Next callback; runs before the rerun the click triggers, so no second rerun is needed"""
+    st.session_state.current_question += step
 
+@fragment
+@measure('questionnaire')
+@traced()
 def show_questionnaire():
-    """Display the PHQ-9 questionnaire"""
+    """Display the PHQ-9 questionnaire.
+
+    A fragment: answering and paging rerun only the question, not the rest of
+    the page.
+    """
     t = TRANSLATIONS[st.session_state.language]
     current_q = st.session_state.current_question
     
     # Progress bar
     progress = (current_q + 1) / len(t['questions'])
-    st.markdown(f"""
+    show_markup(f"""
     <div class="progress-bar">
         <div class="progress-fill" style="width: {progress * 100}%"></div>
     </div>
@@ -738,24 +364,16 @@ def show_questionnaire():
     
     # Show encouragement messages at specific points
     if current_q == 2:
-        st.markdown(f'<div class="encouragement-box">{t["encouragement_1"]}</div>', unsafe_allow_html=True)
+        show_markup(f'<div class="encouragement-box">{t["encouragement_1"]}</div>', unsafe_allow_html=True)
     elif current_q == 5:
-        st.markdown(f'<div class="encouragement-box">{t["encouragement_2"]}</div>', unsafe_allow_html=True)
+        show_markup(f'<div class="encouragement-box">{t["encouragement_2"]}</div>', unsafe_allow_html=True)
     elif current_q == 8:
-        st.markdown(f'<div class="encouragement-box">{t["encouragement_3"]}</div>', unsafe_allow_html=True)
+        show_markup(f'<div class="encouragement-box">{t["encouragement_3"]}</div>', unsafe_allow_html=True)
     
     # Question card
-    question_header = {
-        'English': 'Over the last 2 weeks, how often have you been bothered by:',
-        'French': 'Au cours des 2 dernières semaines, à quelle fréquence avez-vous été gêné(e) par:',
-        'Yoruba': 'Ni ọsẹ meji sẹyin, igba melo ni o ti ni wahala pẹlu:',
-        'Igbo': 'N\'ime izu abụọ gara aga, ugboro ole ka ihe ndị a na-ewe gị oge:',
-        'Hausa': 'A cikin sati biyu da suka wuce, sau nawa lamurran nan suka damu ka:'
-    }
-    
-    st.markdown(f"""
+    show_markup(f"""
     <div class="question-card">
-        <h3>{question_header.get(st.session_state.language, question_header['English'])}</h3>
+        <h3>{get_question_header(st.session_state.language)}</h3>
         <h2 style="color: #4682B4; margin: 1.5rem 0;">{t['questions'][current_q]}</h2>
     </div>
     """, unsafe_allow_html=True)
@@ -777,39 +395,83 @@ def show_questionnaire():
     
     with col1:
         if current_q > 0:
-            if st.button(f"⬅️ {t['back_button']}", key="back_btn"):
-                st.session_state.current_question -= 1
-                st.rerun()
+            st.button(f"⬅️ {t['back_button']}", key="back_btn", on_click=go_to_question, args=(-1,))
     
     with col3:
         if current_q < len(t['questions']) - 1:
-            if st.button(f"{t['next_button']} ➡️", key="next_btn"):
-                st.session_state.current_question += 1
-                st.rerun()
+            st.button(f"{t['next_button']} ➡️", key="next_btn", on_click=go_to_question, args=(1,))
         else:
             if st.button(f"✅ {t['submit_button']}", key="submit_btn"):
-                # Calculate total score
-                st.session_state.total_score = sum(st.session_state.responses.values())
-                
-                # Save response data
-                save_response_data(st.session_state.responses, st.session_state.total_score, st.session_state.language)
-                
-                # Move to results page
-                st.session_state.current_page = 'results'
-                st.rerun()
+                complete_assessment(st.session_state.responses)
+    
+    save_fragment_session()
 
+@traced()
+def show_questionnaire_form():
+    """Display all nine questions in one form that is submitted once.
+
+    Answering and scrolling happen in the browser, so a whole screening costs
+    a single rerun instead of two per question. The question cards are
+    pre-rendered per language in content.py.
+    """
+    t = TRANSLATIONS[st.session_state.language]
+    cards = get_question_cards(st.session_state.language)
+    labels = get_option_labels(st.session_state.language)
+    
+    with st.form("questionnaire_form"):
+        answers = {}
+        for i, card in enumerate(cards):
+            show_markup(card, unsafe_allow_html=True)
+            answers[i] = st.radio(
+                "Select your answer:",
+                options=range(len(labels)),
+                format_func=labels.__getitem__,
+                key=f"form_question_{i}",
+                index=st.session_state.responses.get(i, 0)
+            )
+        submitted = st.form_submit_button(
+            f"✅ {t['submit_button']}", key="form_submit_btn", use_container_width=True
+        )
+    
+    if submitted:
+        complete_assessment(answers)
+
+def complete_assessment(responses: Dict):
+    """Score the submitted answers, persist them and move to the results page"""
+    st.session_state.responses = dict(responses)
+    
+    # Freeze the answers; the total and severity are computed once here
+    assessment = Assessment.from_responses(st.session_state.responses, st.session_state.language)
+    st.session_state.assessment = assessment
+    
+    # Save response data
+    save_response_data(assessment)
+    
+    # Start the AI analysis now so it overlaps with rendering the results page
+    submit_ai_analysis(assessment.responses, assessment.total_score, st.session_state.language)
+    
+    # Move to results page
+    st.session_state.current_page = 'results'
+    st.rerun()
+
+@traced()
 def show_results():
     """Display the assessment results"""
     t = TRANSLATIONS[st.session_state.language]
-    score = st.session_state.total_score
+    assessment = st.session_state.assessment
+    if assessment is None:
+        st.session_state.current_page = 'home'
+        st.rerun()
+    score = assessment.total_score
+    responses = assessment.responses
     
     # Get severity information
     severity_title, severity_desc, severity_class = get_severity_info(score, st.session_state.language)
     
-    st.markdown(f'<h1 class="title-header">{t["result_title"]}</h1>', unsafe_allow_html=True)
+    show_markup(f'<h1 class="title-header">{t["result_title"]}</h1>', unsafe_allow_html=True)
     
     # Score display
-    st.markdown(f"""
+    show_markup(f"""
     <div class="result-card {severity_class}">
         <h2>{t.get('score_display', 'Your PHQ-9 Score')}: {score}/27</h2>
         <h3>{severity_title}</h3>
@@ -818,34 +480,32 @@ def show_results():
     """, unsafe_allow_html=True)
     
     # AI Analysis section
-    st.markdown(f'<h2 style="text-align: center; color: #4682B4; margin: 2rem 0;">{t["ai_analysis"]}</h2>', unsafe_allow_html=True)
-    
-    with st.spinner(t.get('analyzing', '🤖 AI is analyzing your responses...')):
-        ai_analysis = get_ai_analysis(st.session_state.responses, score, st.session_state.language)
+    show_markup(f'<h2 style="text-align: center; color: #4682B4; margin: 2rem 0;">{t["ai_analysis"]}</h2>', unsafe_allow_html=True)
     
-    st.markdown(f"""
-    <div class="question-card">
-        <h3>🧠 {t.get('personalized_analysis', 'Personalized Analysis')}</h3>
-        <p style="font-size: 1.2rem; line-height: 1.8; font-weight: 500; color: #2C3E50; background: #f8f9fa; padding: 1.5rem; border-radius: 8px; margin: 1rem 0;">{ai_analysis}</p>
-    </div>
-    """, unsafe_allow_html=True)
+    # The analysis runs on the worker pool; until it resolves, its card refreshes itself
+    ai_job = get_ai_analysis_job(responses, score, st.session_state.language)
+    ai_pending = ai_job_pending(ai_job)
+    if ai_pending:
+        show_pending_ai_analysis()
+    else:
+        show_ai_analysis_card(st.empty(), t, *ai_job_result(ai_job, score))
     
     # Detailed breakdown
-    st.markdown(f"""
+    show_markup(f"""
     <div class="question-card">
         <h3>📊 {t.get('response_breakdown', 'Response Breakdown')}</h3>
     """, unsafe_allow_html=True)
     
     # Show response summary
-    for i, response in st.session_state.responses.items():
+    for i, response in responses.items():
         question = t['questions'][i]
         answer = t['options'][response]
-        st.markdown(f"<p><strong>Q{i+1}:</strong> {question[:50]}... → <span style='color: #4682B4;'>{answer} ({response} {t.get('points', 'pts')})</span></p>", unsafe_allow_html=True)
+        show_markup(f"<p><strong>Q{i+1}:</strong> {question[:50]}... → <span style='color: #4682B4;'>{answer} ({response} {t.get('points', 'pts')})</span></p>", unsafe_allow_html=True)
     
-    st.markdown("</div>", unsafe_allow_html=True)
+    show_markup("</div>", unsafe_allow_html=True)
     
     # Professional recommendations
-    st.markdown(f"""
+    show_markup(f"""
     <div class="question-card">
         <h3>🩺 {t.get('professional_recommendations', 'Professional Recommendations')}</h3>
         {get_professional_recommendations(score, st.session_state.language)}
@@ -860,7 +520,7 @@ def show_results():
             st.session_state.current_page = 'questionnaire'
             st.session_state.current_question = 0
             st.session_state.responses = {}
-            st.session_state.total_score = 0
+            st.session_state.assessment = None
             st.rerun()
     
     with col2:
@@ -873,217 +533,169 @@ def show_results():
             st.session_state.current_page = 'home'
             st.rerun()
 
-def get_professional_recommendations(score: int, language: str) -> str:
-    """Get professional recommendations based on score"""
-    severity = get_severity_level(score)
-    
-    recommendations = {
-        'English': {
-            'minimal': """
-                <ul>
-                    <li>✅ Continue your current self-care practices</li>
-                    <li>🏃‍♂️ Maintain regular exercise and healthy sleep</li>
-                    <li>👥 Stay connected with friends and family</li>
-                    <li>📊 Consider periodic mental health check-ins</li>
-                    <li>🚨 Be aware of warning signs and seek help if symptoms worsen</li>
-                </ul>
-            """,
-            'mild': """
-                <ul>
-                    <li>👨‍⚕️ Consider discussing your feelings with a healthcare provider</li>
-                    <li>🧘‍♀️ Try stress management techniques (meditation, yoga)</li>
-                    <li>💬 Consider counseling or therapy as a preventive measure</li>
-                    <li>📱 Use mood tracking apps to monitor your mental health</li>
-                    <li>🏃‍♂️ Increase physical activity and social engagement</li>
-                </ul>
-            """,
-            'moderate': """
-                <ul>
-                    <li>🚨 <strong>Seek professional help from a mental health provider</strong></li>
-                    <li>👨‍⚕️ Schedule an appointment with your primary care doctor</li>
-                    <li>💊 Discuss treatment options including therapy and medication</li>
-                    <li>👥 Consider joining a support group</li>
-                    <li>🏠 Inform trusted family members or friends about your condition</li>
-                </ul>
-            """,
-            'severe': """
-                <ul>
-                    <li>🚨 <strong>SEEK IMMEDIATE PROFESSIONAL HELP</strong></li>
-                    <li>📞 Contact your doctor or mental health professional TODAY</li>
-                    <li>🆘 If having thoughts of self-harm, call a crisis helpline immediately</li>
-                    <li>👥 Don't isolate yourself - reach out to trusted people</li>
-                    <li>💊 Discuss comprehensive treatment options urgently</li>
-                    <li>🏥 Consider intensive outpatient or inpatient treatment</li>
-                </ul>
-            """
-        },
-        'French': {
-            'minimal': """
-                <ul>
-                    <li>✅ Continuez vos pratiques actuelles de soins personnels</li>
-                    <li>🏃‍♂️ Maintenez un exercice régulier et un sommeil sain</li>
-                    <li>👥 Restez connecté avec vos amis et votre famille</li>
-                    <li>📊 Considérez des contrôles périodiques de santé mentale</li>
-                </ul>
-            """,
-            'mild': """
-                <ul>
-                    <li>👨‍⚕️ Considérez discuter de vos sentiments avec un professionnel de santé</li>
-                    <li>🧘‍♀️ Essayez des techniques de gestion du stress</li>
-                    <li>💬 Considérez le counseling comme mesure préventive</li>
-                </ul>
-            """,
-            'moderate': """
-                <ul>
-                    <li>🚨 <strong>Cherchez l'aide professionnelle d'un prestataire de santé mentale</strong></li>
-                    <li>👨‍⚕️ Planifiez un rendez-vous avec votre médecin</li>
-                    <li>💊 Discutez des options de traitement</li>
-                </ul>
-            """,
-            'severe': """
-                <ul>
-                    <li>🚨 <strong>CHERCHEZ IMMÉDIATEMENT L'AIDE PROFESSIONNELLE</strong></li>
-                    <li>📞 Contactez votre médecin AUJOURD'HUI</li>
-                    <li>🆘 Si vous avez des pensées d'auto-blessure, appelez une ligne d'écoute</li>
-                </ul>
-            """
-        },
-        'Yoruba': {
-            'minimal': """
-                <ul>
-                    <li>✅ Tẹ̀síwájú pẹ̀lú ìtọ́jú ara rẹ</li>
-                    <li>🏃‍♂️ Ṣetọju adaṣe deede ati oorun to dara</li>
-                    <li>👥 Ṣe asopọ pẹlu awọn ọrẹ ati ẹbi</li>
-                    <li>📊 Ronu nipa awọn ayẹwo ilera ọpọlọ igba diẹ</li>
-                </ul>
-            """,
-            'mild': """
-                <ul>
-                    <li>👨‍⚕️ Ronu lati ba oníṣègùn rẹ sọrọ nipa awọn ẹdun rẹ</li>
-                    <li>🧘‍♀️ Gbiyanju awọn ilana iṣakoso stress (meditation, yoga)</li>
-                    <li>💬 Ronu nipa itọju tabi imọran gẹgẹbi igbese idena</li>
-                </ul>
-            """,
-            'moderate': """
-                <ul>
-                    <li>🚨 <strong>Wa iranlọwọ ọjọgbọn lati ọdọ olupese ilera ọpọlọ</strong></li>
-                    <li>👨‍⚕️ Ṣeto ipade pẹlu dokita akọkọ rẹ</li>
-                    <li>💊 Jiroro lori awọn aṣayan itọju pẹlu itọju ati oogun</li>
-                </ul>
-            """,
-            'severe': """
-                <ul>
-                    <li>🚨 <strong>WA HELP ỌJỌ́MẸTA</strong></li>
-                    <li>📞 Pe dokita rẹ tabi ọjọgbọn ilera ọpọlọ LỌ́JỌ́</li>
-                    <li>🆘 Ti o ba ni awọn ero ti ara ẹni, pe ila iranlọwọ pajawiri lẹsẹkẹsẹ</li>
-                </ul>
-            """
-        },
-        'Igbo': {
-            'minimal': """
-                <ul>
-                    <li>✅ Gaa n'ihu na-elekọta onwe gị</li>
-                    <li>🏃‍♂️ Nwee omume ọma na ụra kwesịrị ekwesị</li>
-                    <li>👥 Nọgidenụ na mmekọrịta na ndị enyi na ezinụlọ</li>
-                    <li>📊 Chee echiche banyere nyocha ahụike uche oge niile</li>
-                </ul>
-            """,
-            'mild': """
-                <ul>
-                    <li>👨‍⚕️ Chee echiche ịgwa dọkịta gị okwu banyere mmetụta gị</li>
-                    <li>🧘‍♀️ Gbalịa usoro njikwa nrụgide (meditation, yoga)</li>
-                    <li>💬 Chee echiche banyere ọgwụgwọ ma ọ bụ ndụmọdụ dịka usoro nchebe</li>
-                </ul>
-            """,
-            'moderate': """
-                <ul>
-                    <li>🚨 Chọọ enyemaka ọkachamara site n'aka onye na-ahụ maka ahụike uche</li>
-                    <li>👨‍⚕️ Hazie oge ịkpọtụrụ dọkịta gị</li>
-                    <li>💊 Kparịta ụka banyere nhọrọ ọgwụgwọ gụnyere ọgwụgwọ na ọgwụ</li>
-                </ul>
-            """,
-            'severe': """
-                <ul>
-                    <li>🚨 CHỌTA ENYEMAKA ỌJỌ́MẸTA</li>
-                    <li>📞 Kpọtụrụ dọkịta gị ma ọ bụ onye na-ahụ maka ahụike uche TAA</li>
-                    <li>🆘 Ọ bụrụ na ịnwe echiche imebi onwe gị, kpọọ nọmba enyemaka ozugbo</li>
-                </ul>
-            """
-        },
-        'Hausa': {
-            'minimal': """
-                <ul>
-                    <li>✅ Ci gaba da kula da kanka kamar yadda kake yi yanzu</li>
-                    <li>🏃‍♂️ Ci gaba da motsa jiki akai-akai da barci mai kyau</li>
-                    <li>👥 Kasance tare da abokai da dangi</li>
-                    <li>📊 Yi la'akari da duba lafiyar kwakwalwa lokaci-lokaci</li>
-                </ul>
-            """,
-            'mild': """
-                <ul>
-                    <li>👨‍⚕️ Yi la'akari da tattaunawa da mai ba da lafiya game da yadda kake ji</li>
-                    <li>🧘‍♀️ Gwada hanyoyin sarrafa damuwa (yin tunani, yoga)</li>
-                    <li>💬 Yi la'akari da shawarar ko magani a matsayin matakin kariya</li>
-                </ul>
-            """,
-            'moderate': """
-                <ul>
-                    <li>🚨 Nemi taimako daga mai ba da lafiya na kwakwalwa</li>
-                    <li>👨‍⚕️ Tsara ganawa da likitanka na farko</li>
-                    <li>💊 Tattauna hanyoyin magani ciki har da magani da magani</li>
-                </ul>
-            """,
-            'severe': """
-                <ul>
-                    <li>🚨 NEMI Taimako NAN TAKE</li>
-                    <li>📞 Tuntuɓi likitanka ko ƙwararren lafiya yau</li>
-                    <li>🆘 Idan kana da tunanin cutar da kanka, kira layin taimako nan take</li>
-                </ul>
-            """
-        }
-    }
-    
-    lang_recs = recommendations.get(language, recommendations['English'])
-    return lang_recs.get(severity, lang_recs['minimal'])
+    if ai_pending and not hasattr(st, 'fragment'):
+        # Older Streamlit: poll by rerunning the whole page
+        time.sleep(AI_POLL_SECONDS)
+        st.rerun()
+
+def ai_job_pending(ai_job: Dict) -> bool:
+    """True while the analysis runs and the results page is still willing to wait for it"""
+    return not ai_job['future'].done() and time.monotonic() < ai_job['deadline']
+
+def ai_job_result(ai_job: Dict, total_score: int):
+    """(analysis, warning) of a finished job, or the fallback once the wait has run out"""
+    if ai_job['future'].done():
+        return ai_job['future'].result()
+    return (get_fallback_analysis(total_score, st.session_state.language),
+            "⚠️ AI analysis is taking longer than expected. Using fallback analysis.")
+
+@polling_fragment
+def show_pending_ai_analysis():
+    """The AI card while its analysis runs, polled every AI_POLL_SECONDS.
+
+    Each run only reads what has arrived so far - the streamed text, or the
+    fallback until the first chunk - so it never blocks the script thread.
+    Once the job finishes or the wait runs out, a full rerun draws the final
+    card and the polling stops with it.
+    """
+    ai_job = st.session_state.get('ai_job')
+    if ai_job is None or st.session_state.assessment is None:
+        return
+    if not ai_job_pending(ai_job):
+        st.rerun()
+    t = TRANSLATIONS[st.session_state.language]
+    partial_text = ai_job['stream'].text() if ai_job['stream'] is not None else ''
+    show_ai_analysis_card(
+        st.empty(), t,
+        partial_text or get_fallback_analysis(st.session_state.assessment.total_score, st.session_state.language),
+        pending=True
+    )
+
+def show_ai_analysis_card(placeholder, t: Dict, analysis: str, warning: Optional[str] = None, pending: bool = False):
+    """Render the personalized analysis card into its placeholder"""
+    with placeholder.container():
+        # Each distinct warning is shown once per session rather than on every rerun
+        shown_warnings = st.session_state.setdefault('shown_ai_warnings', set())
+        if warning and warning not in shown_warnings:
+            shown_warnings.add(warning)
+            st.warning(warning)
+        if pending:
+            st.caption(t.get('analyzing', '🤖 AI is analyzing your responses...'))
+        show_markup(f"""
+        <div class="question-card">
+            <h3>🧠 {t.get('personalized_analysis', 'Personalized Analysis')}</h3>
+            <p style="font-size: 1.2rem; line-height: 1.8; font-weight: 500; color: #2C3E50; background: #f8f9fa; padding: 1.5rem; border-radius: 8px; margin: 1rem 0;">{analysis}</p>
+        </div>
+        """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_metrics_exporter() -> Optional[FileExporter]:
+    """Periodic Prometheus text file export, if PHQ9_METRICS_FILE is set"""
+    return file_exporter_from_env(tracer)
+
+def show_admin_panel():
+    """Live timings and AI service counters for operators (PHQ9_ADMIN_PANEL=1)"""
+    with st.expander("📊 Performance", expanded=False):
+        if not tracer.enabled:
+            st.caption("Tracing is off. Set PHQ9_TRACING=1 to collect timings.")
+        st.button("🔄 Refresh", key="admin_refresh", use_container_width=True)
+        timings = tracer.summaries()
+        if timings:
+            st.dataframe(timings, hide_index=True, use_container_width=True)
+        counters = tracer.counters()
+        if counters:
+            st.dataframe(counters, hide_index=True, use_container_width=True)
+        service = get_analysis_service()
+        st.json({
+            'cache': service.cache.stats(),
+            'single_flight': service.flights.stats(),
+            'circuit_breaker': service.breaker.snapshot(),
+            'backend': service.backend_stats(),
+        }, expanded=False)
+
+ANALYTICS_WINDOWS = {'Last 7 days': 7, 'Last 30 days': 30, 'Last 90 days': 90, 'All time': None}
+
+def show_analytics_panel():
+    """Score, severity and item-9 dashboards from the response store's rollups"""
+    with st.expander("📈 Analytics", expanded=False):
+        path = get_analytics_path()
+        if path is None:
+            st.caption("Analytics need the SQLite storage backend.")
+            return
+        if not os.path.exists(path):
+            st.caption("No screenings stored yet.")
+            return
+        window = st.selectbox("Window", list(ANALYTICS_WINDOWS), key="analytics_window")
+        days = ANALYTICS_WINDOWS[window]
+        summary = load_summary(path, start=days_ago(days) if days else None)
+        if not summary['assessments']:
+            st.caption("No screenings in this window.")
+            return
+        col1, col2 = st.columns(2)
+        col1.metric("Screenings", summary['assessments'])
+        col2.metric("Item 9 positive", f"{summary['item9_positive_rate']:.1%}")
+        st.caption("Total score distribution")
+        st.bar_chart(summary['score_distribution'])
+        st.caption("Severity by language")
+        st.dataframe(summary['severity_by_language'], use_container_width=True)
+        st.caption("Item means")
+        st.bar_chart({f'Q{i + 1}': mean for i, mean in enumerate(summary['item_means'])})
+        st.caption("Item 9 positive rate by day")
+        st.line_chart({row['day']: row['item9_positive_rate'] for row in summary['daily']})
+
+@measure('app')
+@traced()
 def main():
     """Main application function"""
+    _full_run.active = True
+    try:
+        run_app()
+    finally:
+        _full_run.active = False
+
+def run_app():
+    """One full run of the page"""
+    get_metrics_exporter()
+    # Without sticky sessions, pick up a session another worker was serving and
+    # save the state left by the previous interaction before this one changes it
+    restore_shared_session()
+    save_shared_session()
+    tracer.count('page_renders', page=st.session_state.current_page)
+
     # Language selector in sidebar
     with st.sidebar:
-        st.markdown("### 🌐 Select Language")
+        show_markup("### 🌐 Select Language")
         show_language_selector()
         
-        st.markdown("---")
-        st.markdown("### ℹ️ Quick Info")
-        st.markdown("""
-        - **Time:** 3-5 minutes
-        - **Questions:** 9 total
-        - **Privacy:** Fully secure
-        - **Languages:** 5 supported
-        """)
+        show_markup("---")
+        show_markup("### ℹ️ Quick Info")
+        show_fragment('quick_info', unsafe_allow_html=False)
         
-        st.markdown("---")
+        show_markup("---")
         if st.button("🆘 Crisis Resources", use_container_width=True):
             st.session_state.current_page = 'resources'
             st.rerun()
+
+        if os.getenv('PHQ9_ADMIN_PANEL', '0') == '1':
+            show_markup("---")
+            show_admin_panel()
+            show_analytics_panel()
     
     # Main content routing
     if st.session_state.current_page == 'questionnaire':
-        show_questionnaire()
+        if os.getenv('PHQ9_QUESTIONNAIRE_MODE', 'paged') == 'form':
+            show_questionnaire_form()
+        else:
+            show_questionnaire()
     elif st.session_state.current_page == 'results':
         show_results()
     else:
         show_home_page()
     
     # Footer
-    t = TRANSLATIONS[st.session_state.language]
-    st.markdown(f"""
-    <div class="footer">
-        <p>{t['privacy_note']}</p>
-        <p>⚠️ <strong>Disclaimer:</strong> This tool is for screening purposes only and does not replace professional medical advice, diagnosis, or treatment.</p>
-        <p>🏆 <em>Innovation in AI Medicine Competition Entry</em></p>
-    </div>
-    """, unsafe_allow_html=True)
+    show_fragment('footer')
+    
+    save_shared_session()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""Compact, immutable record of a completed PHQ-9 assessment.
+
+The nine answers (0-3 each) are packed two bits apiece into a single int,
+and the total score and severity are computed once at construction. Records
+use __slots__, pickle to a small tuple, and serialize to a short JSON object
+or a binary form: a 13-byte header (answers, timestamp, name length) followed
+by the UTF-8 language name, 20 bytes in all for English.
+"""
+
+import datetime
+import json
+import struct
+import time
+from typing import Dict, Mapping, Optional, Tuple
+
+from scoring import MAX_ITEM_SCORE, NUM_ITEMS, get_severity_level
+
+_BITS_PER_ITEM = 2
+_ITEM_MASK = (1 << _BITS_PER_ITEM) - 1
+# packed answers (uint32), timestamp (float64), language length (uint8)
+_HEADER = struct.Struct('<IdB')
+
+
+def pack_responses(responses: Mapping[int, int]) -> int:
+    """Pack {question_index: score} for all nine items into one integer"""
+    packed = 0
+    for i in range(NUM_ITEMS):
+        score = responses[i]
+        if not 0 <= score <= MAX_ITEM_SCORE:
+            raise ValueError(f"Answer to question {i + 1} must be between 0 and {MAX_ITEM_SCORE}, got {score}")
+        packed |= int(score) << (i * _BITS_PER_ITEM)
+    return packed
+
+
+def unpack_responses(packed: int) -> Tuple[int, ...]:
+    """Answers in question order"""
+    return tuple((packed >> (i * _BITS_PER_ITEM)) & _ITEM_MASK for i in range(NUM_ITEMS))
+
+
+class Assessment:
+    """A completed questionnaire; instances are frozen"""
+
+    __slots__ = ('packed', 'language', 'timestamp', 'total_score', 'severity')
+
+    def __init__(self, packed: int, language: str, timestamp: Optional[float] = None):
+        if not 0 <= packed < 1 << (NUM_ITEMS * _BITS_PER_ITEM):
+            raise ValueError(f"Packed answers out of range: {packed}")
+        total = sum(unpack_responses(packed))
+        set_field = object.__setattr__
+        set_field(self, 'packed', packed)
+        set_field(self, 'language', language)
+        set_field(self, 'timestamp', time.time() if timestamp is None else timestamp)
+        set_field(self, 'total_score', total)
+        set_field(self, 'severity', get_severity_level(total))
+
+    @classmethod
+    def from_responses(cls, responses: Mapping[int, int], language: str,
+                       timestamp: Optional[float] = None) -> 'Assessment':
+        return cls(pack_responses(responses), language, timestamp)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return (type(self), (self.packed, self.language, self.timestamp))
+
+    def __eq__(self, other):
+        if not isinstance(other, Assessment):
+            return NotImplemented
+        return (self.packed, self.language, self.timestamp) == (other.packed, other.language, other.timestamp)
+
+    def __hash__(self):
+        return hash((self.packed, self.language, self.timestamp))
+
+    def __repr__(self):
+        return (f"Assessment(answers={list(self.answers)}, total_score={self.total_score}, "
+                f"severity={self.severity!r}, language={self.language!r})")
+
+    @property
+    def answers(self) -> Tuple[int, ...]:
+        return unpack_responses(self.packed)
+
+    @property
+    def responses(self) -> Dict[int, int]:
+        """Answers as the {question_index: score} dict used by the UI and AI prompt"""
+        return dict(enumerate(self.answers))
+
+    @property
+    def item9_positive(self) -> bool:
+        return self.answers[NUM_ITEMS - 1] > 0
+
+    def to_bytes(self) -> bytes:
+        language = self.language.encode('utf-8')
+        return _HEADER.pack(self.packed, self.timestamp, len(language)) + language
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Assessment':
+        packed, timestamp, length = _HEADER.unpack_from(data)
+        language = data[_HEADER.size:_HEADER.size + length].decode('utf-8')
+        return cls(packed, language, timestamp)
+
+    def to_json(self) -> str:
+        return json.dumps({'a': self.packed, 'l': self.language, 't': self.timestamp},
+                          separators=(',', ':'), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text: str) -> 'Assessment':
+        data = json.loads(text)
+        return cls(data['a'], data['l'], data['t'])
+
+    def to_record(self) -> Dict:
+        """Expanded form used by the response store"""
+        return {
+            'timestamp': datetime.datetime.fromtimestamp(self.timestamp).isoformat(),
+            'language': self.language,
+            'responses': self.responses,
+            'total_score': self.total_score,
+            'severity': self.severity,
+        }
@@ -0,0 +1,137 @@
+"""Micro-batching of concurrent calls.
+
+A MicroBatcher collects items submitted from many threads and hands them to
+one batch function together. A batch is dispatched when it holds max_batch
+items or when ``window`` seconds have passed since its first item, whichever
+comes first, so a lone request waits at most one window. Each submit()
+returns a Future for that item's own result; the batch function returns one
+result per item, and an Exception in that list fails only its own item.
+
+Up to ``concurrency`` batches run at once. While every slot is busy, new
+items keep queueing, so the next batch fills up instead of waiting a window:
+batches grow with the load.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Groups concurrent submits into batches and runs up to ``concurrency`` of them at once"""
+
+    def __init__(self, fn: Callable[[List], Sequence], max_batch: int = 8, window: float = 0.02,
+                 name: str = 'batch', concurrency: int = 1):
+        if max_batch < 1 or concurrency < 1:
+            raise ValueError("max_batch and concurrency must be at least 1")
+        self.fn = fn
+        self.max_batch = max_batch
+        self.window = window
+        self.name = name
+        self.concurrency = concurrency
+        self._queue: 'queue.Queue' = queue.Queue()
+        self._slots = threading.Semaphore(concurrency)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item) -> Future:
+        """Queue an item for the next batch; the Future resolves to its result"""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.concurrency,
+                                                        thread_name_prefix=f'phq9-{self.name}-batch')
+                    self._thread = threading.Thread(target=self._run, name=f'phq9-{self.name}-batcher', daemon=True)
+                    self._thread.start()
+        future: Future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def stats(self) -> dict:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': self.items / self.batches if self.batches else None,
+            'queued': self._queue.qsize(),
+        }
+
+    def close(self):
+        """Stop the dispatcher after the batches already queued"""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._executor.shutdown(wait=True)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            # Wait for a free slot first: items arriving meanwhile make the next batch bigger
+            self._slots.acquire()
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.window
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stop = True
+                    break
+                batch.append(entry)
+            self._executor.submit(self._dispatch, batch)
+            if stop:
+                return
+
+    def _dispatch(self, batch: List[Tuple[object, Future, float]]):
+        try:
+            self._run_batch(batch)
+        finally:
+            self._slots.release()
+
+    def _run_batch(self, batch: List[Tuple[object, Future, float]]):
+        # Callers that timed out and cancelled their Future are left out of the batch
+        live = [(item, future, queued) for item, future, queued in batch if future.set_running_or_notify_cancel()]
+        if not live:
+            return
+        started = time.perf_counter()
+        with self._lock:
+            self.batches += 1
+            self.items += len(live)
+        tracer.observe('batch_size', len(live), batcher=self.name)
+        for _, _, queued in live:
+            tracer.observe('batch_wait_seconds', started - queued, batcher=self.name)
+        try:
+            results = list(self.fn([item for item, _, _ in live]))
+            if len(results) != len(live):
+                raise ValueError(f"{self.name} batch returned {len(results)} results for {len(live)} items")
+        except BaseException as e:
+            logger.warning("%s batch of %d failed: %s", self.name, len(live), e)
+            for _, future, _ in live:
+                future.set_exception(e)
+            return
+        finally:
+            tracer.observe('batch_seconds', time.perf_counter() - started, batcher=self.name)
+        for (_, future, _), result in zip(live, results):
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,166 @@
+"""Throughput of each AI analysis backend.
+
+For every backend and concurrency level, that many client threads call the
+backend's model with distinct prompts - rendered from random answer vectors,
+so neither the analysis cache nor single-flight coalescing hides any work -
+and the run reports analyses per second, latency percentiles and, for
+micro-batched backends, the mean batch size. Backends:
+- stub: StubBackend with --stub-latency per call
+- gemini: GeminiRegistry against fake_gemini.py, started in-process with --gemini-latency
+- gemini-batched: the same behind BatchedBackend (--batch-size, --batch-window-ms,
+  --batch-concurrency), so several analyses share one API call; the fake server
+  adds --gemini-batch-item-latency per extra item. Both gemini backends also
+  report analyses per upstream call, i.e. per unit of request quota
+- local: LocalBackend on --local-model (needs torch and transformers); model
+  loading and a warm-up call happen before timing
+
+Usage:
+    python benchmarks/backends.py --backends stub,gemini --concurrency 1,4,16 --requests 64 -o backends.json
+    python benchmarks/backends.py --backends gemini,gemini-batched --batch-size 8 --batch-window-ms 20 \\
+        --concurrency 1,16,64 --requests 256 --gemini-latency 1.0 --gemini-batch-item-latency 0.05
+    python benchmarks/backends.py --backends local --local-model models/qwen2.5-0.5b-instruct \\
+        --concurrency 1,4,8 --requests 32 --local-max-batch 8 --local-window-ms 25
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import numpy as np  # noqa: E402
+
+from analysis_backends import BatchedBackend, LocalBackend, StubBackend  # noqa: E402
+from content import TRANSLATIONS  # noqa: E402
+from fake_gemini import FakeGeminiConfig, start_server  # noqa: E402
+from flow import distribution, git_revision  # noqa: E402
+from gemini_client import DEFAULT_MODEL_NAME, GeminiRegistry  # noqa: E402
+from prompts import get_prompt_template  # noqa: E402
+from scoring import NUM_ITEMS  # noqa: E402
+
+BACKENDS = ('stub', 'gemini', 'gemini-batched', 'local')
+
+
+def make_prompts(count: int, seed: int = 0) -> List[str]:
+    """Distinct prompts over random answer vectors and all languages"""
+    template = get_prompt_template()
+    languages = list(TRANSLATIONS)
+    rows = np.random.default_rng(seed).integers(0, 4, size=(count, NUM_ITEMS)).tolist()
+    return [template.render(dict(enumerate(row)), sum(row), languages[i % len(languages)])
+            for i, row in enumerate(rows)]
+
+
+def build_backend(name: str, args):
+    """(backend, fake server config or None)"""
+    if name == 'stub':
+        return StubBackend(latency=args.stub_latency), None
+    if name.startswith('gemini'):
+        config = FakeGeminiConfig(latency=args.gemini_latency, jitter=args.gemini_jitter,
+                                  batch_item_latency=args.gemini_batch_item_latency)
+        server = start_server(config)
+        endpoint = f'http://127.0.0.1:{server.server_address[1]}'
+        backend = GeminiRegistry(lambda: 'benchmark', DEFAULT_MODEL_NAME, api_endpoint=endpoint)
+        if name == 'gemini-batched':
+            backend = BatchedBackend(backend, max_batch=args.batch_size, window=args.batch_window_ms / 1000,
+                                     concurrency=args.batch_concurrency)
+        return backend, config
+    if args.local_model is None:
+        raise SystemExit("--local-model is required for the local backend")
+    return LocalBackend(args.local_model, max_batch=args.local_max_batch, window=args.local_window_ms / 1000,
+                        max_new_tokens=args.local_max_new_tokens, threads=args.local_threads), None
+
+
+def run_level(model, prompts: List[str], concurrency: int, timeout: float) -> Dict:
+    def call(prompt: str) -> float:
+        started = time.perf_counter()
+        model.generate_content(prompt, request_options={'timeout': timeout})
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(call, prompts))
+    elapsed = time.perf_counter() - started
+    return dict(distribution(latencies), mean=statistics.fmean(latencies), elapsed_s=elapsed,
+                requests=len(prompts), per_s=len(prompts) / elapsed)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Throughput of the AI analysis backends")
+    parser.add_argument('--backends', default='stub,gemini', help="Comma-separated: stub, gemini, gemini-batched, local (default stub,gemini)")
+    parser.add_argument('--concurrency', default='1,4,16', help="Comma-separated client thread counts (default 1,4,16)")
+    parser.add_argument('--requests', type=int, default=64, help="Prompts per concurrency level (default 64)")
+    parser.add_argument('--timeout', type=float, default=120.0, help="Per-call timeout in seconds (default 120)")
+    parser.add_argument('--stub-latency', type=float, default=0.05, help="Stub seconds per call (default 0.05)")
+    parser.add_argument('--gemini-latency', type=float, default=0.5, help="Fake Gemini latency (default 0.5s)")
+    parser.add_argument('--gemini-jitter', type=float, default=0.0, help="Fake Gemini jitter (default 0)")
+    parser.add_argument('--gemini-batch-item-latency', type=float, default=0.05,
+                        help="Fake Gemini extra seconds per additional batched item (default 0.05)")
+    parser.add_argument('--batch-size', type=int, default=4, help="gemini-batched: prompts per call (default 4)")
+    parser.add_argument('--batch-window-ms', type=float, default=50.0, help="gemini-batched: window (default 50ms)")
+    parser.add_argument('--batch-concurrency', type=int, default=8,
+                        help="gemini-batched: calls in flight at once (default 8)")
+    parser.add_argument('--local-model', help="Model directory or hub id for the local backend")
+    parser.add_argument('--local-max-batch', type=int, default=8, help="Local micro-batch size (default 8)")
+    parser.add_argument('--local-window-ms', type=float, default=25.0, help="Local batching window (default 25ms)")
+    parser.add_argument('--local-max-new-tokens', type=int, default=128, help="Local tokens per analysis (default 128)")
+    parser.add_argument('--local-threads', type=int, help="torch CPU threads (default: torch's choice)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.backends.split(',') if name.strip()]
+    unknown = [name for name in names if name not in BACKENDS]
+    if unknown:
+        parser.error(f"Unknown backends: {', '.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    results = {}
+    for name in names:
+        backend, server_config = build_backend(name, args)
+        model = backend.get_model()
+        # Warm-up: SDK configuration, model loading, first-call allocations
+        model.generate_content(make_prompts(1, seed=args.seed + 999)[0], request_options={'timeout': args.timeout})
+        batcher = getattr(backend, 'batcher', None)
+        results[name] = {'model_name': backend.model_name, 'levels': {}}
+        for level in levels:
+            before = batcher.stats() if batcher else None
+            calls_before = server_config.snapshot()['requests'] if server_config else None
+            result = run_level(model, make_prompts(args.requests, seed=args.seed + level), level, args.timeout)
+            if server_config:
+                calls = server_config.snapshot()['requests'] - calls_before
+                result['upstream_calls'] = calls
+                result['analyses_per_call'] = result['requests'] / calls if calls else None
+            if batcher:
+                after = batcher.stats()
+                batches = after['batches'] - before['batches']
+                result['mean_batch_size'] = (after['items'] - before['items']) / batches if batches else None
+            results[name]['levels'][str(level)] = result
+            batch_note = f"  batch {result['mean_batch_size']:.1f}" if result.get('mean_batch_size') else ''
+            if result.get('analyses_per_call'):
+                batch_note += f"  {result['analyses_per_call']:.1f} analyses/call"
+            print(f"{name:14s} x{level:<4d} {result['per_s']:8.2f}/s  p50 {result['median']:.3f}s  "
+                  f"p90 {result['p90']:.3f}s{batch_note}", file=sys.stderr)
+
+    text = json.dumps({
+        'benchmark': 'backends',
+        'python': sys.version.split()[0],
+        'revision': git_revision(),
+        'requests': args.requests,
+        'current': results,
+    }, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Compare two benchmark result files and flag regressions.
+
+Works on the JSON written by startup.py, flow.py and micro.py. Every numeric
+leaf under "current" is matched by path; for timing and memory figures a
+higher number is worse. Lines whose change exceeds --threshold percent are
+marked, and the exit status is 1 if any of them got worse, so this can gate
+CI.
+
+Usage:
+    python benchmarks/compare.py before.json after.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, Iterator, Tuple
+
+# Only these leaves are compared; counts such as model_calls are informational
+COMPARED_SUFFIXES = ('median', 'median_ns', 'p90')
+
+
+def numeric_leaves(node, path: str = '') -> Iterator[Tuple[str, float]]:
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from numeric_leaves(value, f'{path}.{key}' if path else key)
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        yield path, float(node)
+
+
+def compared(results: Dict) -> Dict[str, float]:
+    leaves = dict(numeric_leaves(results.get('current', {})))
+    steps = {path: value for path, value in leaves.items() if '.steps.' in f'.{path}'}
+    selected = {path: value for path, value in leaves.items() if path.rsplit('.', 1)[-1] in COMPARED_SUFFIXES}
+    selected.update(steps)
+    return selected
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark JSON files")
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help="Percent change treated as significant (default 10)")
+    args = parser.parse_args(argv)
+
+    with open(args.before) as f:
+        before_results = json.load(f)
+    with open(args.after) as f:
+        after_results = json.load(f)
+    before, after = compared(before_results), compared(after_results)
+
+    print(f"before: {before_results.get('revision', '?')}  after: {after_results.get('revision', '?')}")
+    regressions = 0
+    for path in sorted(before.keys() & after.keys()):
+        old, new = before[path], after[path]
+        change = (new - old) / old * 100 if old else 0.0
+        marker = ''
+        if change > args.threshold:
+            marker = '  REGRESSION'
+            regressions += 1
+        elif change < -args.threshold:
+            marker = '  improved'
+        print(f"{path:60s} {old:14.6g} -> {new:14.6g} {change:+8.1f}%{marker}")
+    for path in sorted(before.keys() ^ after.keys()):
+        print(f"{path:60s} only in {'before' if path in before else 'after'}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
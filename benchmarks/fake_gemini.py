@@ -0,0 +1,194 @@
+"""Local fake of the Gemini REST API for load tests.
+
+Serves generateContent and streamGenerateContent for any model, with
+configurable latency, jitter and error injection (429 and 500 responses in
+the API's JSON error format, so the SDK raises its usual exceptions). Point
+the app at it with GEMINI_API_ENDPOINT=http://127.0.0.1:<port>. GET /stats
+returns request, stream, error and concurrency counters as JSON.
+
+A multi-prompt request from the app's batching backend (see
+analysis_backends.combine_prompts) is answered with a JSON array holding one
+{"id", "answer"} object per request, and takes --batch-item-latency longer per extra item
+to model the longer output.
+
+Usage:
+    python benchmarks/fake_gemini.py --port 8089 --latency 0.8 --error-rate 0.05
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+# Opening tag of each prompt in a batched request (combine_prompts); the body JSON-escapes its quotes
+BATCH_ITEM = re.compile(r'<request id=\\"(\d+)\\">')
+
+ANALYSIS_TEXT = (
+    "Your responses suggest symptoms worth discussing with a healthcare provider. "
+    "This screening is not a diagnosis; a professional evaluation can confirm the picture "
+    "and help you plan next steps such as regular routines, support and follow-up."
+)
+
+
+class FakeGeminiConfig:
+    def __init__(self, latency: float = 0.5, jitter: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_share: float = 0.5, chunks: int = 4, seed: Optional[int] = None,
+                 batch_item_latency: float = 0.0):
+        self.latency = latency
+        self.batch_item_latency = batch_item_latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        # Share of injected errors that are 429s; the rest are 500s
+        self.rate_limit_share = rate_limit_share
+        self.chunks = chunks
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {'requests': 0, 'streams': 0, 'errors_429': 0, 'errors_500': 0, 'in_flight': 0,
+                         'max_in_flight': 0, 'batched_requests': 0, 'batched_items': 0}
+
+    def delay(self) -> float:
+        with self.lock:
+            return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    def pick_error(self) -> Optional[int]:
+        with self.lock:
+            if self.random.random() >= self.error_rate:
+                return None
+            return 429 if self.random.random() < self.rate_limit_share else 500
+
+    def count(self, name: str, amount: int = 1):
+        with self.lock:
+            self.counters[name] += amount
+            if name == 'in_flight':
+                self.counters['max_in_flight'] = max(self.counters['max_in_flight'], self.counters['in_flight'])
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.counters)
+
+
+def _candidate(text: str, finished: bool) -> Dict:
+    candidate = {'content': {'parts': [{'text': text}], 'role': 'model'}, 'index': 0}
+    if finished:
+        candidate['finishReason'] = 'STOP'
+    return {'candidates': [candidate]}
+
+
+def _error_body(status: int) -> bytes:
+    names = {429: 'RESOURCE_EXHAUSTED', 500: 'INTERNAL'}
+    return json.dumps({'error': {'code': status, 'message': 'Injected by fake Gemini server',
+                                 'status': names[status]}}).encode()
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config: FakeGeminiConfig = FakeGeminiConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = 'application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlparse(self.path).path == '/stats':
+            self._send(200, json.dumps(self.config.snapshot()).encode())
+        else:
+            self._send(404, _error_body(500))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8', 'replace')
+        url = urlparse(self.path)
+        streaming = url.path.endswith(':streamGenerateContent')
+        if not (streaming or url.path.endswith(':generateContent')):
+            self._send(404, _error_body(500))
+            return
+
+        config = self.config
+        config.count('requests')
+        config.count('in_flight')
+        try:
+            delay = config.delay()
+            ids = [int(i) for i in BATCH_ITEM.findall(body)]
+            items = len(ids)
+            if items > 1:
+                config.count('batched_requests')
+                config.count('batched_items', items)
+                delay += config.batch_item_latency * (items - 1)
+            error = config.pick_error()
+            if error is not None:
+                time.sleep(delay / 4)
+                config.count(f'errors_{error}')
+                self._send(error, _error_body(error))
+            elif streaming:
+                config.count('streams')
+                self._stream(delay, sse='alt=sse' in url.query)
+            else:
+                time.sleep(delay)
+                text = json.dumps([{'id': i, 'answer': ANALYSIS_TEXT} for i in ids]) if items > 1 else ANALYSIS_TEXT
+                self._send(200, json.dumps(_candidate(text, True)).encode())
+        finally:
+            config.count('in_flight', -1)
+
+    def _stream(self, delay: float, sse: bool):
+        words = ANALYSIS_TEXT.split(' ')
+        size = -(-len(words) // self.config.chunks)
+        parts = [' '.join(words[i:i + size]) + ' ' for i in range(0, len(words), size)]
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream' if sse else 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for i, part in enumerate(parts):
+            time.sleep(delay / len(parts))
+            payload = json.dumps(_candidate(part, i == len(parts) - 1))
+            if sse:
+                data = f'data: {payload}\r\n\r\n'
+            else:
+                data = ('[' if i == 0 else ',') + payload + (']' if i == len(parts) - 1 else '')
+            encoded = data.encode()
+            self.wfile.write(f'{len(encoded):x}\r\n'.encode() + encoded + b'\r\n')
+            self.wfile.flush()
+        self.wfile.write(b'0\r\n\r\n')
+
+
+def start_server(config: FakeGeminiConfig, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """Serve in a background thread; the bound port is server.server_address[1]"""
+    handler = type('ConfiguredFakeGeminiHandler', (FakeGeminiHandler,), {'config': config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-gemini', daemon=True).start()
+    return server
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run a fake Gemini REST server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.5, help="Seconds per response (default 0.5)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Uniform +/- jitter in seconds (default 0)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests that fail (default 0)")
+    parser.add_argument('--batch-item-latency', type=float, default=0.0,
+                        help="Extra seconds per additional item in a batched request (default 0)")
+    args = parser.parse_args(argv)
+    config = FakeGeminiConfig(args.latency, args.jitter, args.error_rate, batch_item_latency=args.batch_item_latency)
+    server = start_server(config, args.host, args.port)
+    print(f"Fake Gemini API on http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
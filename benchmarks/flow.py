@@ -0,0 +1,143 @@
+"""End-to-end benchmark of one screening through the Streamlit app.
+
+Each sample runs in a fresh interpreter that installs a stub Gemini model
+(see stub_genai.py) with the given latency, then drives app.py headlessly
+with AppTest: home -> start -> nine answers -> results. Reported per tree:
+- import_s: time to import Streamlit's headless test runner
+- steps: latency of every rerun, by step name (home, start, answer_1, next_1, ..., submit)
+- rerun_s: distribution of all rerun latencies in the flow
+- flow_s: wall time of the whole flow
+- max_rss_mb: peak resident memory of the process
+- model_calls: calls that reached the stub model
+
+Pass --baseline <git ref> to run the same flow against that revision.
+
+Usage:
+    python benchmarks/flow.py --runs 5 --latency 0.5 -o flow.json
+    python benchmarks/flow.py --runs 5 --baseline HEAD~3
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+
+from startup import REPO_ROOT, export_revision, git_revision, run_probe
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+FLOW_PROBE = """
+import json, os, resource, sys, time
+sys.path.insert(0, os.environ['PHQ9_BENCH_DIR'])
+import stub_genai
+stub_genai.install(float(os.environ['PHQ9_BENCH_LATENCY']))
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+import_s = time.perf_counter() - t0
+
+answers = json.loads(os.environ['PHQ9_BENCH_ANSWERS'])
+at = AppTest.from_file('app.py', default_timeout=300)
+steps = []
+
+def step(name, action):
+    start = time.perf_counter()
+    action()
+    steps.append([name, time.perf_counter() - start])
+    if at.exception:
+        raise SystemExit(f'{name}: {at.exception[0].message}')
+
+flow_start = time.perf_counter()
+step('home', at.run)
+step('start', lambda: at.button(key='start_assessment').click().run())
+for q, answer in enumerate(answers):
+    step(f'answer_{q + 1}', lambda: at.radio(key=f'question_{q}').set_value(answer).run())
+    last = q == len(answers) - 1
+    step('submit' if last else f'next_{q + 1}',
+         lambda: at.button(key='submit_btn' if last else 'next_btn').click().run())
+flow_s = time.perf_counter() - flow_start
+
+print(json.dumps({
+    'import_s': import_s,
+    'flow_s': flow_s,
+    'steps': steps,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'model_calls': stub_genai.StubModel.calls,
+}))
+"""
+
+
+def distribution(values) -> dict:
+    ordered = sorted(values)
+    return {
+        'median': statistics.median(ordered),
+        'p90': ordered[min(len(ordered) - 1, int(0.9 * len(ordered)))],
+        'min': ordered[0],
+        'max': ordered[-1],
+    }
+
+
+def measure(tree: str, runs: int, latency: float, answers) -> dict:
+    env = {
+        'PHQ9_BENCH_DIR': BENCH_DIR,
+        'PHQ9_BENCH_LATENCY': str(latency),
+        'PHQ9_BENCH_ANSWERS': json.dumps(answers),
+        'GEMINI_API_KEY': 'benchmark',
+        'PHQ9_AI_RATE_PER_SECOND': '0',
+    }
+    samples = [run_probe(FLOW_PROBE, tree, env) for _ in range(runs)]
+    step_names = [name for name, _ in samples[0]['steps']]
+    per_step = {name: [] for name in step_names}
+    reruns = []
+    for sample in samples:
+        for name, seconds in sample['steps']:
+            per_step[name].append(seconds)
+            reruns.append(seconds)
+    return {
+        'import_s': distribution([sample['import_s'] for sample in samples]),
+        'flow_s': distribution([sample['flow_s'] for sample in samples]),
+        'rerun_s': distribution(reruns),
+        'max_rss_mb': distribution([sample['max_rss_mb'] for sample in samples]),
+        'model_calls': samples[0]['model_calls'],
+        'steps': {name: statistics.median(values) for name, values in per_step.items()},
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the full screening flow through AppTest")
+    parser.add_argument('--runs', type=int, default=3, help="Fresh-interpreter samples per tree (default 3)")
+    parser.add_argument('--latency', type=float, default=0.5, help="Stub model latency in seconds (default 0.5)")
+    parser.add_argument('--answers', default='1,2,0,1,3,0,1,2,0',
+                        help="Nine comma-separated answers to submit (default 1,2,0,1,3,0,1,2,0)")
+    parser.add_argument('--baseline', help="Git ref to measure for comparison, e.g. HEAD~1")
+    parser.add_argument('-o', '--output', help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    answers = [int(answer) for answer in args.answers.split(',')]
+    if len(answers) != 9 or not all(0 <= answer <= 3 for answer in answers):
+        parser.error("--answers needs nine values between 0 and 3")
+
+    results = {
+        'benchmark': 'flow',
+        'python': sys.version.split()[0],
+        'revision': git_revision(),
+        'runs': args.runs,
+        'latency_s': args.latency,
+        'current': measure(REPO_ROOT, args.runs, args.latency, answers),
+    }
+    if args.baseline:
+        with tempfile.TemporaryDirectory() as tree:
+            export_revision(args.baseline, tree)
+            results['baseline'] = dict(measure(tree, args.runs, args.latency, answers), ref=args.baseline)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,394 @@
+"""Load test for a single `streamlit run app.py` process.
+
+Starts a fake Gemini REST server (fake_gemini.py) and the app in separate
+processes, then drives simulated users through the app over Streamlit's own
+websocket protocol - the same BackMsg/ForwardMsg exchange a browser makes -
+so every click is a real script rerun on the server. Each user opens a
+session, picks a language from the configured mix, starts the
+questionnaire, answers and advances through the nine questions with random
+think times, submits and waits for the results page, then starts over. With
+the app in PHQ9_QUESTIONNAIRE_MODE=form the answers are filled in without
+reruns and sent with the single form submit.
+
+Concurrency is raised in stages (--users 10,50,100,...). For each stage the
+report gives throughput, rerun latency percentiles for questionnaire and
+results pages, errors and AI fallbacks, and the fake server's counters. The
+knee is the first stage whose questionnaire p90 exceeds --degrade-factor
+times the first stage's, or whose throughput stops growing with the load.
+
+Usage:
+    python benchmarks/loadtest.py --users 10,50,100,200 --duration 60 --think-time 1.0 \\
+        --languages English=0.6,French=0.2,Yoruba=0.1,Igbo=0.05,Hausa=0.05 \\
+        --gemini-latency 1.5 --gemini-error-rate 0.02 -o load.json
+    python benchmarks/loadtest.py --url http://127.0.0.1:8501 --users 50   # app already running
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from flow import distribution, git_revision
+from startup import REPO_ROOT
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+LANGUAGES = ('English', 'French', 'Yoruba', 'Igbo', 'Hausa')
+WIDGET_TYPES = ('button', 'radio', 'selectbox')
+
+
+class ScriptError(Exception):
+    """The app rendered an exception instead of the page"""
+
+
+class AppSession:
+    """One browser tab: a websocket session that reruns the script with widget states"""
+
+    def __init__(self, url: str):
+        self.url = url.replace('http://', 'ws://').replace('https://', 'wss://').rstrip('/') + '/_stcore/stream'
+        self.ws = None
+        # user key -> (widget id, widget type, options)
+        self.widgets: Dict[str, Tuple[str, str, List[str]]] = {}
+        # user key -> id of the st.fragment the widget lives in; its events rerun only that fragment
+        self.fragments: Dict[str, str] = {}
+        # widget id -> last value state sent, replayed on every rerun like the browser does
+        self.values: Dict[str, WidgetState] = {}
+        self.alerts: List[str] = []
+        self.texts: List[str] = []
+        # Websocket bytes received for the last rerun
+        self.last_bytes = 0
+
+    async def connect(self):
+        # Tornado ships with Streamlit, so the harness needs no extra client library
+        from tornado.websocket import websocket_connect
+        self.ws = await websocket_connect(self.url, connect_timeout=30, max_message_size=1 << 30)
+
+    async def close(self):
+        if self.ws is not None:
+            self.ws.close()
+
+    async def rerun(self, trigger: Optional[str] = None, set_value: Optional[Tuple[str, int]] = None) -> float:
+        """Send one interaction and wait until the script settles; returns seconds taken"""
+        message = BackMsg()
+        message.rerun_script.query_string = ''
+        if set_value is not None:
+            self.set_value(*set_value)
+        message.rerun_script.widget_states.widgets.extend(self.values.values())
+        if trigger is not None:
+            state = message.rerun_script.widget_states.widgets.add()
+            state.id = self.widgets[trigger][0]
+            state.trigger_value = True
+        source = trigger or (set_value[0] if set_value else None)
+        if source in self.fragments:
+            message.rerun_script.fragment_id = self.fragments[source]
+
+        self.last_bytes = 0
+        started = time.perf_counter()
+        await self.ws.write_message(message.SerializeToString(), binary=True)
+        while True:
+            data = await self.ws.read_message()
+            if data is None:
+                raise ConnectionError("websocket closed by the server")
+            self.last_bytes += len(data)
+            forward = ForwardMsg()
+            forward.ParseFromString(data)
+            kind = forward.WhichOneof('type')
+            if kind == 'new_session':
+                self.widgets, self.fragments, self.alerts, self.texts = {}, {}, [], []
+            elif kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                self._collect(forward.delta.new_element, forward.delta.fragment_id)
+            elif kind == 'script_finished':
+                if forward.script_finished in (ForwardMsg.FINISHED_SUCCESSFULLY,
+                                               ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY):
+                    return time.perf_counter() - started
+                if forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise ScriptError("compile error")
+
+    def set_value(self, key: str, index: int):
+        """Change a widget's value without a rerun, like editing a field inside a form"""
+        widget_id, _, options = self.widgets[key]
+        state = WidgetState(id=widget_id)
+        state.string_value = options[index]
+        self.values[widget_id] = state
+
+    def _collect(self, element, fragment_id: str):
+        element_type = element.WhichOneof('type')
+        if element_type in WIDGET_TYPES:
+            widget = getattr(element, element_type)
+            key = widget.id.rsplit('-', 1)[-1]
+            self.widgets[key] = (widget.id, element_type, list(getattr(widget, 'options', [])))
+            if fragment_id:
+                self.fragments[key] = fragment_id
+            else:
+                self.fragments.pop(key, None)
+        elif element_type == 'exception':
+            raise ScriptError(element.exception.message)
+        elif element_type == 'alert':
+            self.alerts.append(element.alert.body)
+        elif element_type == 'markdown':
+            self.texts.append(element.markdown.body)
+
+
+class StageStats:
+    def __init__(self, users: int):
+        self.users = users
+        self.latencies: Dict[str, List[float]] = {'questionnaire': [], 'results': [], 'navigation': []}
+        self.bytes: Dict[str, List[int]] = {kind: [] for kind in self.latencies}
+        self.flows = 0
+        self.errors = 0
+        self.fallbacks = 0
+        self.error_messages: Dict[str, int] = {}
+
+    def error(self, message: str):
+        self.errors += 1
+        self.error_messages[message] = self.error_messages.get(message, 0) + 1
+
+
+async def simulate_user(url: str, stats: StageStats, stop_at: float, think_time: float,
+                        languages: List[Tuple[str, float]], rng: random.Random):
+    names, weights = zip(*languages)
+
+    async def think():
+        if think_time > 0:
+            await asyncio.sleep(rng.expovariate(1 / think_time))
+
+    async def step(kind: str, session: AppSession, **interaction):
+        stats.latencies[kind].append(await session.rerun(**interaction))
+        stats.bytes[kind].append(session.last_bytes)
+
+    while time.monotonic() < stop_at:
+        session = AppSession(url)
+        try:
+            await session.connect()
+            await step('navigation', session)
+            language = rng.choices(names, weights)[0]
+            if language != 'English':
+                await think()
+                await step('navigation', session, set_value=('lang_selector', LANGUAGES.index(language)))
+            await think()
+            await step('navigation', session, trigger='start_assessment')
+            if 'form_question_0' in session.widgets:
+                # PHQ9_QUESTIONNAIRE_MODE=form: answers stay in the browser until the one submit
+                for question in range(9):
+                    await think()
+                    session.set_value(f'form_question_{question}', rng.randrange(4))
+                await step('results', session, trigger='form_submit_btn')
+            for question in range(9 if 'question_0' in session.widgets else 0):
+                await think()
+                await step('questionnaire', session, set_value=(f'question_{question}', rng.randrange(4)))
+                await think()
+                if question < 8:
+                    await step('questionnaire', session, trigger='next_btn')
+                else:
+                    await step('results', session, trigger='submit_btn')
+            if any('fallback' in alert.lower() for alert in session.alerts):
+                stats.fallbacks += 1
+            stats.flows += 1
+        except Exception as e:
+            stats.error(f'{type(e).__name__}: {str(e)[:120]}')
+            await asyncio.sleep(0.5)
+        finally:
+            try:
+                await session.close()
+            except Exception:
+                pass
+
+
+def fetch_json(url: str) -> Dict:
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return json.loads(response.read())
+
+
+async def run_stage(url: str, users: int, duration: float, think_time: float,
+                    languages: List[Tuple[str, float]], ramp: float, seed: int) -> StageStats:
+    stats = StageStats(users)
+    started = time.monotonic()
+    stop_at = started + duration
+    tasks = []
+    for i in range(users):
+        rng = random.Random(seed * 1_000_003 + i)
+        tasks.append(asyncio.create_task(simulate_user(url, stats, stop_at, think_time, languages, rng)))
+        if ramp:
+            await asyncio.sleep(ramp / users)
+    await asyncio.gather(*tasks)
+    stats.elapsed = time.monotonic() - started
+    return stats
+
+
+def summarize(stats: StageStats, gemini_before: Dict, gemini_after: Dict) -> Dict:
+    reruns = sum(len(values) for values in stats.latencies.values())
+    summary = {
+        'users': stats.users,
+        'elapsed_s': stats.elapsed,
+        'flows': stats.flows,
+        'flows_per_s': stats.flows / stats.elapsed,
+        'reruns': reruns,
+        'reruns_per_s': reruns / stats.elapsed,
+        'errors': stats.errors,
+        'error_messages': stats.error_messages,
+        'ai_fallbacks': stats.fallbacks,
+    }
+    for kind, values in stats.bytes.items():
+        if values:
+            summary[f'{kind}_bytes_per_rerun'] = statistics.fmean(values)
+    for kind, values in stats.latencies.items():
+        if values:
+            ordered = sorted(values)
+            summary[f'{kind}_s'] = dict(distribution(ordered),
+                                        p99=ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))],
+                                        mean=statistics.fmean(ordered), count=len(ordered))
+    if gemini_after:
+        summary['gemini'] = {key: gemini_after[key] - gemini_before.get(key, 0)
+                             for key in ('requests', 'streams', 'errors_429', 'errors_500')}
+        summary['gemini']['max_in_flight'] = gemini_after.get('max_in_flight')
+    return summary
+
+
+def find_knee(stages: List[Dict], degrade_factor: float) -> Optional[Dict]:
+    """First stage where latency or throughput stops scaling with the load"""
+    measured = [stage for stage in stages if 'questionnaire_s' in stage]
+    if len(measured) < 2:
+        return None
+    base_p90 = measured[0]['questionnaire_s']['p90']
+    for previous, stage in zip(measured, measured[1:]):
+        if stage['questionnaire_s']['p90'] > degrade_factor * base_p90:
+            return {'users': stage['users'], 'reason': f"questionnaire p90 above {degrade_factor}x the first stage"}
+        load_growth = stage['users'] / previous['users']
+        if stage['reruns_per_s'] < previous['reruns_per_s'] * (1 + 0.25 * (load_growth - 1)):
+            return {'users': stage['users'], 'reason': "throughput stopped growing with the number of users"}
+        if stage['errors'] > 0.01 * max(1, stage['reruns']):
+            return {'users': stage['users'], 'reason': "more than 1% of reruns failed"}
+    return None
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2):
+                return
+        except OSError:
+            time.sleep(0.25)
+    raise SystemExit(f"Timed out waiting for {url}")
+
+
+def parse_languages(value: str) -> List[Tuple[str, float]]:
+    mix = []
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in LANGUAGES:
+            raise argparse.ArgumentTypeError(f"Unknown language {name!r}; expected one of {', '.join(LANGUAGES)}")
+        mix.append((name, float(weight) if weight else 1.0))
+    return mix
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test one Streamlit app process with simulated users")
+    parser.add_argument('--users', default='10,25,50,100', help="Comma-separated concurrency stages")
+    parser.add_argument('--duration', type=float, default=60.0, help="Seconds per stage (default 60)")
+    parser.add_argument('--ramp', type=float, default=5.0, help="Seconds to start all users of a stage (default 5)")
+    parser.add_argument('--think-time', type=float, default=1.0,
+                        help="Mean think time between interactions in seconds, exponential (default 1)")
+    parser.add_argument('--languages', type=parse_languages, default=parse_languages(','.join(LANGUAGES)),
+                        help="Language mix as Name=weight pairs (default: equal mix of all five)")
+    parser.add_argument('--gemini-latency', type=float, default=1.0, help="Fake Gemini latency (default 1.0s)")
+    parser.add_argument('--gemini-jitter', type=float, default=0.2, help="Fake Gemini jitter (default 0.2s)")
+    parser.add_argument('--gemini-error-rate', type=float, default=0.0, help="Fake Gemini error share (default 0)")
+    parser.add_argument('--url', help="Test an app that is already running instead of starting one")
+    parser.add_argument('--app-env', action='append', default=[], metavar='NAME=VALUE',
+                        help="Extra environment for the app process (repeatable)")
+    parser.add_argument('--degrade-factor', type=float, default=2.0,
+                        help="p90 growth over the first stage that counts as degraded (default 2)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+    stages = [int(users) for users in args.users.split(',')]
+
+    processes = []
+    gemini_stats_url = None
+    url = args.url
+    try:
+        if url is None:
+            gemini_port, app_port = free_port(), free_port()
+            processes.append(subprocess.Popen(
+                [sys.executable, os.path.join(BENCH_DIR, 'fake_gemini.py'), '--port', str(gemini_port),
+                 '--latency', str(args.gemini_latency), '--jitter', str(args.gemini_jitter),
+                 '--error-rate', str(args.gemini_error_rate)],
+                stdout=subprocess.DEVNULL,
+            ))
+            gemini_stats_url = f'http://127.0.0.1:{gemini_port}/stats'
+            env = dict(os.environ, GEMINI_API_KEY='load-test', GEMINI_API_ENDPOINT=f'http://127.0.0.1:{gemini_port}',
+                       PHQ9_STORAGE_BACKEND='none')
+            env.update(item.split('=', 1) for item in args.app_env)
+            processes.append(subprocess.Popen(
+                [sys.executable, '-m', 'streamlit', 'run', 'app.py', '--server.headless', 'true',
+                 '--server.port', str(app_port), '--browser.gatherUsageStats', 'false'],
+                cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            ))
+            url = f'http://127.0.0.1:{app_port}'
+            wait_for(gemini_stats_url)
+        wait_for(url.rstrip('/') + '/_stcore/health')
+
+        results = []
+        for users in stages:
+            before = fetch_json(gemini_stats_url) if gemini_stats_url else {}
+            stats = asyncio.run(run_stage(url, users, args.duration, args.think_time, args.languages,
+                                          args.ramp, args.seed))
+            after = fetch_json(gemini_stats_url) if gemini_stats_url else {}
+            summary = summarize(stats, before, after)
+            results.append(summary)
+            q = summary.get('questionnaire_s', {})
+            r = summary.get('results_s', {})
+            print(f"{users:6d} users  {summary['reruns_per_s']:8.1f} reruns/s  "
+                  f"questionnaire p50/p90/p99 {q.get('median', 0):.3f}/{q.get('p90', 0):.3f}/{q.get('p99', 0):.3f}s  "
+                  f"results p90 {r.get('p90', 0):.2f}s  errors {summary['errors']}", file=sys.stderr)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    report = {
+        'benchmark': 'loadtest',
+        'python': sys.version.split()[0],
+        'revision': git_revision(),
+        'config': {
+            'duration_s': args.duration, 'think_time_s': args.think_time, 'languages': dict(args.languages),
+            'gemini_latency_s': args.gemini_latency, 'gemini_error_rate': args.gemini_error_rate,
+            'app_env': args.app_env,
+        },
+        'stages': results,
+        'knee': find_knee(results, args.degrade_factor),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Microbenchmarks for the per-request helpers.
+
+Each case runs over a fixed batch of inputs covering every score and
+language, repeated --repeat times; the reported figure is nanoseconds per
+call (median and best of the repeats). Run it on two commits and compare the
+JSON files with compare.py.
+
+Usage:
+    python benchmarks/micro.py -o micro.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import timeit
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import numpy as np  # noqa: E402
+
+from ai_analysis import build_analysis_prompt  # noqa: E402
+from analysis_cache import make_cache_key  # noqa: E402
+from assessment import Assessment  # noqa: E402
+from content import TRANSLATIONS, get_professional_recommendations, get_severity_info  # noqa: E402
+from flow import git_revision  # noqa: E402
+from prompts import PROMPT_TEMPLATES, estimate_tokens  # noqa: E402
+from scoring import MAX_TOTAL_SCORE, NUM_ITEMS, get_severity_level, score_matrix  # noqa: E402
+
+LANGUAGES = list(TRANSLATIONS)
+SCORES = range(MAX_TOTAL_SCORE + 1)
+
+
+def _answer_vectors(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return [dict(enumerate(row)) for row in rng.integers(0, 4, size=(count, NUM_ITEMS)).tolist()]
+
+
+def build_cases():
+    """name -> (function running one batch, calls per batch)"""
+    score_language = [(score, language) for score in SCORES for language in LANGUAGES]
+    vectors = _answer_vectors(200)
+    vector_language = [(responses, sum(responses.values()), LANGUAGES[i % len(LANGUAGES)])
+                       for i, responses in enumerate(vectors)]
+    prompts = [build_analysis_prompt(*args) for args in vector_language]
+    matrix = np.random.default_rng(1).integers(0, 4, size=(100_000, NUM_ITEMS)).astype(np.int8)
+
+    def severity_level():
+        for score in SCORES:
+            get_severity_level(score)
+
+    def severity_info():
+        for score, language in score_language:
+            get_severity_info(score, language)
+
+    def recommendations():
+        for score, language in score_language:
+            get_professional_recommendations(score, language)
+
+    def prompt_builder():
+        for responses, total, language in vector_language:
+            build_analysis_prompt(responses, total, language)
+
+    def token_estimate():
+        for prompt in prompts:
+            estimate_tokens(prompt)
+
+    def token_estimate_precomputed():
+        for responses, _, language in vector_language:
+            PROMPT_TEMPLATES['2'].estimate_tokens(responses, language)
+
+    def cache_key():
+        for responses, _, language in vector_language:
+            make_cache_key(responses, language, 'gemini-pro', '1')
+
+    def assessment():
+        for responses, _, language in vector_language:
+            Assessment.from_responses(responses, language)
+
+    def score_matrix_rows():
+        score_matrix(matrix)
+
+    cases = {
+        'get_severity_level': (severity_level, len(SCORES)),
+        'get_severity_info': (severity_info, len(score_language)),
+        'get_professional_recommendations': (recommendations, len(score_language)),
+        'build_analysis_prompt': (prompt_builder, len(vector_language)),
+        'make_cache_key': (cache_key, len(vector_language)),
+        'Assessment.from_responses': (assessment, len(vector_language)),
+        'score_matrix_per_row': (score_matrix_rows, len(matrix)),
+        'estimate_tokens': (token_estimate, len(prompts)),
+        'PromptTemplate.estimate_tokens': (token_estimate_precomputed, len(vector_language)),
+    }
+    for version, template in PROMPT_TEMPLATES.items():
+        def render(template=template):
+            for responses, total, language in vector_language:
+                template.render(responses, total, language)
+        cases[f'prompt_v{version}.render'] = (render, len(vector_language))
+    return cases
+
+
+def run_case(fn, calls: int, repeat: int, min_time: float) -> dict:
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(1, int(number * min_time / elapsed))
+    per_call_ns = [seconds / (number * calls) * 1e9 for seconds in timer.repeat(repeat=repeat, number=number)]
+    return {'median_ns': statistics.median(per_call_ns), 'min_ns': min(per_call_ns), 'calls': number * calls}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmarks for scoring, content and prompt helpers")
+    parser.add_argument('--repeat', type=int, default=5, help="Timing repeats per case (default 5)")
+    parser.add_argument('--min-time', type=float, default=0.2, help="Minimum seconds per repeat (default 0.2)")
+    parser.add_argument('-k', '--filter', help="Only run cases whose name contains this text")
+    parser.add_argument('-o', '--output', help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, (fn, calls) in build_cases().items():
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = run_case(fn, calls, args.repeat, args.min_time)
+        print(f"{name:36s} {results[name]['median_ns']:12.1f} ns/call", file=sys.stderr)
+
+    text = json.dumps({
+        'benchmark': 'micro',
+        'python': sys.version.split()[0],
+        'revision': git_revision(),
+        'repeat': args.repeat,
+        'current': results,
+    }, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
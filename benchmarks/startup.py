@@ -0,0 +1,120 @@
+"""Cold-start benchmark for the Streamlit app.
+
+Every sample runs in a fresh interpreter, so module caches are cold:
+- import_genai_s: time to import google.generativeai on its own
+- import_streamlit_s: time to import Streamlit's headless test runner
+- first_render_s: time for the first headless run of app.py (AppTest), which
+  includes importing everything app.py imports
+- genai_loaded_after_first_render: whether the first render pulled in the SDK
+
+Pass --baseline <git ref> to measure that revision in a temporary checkout
+as well, so before/after numbers come from the same machine and run.
+
+Usage:
+    python benchmarks/startup.py --runs 5 --baseline HEAD~1 -o startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+GENAI_PROBE = """
+import json, time
+t0 = time.perf_counter()
+import google.generativeai
+print(json.dumps({'import_genai_s': time.perf_counter() - t0}))
+"""
+
+APP_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+at = AppTest.from_file('app.py', default_timeout=60)
+at.run()
+t2 = time.perf_counter()
+print(json.dumps({
+    'import_streamlit_s': t1 - t0,
+    'first_render_s': t2 - t1,
+    'genai_loaded_after_first_render': 'google.generativeai' in sys.modules,
+    'exception': bool(at.exception),
+}))
+"""
+
+
+def run_probe(code: str, cwd: str, env: Optional[dict] = None) -> dict:
+    """Run probe code in a fresh interpreter and return the JSON it prints last"""
+    env = dict(os.environ, PHQ9_STORAGE_BACKEND='none', **(env or {}))
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=cwd, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(tree: str, runs: int) -> dict:
+    samples = [dict(run_probe(GENAI_PROBE, tree), **run_probe(APP_PROBE, tree)) for _ in range(runs)]
+    summary = {}
+    for key, value in samples[0].items():
+        if isinstance(value, bool):
+            summary[key] = all(sample[key] for sample in samples)
+        else:
+            values = [sample[key] for sample in samples]
+            summary[key] = {'median': statistics.median(values), 'min': min(values), 'max': max(values)}
+    return summary
+
+
+def export_revision(ref: str, target: str):
+    """Extract the tree at a git ref into target"""
+    archive = subprocess.run(['git', 'archive', ref], cwd=REPO_ROOT, capture_output=True, check=True).stdout
+    subprocess.run(['tar', '-x', '-C', target], input=archive, check=True)
+
+
+def git_revision(tree: str = REPO_ROOT) -> str:
+    """Commit hash of the working tree, with '-dirty' if it has local changes"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=tree, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=tree,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit + ('-dirty' if dirty else '')
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure app import and first-render time")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh-interpreter samples per tree (default 5)")
+    parser.add_argument('--baseline', help="Git ref to measure for comparison, e.g. HEAD~1")
+    parser.add_argument('-o', '--output', help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = {
+        'benchmark': 'startup',
+        'python': sys.version.split()[0],
+        'revision': git_revision(),
+        'runs': args.runs,
+        'current': measure(REPO_ROOT, args.runs),
+    }
+    if args.baseline:
+        with tempfile.TemporaryDirectory() as tree:
+            export_revision(args.baseline, tree)
+            results['baseline'] = dict(measure(tree, args.runs), ref=args.baseline)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
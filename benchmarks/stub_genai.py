@@ -0,0 +1,63 @@
+"""Stand-in for google.generativeai used by the benchmarks.
+
+install() puts a fake module in sys.modules before the app imports the SDK,
+so any revision of app.py - including ones that import it at the top - talks
+to a local model with a fixed latency instead of the network. Streaming calls
+yield a few chunks spread over the same latency.
+"""
+
+import sys
+import time
+import types
+
+STUB_TEXT = (
+    "Your responses suggest symptoms worth discussing with a healthcare provider. "
+    "This screening is not a diagnosis; a professional evaluation can confirm the picture "
+    "and help you plan next steps such as regular routines, support and follow-up."
+)
+
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubModel:
+    latency = 0.0
+    chunks = 4
+    calls = 0
+
+    def __init__(self, model_name: str = 'stub', **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, stream: bool = False, request_options=None, **kwargs):
+        type(self).calls += 1
+        if not stream:
+            time.sleep(self.latency)
+            return _Response(STUB_TEXT)
+        return self._stream()
+
+    def _stream(self):
+        words = STUB_TEXT.split(' ')
+        size = -(-len(words) // self.chunks)
+        for start in range(0, len(words), size):
+            time.sleep(self.latency / self.chunks)
+            yield _Response(' '.join(words[start:start + size]) + ' ')
+
+
+def install(latency: float = 0.0) -> types.ModuleType:
+    """Register the stub as google.generativeai; returns the module"""
+    StubModel.latency = latency
+    module = types.ModuleType('google.generativeai')
+    module.configure = lambda **kwargs: None
+    module.GenerativeModel = StubModel
+    sys.modules['google.generativeai'] = module
+    try:
+        import google
+        google.generativeai = module
+    except ImportError:
+        google = types.ModuleType('google')
+        google.__path__ = []
+        google.generativeai = module
+        sys.modules['google'] = google
+    return module
@@ -0,0 +1,245 @@
+"""Compiled translation catalog.
+
+Localized content is edited as one JSON file per language in locales/ and
+compiled into a single binary catalog:
+
+    magic (8 bytes) | directory length (uint32) | directory JSON | blob
+
+The directory lists every language with the offset and length of its
+section in the blob (itself compact JSON), plus the size and mtime of each
+source file it was built from. The catalog is memory-mapped, so worker
+processes on a host share its pages, and a language's section is only
+decoded the first time that language is used; opening the catalog reads
+just the directory.
+
+open_default_catalog() rebuilds the file when a source has changed, the way
+Python rewrites stale .pyc files, and falls back to an in-memory build when
+the catalog path is not writable.
+
+Usage:
+    python catalog.py validate          # check every language against English
+    python catalog.py build             # validate, then write locales/catalog.bin
+"""
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from string import Template
+from typing import Dict, List, Optional, Tuple
+
+from scoring import MAX_ITEM_SCORE, NUM_ITEMS, SEVERITY_LEVELS
+
+logger = logging.getLogger(__name__)
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'locales')
+CATALOG_FILENAME = 'catalog.bin'
+REFERENCE_LANGUAGE = 'English'
+
+MAGIC = b'PHQ9CAT1'
+_HEADER = struct.Struct('<8sI')
+SEVERITY_FIELDS = ('title', 'description', 'css_class')
+# Placeholders a fallback analysis template may use
+FALLBACK_PLACEHOLDERS = {'total_score'}
+
+
+class CatalogError(Exception):
+    """The catalog file is missing, corrupt or does not match its sources"""
+
+
+def source_files(directory: str) -> List[str]:
+    return sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+
+
+def source_stamps(directory: str) -> Dict[str, List[int]]:
+    """{file name: [mtime_ns, size]} for every source file"""
+    stamps = {}
+    for name in source_files(directory):
+        stat = os.stat(os.path.join(directory, name))
+        stamps[name] = [stat.st_mtime_ns, stat.st_size]
+    return stamps
+
+
+def load_sources(directory: str) -> List[Dict]:
+    """Every language file, in display order"""
+    languages = []
+    for name in source_files(directory):
+        with open(os.path.join(directory, name), encoding='utf-8') as f:
+            languages.append(json.load(f))
+    return sorted(languages, key=lambda data: (data.get('order', len(languages)), data.get('language', '')))
+
+
+def validate_language(data: Dict, reference: Optional[Dict]) -> List[str]:
+    """Problems with one language file; an empty list means it is complete"""
+    errors = []
+    for field in ('language', 'strings', 'question_header', 'severity', 'fallback_analysis', 'recommendations'):
+        if field not in data:
+            errors.append(f"missing {field!r}")
+    if errors:
+        return errors
+
+    strings = data['strings']
+    if reference is not None:
+        missing = [key for key in reference['strings'] if key not in strings]
+        extra = [key for key in strings if key not in reference['strings']]
+        if missing:
+            errors.append(f"strings missing keys: {', '.join(missing)}")
+        if extra:
+            errors.append(f"strings have keys {REFERENCE_LANGUAGE} lacks: {', '.join(extra)}")
+    questions, options = strings.get('questions'), strings.get('options')
+    if not isinstance(questions, list) or len(questions) != NUM_ITEMS:
+        errors.append(f"expected {NUM_ITEMS} questions, found {len(questions) if isinstance(questions, list) else 0}")
+    if not isinstance(options, list) or len(options) != MAX_ITEM_SCORE + 1:
+        errors.append(f"expected {MAX_ITEM_SCORE + 1} options, found {len(options) if isinstance(options, list) else 0}")
+    empty = [key for key, value in strings.items() if isinstance(value, str) and not value.strip()]
+    if empty:
+        errors.append(f"empty strings: {', '.join(empty)}")
+
+    for table in ('severity', 'fallback_analysis', 'recommendations'):
+        missing = [level for level in SEVERITY_LEVELS if level not in data[table]]
+        if missing:
+            errors.append(f"{table} missing levels: {', '.join(missing)}")
+    for level, info in data['severity'].items():
+        missing = [field for field in SEVERITY_FIELDS if not info.get(field)]
+        if missing:
+            errors.append(f"severity {level!r} missing {', '.join(missing)}")
+    for level, text in data['fallback_analysis'].items():
+        try:
+            names = {match.group('named') or match.group('braced')
+                     for match in Template.pattern.finditer(text) if not match.group('escaped')}
+        except (TypeError, AttributeError):
+            errors.append(f"fallback_analysis {level!r} is not text")
+            continue
+        unknown = names - FALLBACK_PLACEHOLDERS - {None}
+        if unknown:
+            errors.append(f"fallback_analysis {level!r} uses unknown placeholders: {', '.join(sorted(unknown))}")
+    return errors
+
+
+def validate(directory: str = LOCALES_DIR) -> Dict[str, List[str]]:
+    """{language or file: problems} for every language that has any"""
+    sources = load_sources(directory)
+    reference = next((data for data in sources if data.get('language') == REFERENCE_LANGUAGE), None)
+    problems = {}
+    if reference is None:
+        problems[REFERENCE_LANGUAGE] = ["reference language file not found"]
+    seen = set()
+    for data in sources:
+        name = data.get('language', '?')
+        errors = validate_language(data, reference)
+        if name in seen:
+            errors.append("defined more than once")
+        seen.add(name)
+        if errors:
+            problems[name] = errors
+    return problems
+
+
+def compile_catalog(directory: str = LOCALES_DIR) -> bytes:
+    """Catalog bytes for every language in directory"""
+    stamps = source_stamps(directory)
+    sections, entries, offset = [], [], 0
+    for data in load_sources(directory):
+        section = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        entries.append([data['language'], offset, len(section)])
+        sections.append(section)
+        offset += len(section)
+    directory_json = json.dumps({'format': 1, 'languages': entries, 'sources': stamps},
+                                ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return _HEADER.pack(MAGIC, len(directory_json)) + directory_json + b''.join(sections)
+
+
+def build_catalog(directory: str = LOCALES_DIR, output: Optional[str] = None) -> str:
+    """Compile and atomically replace the catalog file; returns its path"""
+    output = output or os.path.join(directory, CATALOG_FILENAME)
+    data = compile_catalog(directory)
+    temporary = f'{output}.{os.getpid()}.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(data)
+    os.replace(temporary, output)
+    return output
+
+
+class Catalog:
+    """Read access to a compiled catalog held in a buffer (an mmap or bytes)"""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        if len(buffer) < _HEADER.size:
+            raise CatalogError("catalog is truncated")
+        magic, length = _HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise CatalogError("not a PHQ-9 catalog file")
+        directory = json.loads(bytes(buffer[_HEADER.size:_HEADER.size + length]).decode('utf-8'))
+        self.sources: Dict[str, List[int]] = directory['sources']
+        base = _HEADER.size + length
+        self._sections: Dict[str, Tuple[int, int]] = {
+            name: (base + offset, size) for name, offset, size in directory['languages']
+        }
+        self.languages: Tuple[str, ...] = tuple(self._sections)
+
+    def __contains__(self, language) -> bool:
+        return language in self._sections
+
+    def load(self, language: str) -> Dict:
+        """Decode one language's section; raises KeyError for unknown languages"""
+        offset, size = self._sections[language]
+        return json.loads(bytes(self._buffer[offset:offset + size]).decode('utf-8'))
+
+    def close(self):
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+
+def open_catalog(path: str) -> Catalog:
+    """Memory-map a catalog file"""
+    with open(path, 'rb') as f:
+        return Catalog(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def open_default_catalog(directory: Optional[str] = None, path: Optional[str] = None) -> Catalog:
+    """The catalog for PHQ9_LOCALES_DIR / PHQ9_CATALOG_PATH, rebuilt first if its sources changed"""
+    directory = directory or os.getenv('PHQ9_LOCALES_DIR') or LOCALES_DIR
+    path = path or os.getenv('PHQ9_CATALOG_PATH') or os.path.join(directory, CATALOG_FILENAME)
+    stamps = source_stamps(directory)
+    try:
+        catalog = open_catalog(path)
+        if catalog.sources == stamps:
+            return catalog
+        catalog.close()
+    except (OSError, ValueError, CatalogError):
+        pass
+    try:
+        return open_catalog(build_catalog(directory, path))
+    except OSError as e:
+        logger.warning("Cannot write the translation catalog to %s (%s); using an in-memory copy", path, e)
+        return Catalog(compile_catalog(directory))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Validate and compile the translation catalog")
+    parser.add_argument('command', choices=('validate', 'build'))
+    parser.add_argument('--locales', default=LOCALES_DIR, help="Directory of per-language JSON files")
+    parser.add_argument('-o', '--output', help="Catalog file to write (default <locales>/catalog.bin)")
+    args = parser.parse_args(argv)
+
+    problems = validate(args.locales)
+    for language, errors in problems.items():
+        for error in errors:
+            print(f"{language}: {error}", file=sys.stderr)
+    if problems:
+        return 1
+    languages = len(source_files(args.locales))
+    if args.command == 'build':
+        path = build_catalog(args.locales, args.output)
+        print(f"Wrote {languages} languages to {path}", file=sys.stderr)
+    else:
+        print(f"{languages} languages OK", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
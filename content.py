@@ -0,0 +1,176 @@
+"""Localized content for the PHQ-9 app.
+
+The strings live in one JSON file per language under locales/, compiled into
+a memory-mapped catalog (see catalog.py). Nothing is decoded at import time:
+the first lookup for a language decodes its section and builds its
+LanguagePack - the frozen string table, per-severity content, precompiled
+fallback templates and pre-rendered question cards - which is then kept for
+the life of the process. A process only holds the languages its sessions
+have actually used.
+"""
+
+import threading
+from collections.abc import Mapping as MappingABC
+from string import Template
+from types import MappingProxyType
+from typing import Dict, Iterator, Mapping, Tuple
+
+from catalog import Catalog, open_default_catalog
+from scoring import get_severity_level
+
+DEFAULT_LANGUAGE = 'English'
+DEFAULT_SEVERITY = 'minimal'
+
+# Encouragement shown before these (zero-based) questions
+ENCOURAGEMENT_KEYS = MappingProxyType({2: 'encouragement_1', 5: 'encouragement_2', 8: 'encouragement_3'})
+
+
+def _freeze(value):
+    """Recursively turn dicts into read-only mappings and lists into tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _question_cards(header: str, t: Mapping) -> Tuple[str, ...]:
+    """HTML for every question card of a language, with its encouragement box"""
+    count = len(t['questions'])
+    cards = []
+    for i, question in enumerate(t['questions']):
+        encouragement = ''
+        if i in ENCOURAGEMENT_KEYS:
+            encouragement = f'<div class="encouragement-box">{t[ENCOURAGEMENT_KEYS[i]]}</div>'
+        cards.append(f"""{encouragement}
+    <div class="question-card">
+        <p style="color: #666; margin: 0;">Question {i + 1} of {count}</p>
+        <h3>{header}</h3>
+        <h2 style="color: #4682B4; margin: 1.5rem 0;">{question}</h2>
+    </div>
+    """)
+    return tuple(cards)
+
+
+class LanguagePack:
+    """Everything rendered for one language, built once from its catalog section"""
+
+    __slots__ = ('language', 'strings', 'question_header', 'severity', 'fallback_templates',
+                 'recommendations', 'question_cards', 'option_labels')
+
+    def __init__(self, data: Dict):
+        self.language = data['language']
+        self.strings = _freeze(data['strings'])
+        self.question_header = data['question_header']
+        self.severity = MappingProxyType({
+            level: (info['title'], info['description'], info['css_class']) for level, info in data['severity'].items()
+        })
+        self.fallback_templates = MappingProxyType({
+            level: Template(text) for level, text in data['fallback_analysis'].items()
+        })
+        self.recommendations = MappingProxyType(dict(data['recommendations']))
+        # Pre-rendered questionnaire content for the single-form mode
+        self.question_cards = _question_cards(self.question_header, self.strings)
+        self.option_labels = tuple(f"{option} ({points} points)" for points, option in enumerate(self.strings['options']))
+
+
+class LanguageRegistry(MappingABC):
+    """Read-only {language: strings} mapping that loads each language on first access.
+
+    Iterating or testing membership only reads the catalog directory, so the
+    language selector can list every language without loading any of them.
+    """
+
+    def __init__(self, catalog: Catalog):
+        self.catalog = catalog
+        self._packs: Dict[str, LanguagePack] = {}
+        self._lock = threading.Lock()
+
+    def pack(self, language: str) -> LanguagePack:
+        """The LanguagePack for a language; raises KeyError for unknown languages"""
+        pack = self._packs.get(language)
+        if pack is None:
+            with self._lock:
+                pack = self._packs.get(language)
+                if pack is None:
+                    pack = self._packs[language] = LanguagePack(self.catalog.load(language))
+        return pack
+
+    def loaded(self) -> Tuple[str, ...]:
+        return tuple(self._packs)
+
+    def __getitem__(self, language: str) -> Mapping:
+        return self.pack(language).strings
+
+    def __contains__(self, language) -> bool:
+        return language in self.catalog
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.catalog.languages)
+
+    def __len__(self) -> int:
+        return len(self.catalog.languages)
+
+
+LANGUAGES = LanguageRegistry(open_default_catalog())
+# Language translations, keyed by language name
+TRANSLATIONS: Mapping[str, Mapping] = LANGUAGES
+
+
+def _pack(language: str) -> LanguagePack:
+    """Pack for a language, falling back to English for unknown ones"""
+    try:
+        return LANGUAGES.pack(language)
+    except KeyError:
+        return LANGUAGES.pack(DEFAULT_LANGUAGE)
+
+
+def _lookup(table: Mapping, severity: str):
+    """Look up a per-severity entry, falling back to the minimal band"""
+    value = table.get(severity)
+    return value if value is not None else table[DEFAULT_SEVERITY]
+
+
+def get_question_header(language: str) -> str:
+    """Question card header for a language"""
+    return _pack(language).question_header
+
+
+def get_question_cards(language: str) -> Tuple[str, ...]:
+    """Pre-rendered question card HTML for a language, one per question"""
+    return _pack(language).question_cards
+
+
+def get_option_labels(language: str) -> Tuple[str, ...]:
+    """Answer labels with their points, indexed by score"""
+    return _pack(language).option_labels
+
+
+def get_severity_content(language: str, severity: str) -> Tuple[str, str, str]:
+    """(title, description, CSS class) for a severity band"""
+    return _lookup(_pack(language).severity, severity)
+
+
+def render_fallback_analysis(language: str, severity: str, total_score: int) -> str:
+    """Fallback analysis text for a severity band with the score filled in"""
+    return _lookup(_pack(language).fallback_templates, severity).substitute(total_score=total_score)
+
+
+def get_recommendations(language: str, severity: str) -> str:
+    """Recommendations HTML for a severity band"""
+    return _lookup(_pack(language).recommendations, severity)
+
+
+def get_fallback_analysis(total_score: int, language: str) -> str:
+    """Fallback professional analysis when API is unavailable"""
+    return render_fallback_analysis(language, get_severity_level(total_score), total_score)
+
+
+def get_severity_info(score: int, language: str) -> Tuple[str, str, str]:
+    """Get severity information including level, description, and CSS class"""
+    return get_severity_content(language, get_severity_level(score))
+
+
+def get_professional_recommendations(score: int, language: str) -> str:
+    """Get professional recommendations based on score"""
+    return get_recommendations(language, get_severity_level(score))
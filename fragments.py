@@ -0,0 +1,219 @@
+"""Pre-rendered HTML for the app's static regions.
+
+The home, about and resources pages, the footer and the sidebar's quick info
+are the same for every session, so each is rendered once per process. The
+footer carries translated text and is cached under (name, language, app
+version); the other regions are not translated yet and are cached under
+(name, app version) alone, one copy for every language. The app version is
+PHQ9_APP_VERSION when set, otherwise a hash of this module, so editing a
+template never serves a stale copy.
+
+render_bytes counts the HTML the app emits per region and rerun; with
+tracing on it is reported as the render_bytes summary, labelled by region.
+"""
+
+import contextlib
+import functools
+import hashlib
+import os
+import threading
+from typing import Callable, Dict, Mapping, NamedTuple, Optional
+
+from content import TRANSLATIONS
+from tracing import tracer
+
+
+def _source_version() -> str:
+    with open(__file__, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+APP_VERSION = os.getenv('PHQ9_APP_VERSION') or _source_version()
+
+
+class Fragment(NamedTuple):
+    html: str
+    size: int  # UTF-8 bytes
+
+
+def _home() -> str:
+    return """
+    <div class="question-card">
+        <h3>🧠 Professional Mental Health Assessment</h3>
+        <p>The PHQ-9 is a widely used, validated tool for screening depression. It takes just a few minutes to complete and provides valuable insights into your mental health.</p>
+
+        <h4>✨ What makes this tool special:</h4>
+        <ul>
+            <li>🤖 AI-powered analysis and personalized recommendations</li>
+            <li>🌍 Multi-language support (English, French, Yoruba, Igbo, Hausa)</li>
+            <li>🔒 Complete privacy and data security</li>
+            <li>📱 Mobile-optimized experience</li>
+            <li>💡 Educational resources and support information</li>
+        </ul>
+
+        <h4>🎯 This assessment is for you if:</h4>
+        <ul>
+            <li>You're experiencing changes in mood or energy</li>
+            <li>You want to monitor your mental health</li>
+            <li>Your healthcare provider recommended a depression screening</li>
+            <li>You're seeking professional guidance on your mental wellness</li>
+        </ul>
+    </div>
+    """
+
+
+def _home_encouragement() -> str:
+    return """
+    <div class="encouragement-box">
+        💚 Taking care of your mental health is just as important as taking care of your physical health. You're taking a positive step by being here.
+    </div>
+    """
+
+
+def _about() -> str:
+    return """
+    <div class="question-card">
+        <h3>📋 About the PHQ-9 Assessment</h3>
+
+        <h4>What is PHQ-9?</h4>
+        <p>The Patient Health Questionnaire-9 (PHQ-9) is a multipurpose instrument for screening, diagnosing, monitoring and measuring the severity of depression. It's one of the most validated tools in mental health screening.</p>
+
+        <h4>🎯 How it works:</h4>
+        <ul>
+            <li><strong>9 Questions:</strong> Based on the 9 DSM-IV criteria for depression</li>
+            <li><strong>4-Point Scale:</strong> From "not at all" to "nearly every day"</li>
+            <li><strong>Score Range:</strong> 0-27 points total</li>
+            <li><strong>Severity Levels:</strong> Minimal (0-4), Mild (5-9), Moderate (10-14), Severe (15-27)</li>
+        </ul>
+
+        <h4>🤖 AI Enhancement:</h4>
+        <p>Our tool uses advanced AI to provide personalized insights and recommendations based on your responses, making the assessment more meaningful and actionable.</p>
+
+        <h4>🌍 Accessibility:</h4>
+        <p>Available in multiple languages to serve diverse communities and ensure everyone can access mental health screening in their preferred language.</p>
+
+        <h4>⚠️ Important Notes:</h4>
+        <ul>
+            <li>This tool is for screening purposes only</li>
+            <li>It does not replace professional medical diagnosis</li>
+            <li>Always consult with healthcare providers for proper evaluation</li>
+            <li>If you're in crisis, seek immediate help</li>
+        </ul>
+    </div>
+    """
+
+
+def _resources() -> str:
+    return """
+    <div class="question-card">
+        <h3>📚 Mental Health Resources</h3>
+
+        <h4>🚨 Crisis Resources:</h4>
+        <ul>
+            <li><strong>National Suicide Prevention Lifeline:</strong> 988 (US)</li>
+            <li><strong>Crisis Text Line:</strong> Text HOME to 741741</li>
+            <li><strong>International Association for Suicide Prevention:</strong> <a href="https://www.iasp.info/resources/Crisis_Centres/">Find local crisis centers</a></li>
+        </ul>
+
+        <h4>🏥 Professional Help:</h4>
+        <ul>
+            <li>Talk to your primary care physician</li>
+            <li>Contact a mental health professional</li>
+            <li>Reach out to your local community health center</li>
+            <li>Consider online therapy platforms (BetterHelp, Talkspace, etc.)</li>
+        </ul>
+
+        <h4>💪 Self-Care Strategies:</h4>
+        <ul>
+            <li><strong>Exercise:</strong> Regular physical activity can improve mood</li>
+            <li><strong>Sleep:</strong> Maintain consistent sleep schedules</li>
+            <li><strong>Nutrition:</strong> Eat balanced, nutritious meals</li>
+            <li><strong>Social Connection:</strong> Stay connected with friends and family</li>
+            <li><strong>Mindfulness:</strong> Practice meditation or deep breathing</li>
+            <li><strong>Hobbies:</strong> Engage in activities you enjoy</li>
+        </ul>
+
+        <h4>📖 Educational Resources:</h4>
+        <ul>
+            <li><a href="https://www.nimh.nih.gov/health/topics/depression">National Institute of Mental Health - Depression</a></li>
+            <li><a href="https://www.who.int/news-room/fact-sheets/detail/depression">World Health Organization - Depression Facts</a></li>
+            <li><a href="https://www.nami.org/About-Mental-Illness/Mental-Health-Conditions/Depression">NAMI - Depression Information</a></li>
+        </ul>
+
+        <h4>📱 Mental Health Apps:</h4>
+        <ul>
+            <li><strong>Mood tracking:</strong> Daylio, Moodpath</li>
+            <li><strong>Meditation:</strong> Headspace, Calm</li>
+            <li><strong>Therapy:</strong> BetterHelp, Talkspace</li>
+            <li><strong>Crisis support:</strong> Crisis Text Line app</li>
+        </ul>
+    </div>
+    """
+
+
+def _quick_info() -> str:
+    return """
+        - **Time:** 3-5 minutes
+        - **Questions:** 9 total
+        - **Privacy:** Fully secure
+        - **Languages:** 5 supported
+        """
+
+
+def _footer(t: Mapping) -> str:
+    return f"""
+    <div class="footer">
+        <p>{t['privacy_note']}</p>
+        <p>⚠️ <strong>Disclaimer:</strong> This tool is for screening purposes only and does not replace professional medical advice, diagnosis, or treatment.</p>
+        <p>🏆 <em>Innovation in AI Medicine Competition Entry</em></p>
+    </div>
+    """
+
+
+# Regions without translated text, identical in every language
+SHARED_FRAGMENTS: Dict[str, Callable[[], str]] = {
+    'home': _home,
+    'home_encouragement': _home_encouragement,
+    'about': _about,
+    'resources': _resources,
+    'quick_info': _quick_info,
+}
+
+# Regions built from the language's strings
+LOCALIZED_FRAGMENTS: Dict[str, Callable[[Mapping], str]] = {
+    'footer': _footer,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _render(name: str, language: Optional[str], version: str) -> Fragment:
+    if language is None:
+        html = SHARED_FRAGMENTS[name]()
+    else:
+        html = LOCALIZED_FRAGMENTS[name](TRANSLATIONS[language])
+    return Fragment(html, len(html.encode('utf-8')))
+
+
+def get_fragment(name: str, language: str) -> Fragment:
+    """Cached HTML for a static region in a language; raises KeyError for unknown names"""
+    if name in SHARED_FRAGMENTS:
+        return _render(name, None, APP_VERSION)
+    return _render(name, language, APP_VERSION)
+
+
+_meter = threading.local()
+
+
+def record_bytes(size: int):
+    """Count markup emitted by the current script run (each session runs in its own thread)"""
+    _meter.bytes = getattr(_meter, 'bytes', 0) + size
+
+
+@contextlib.contextmanager
+def measure(region: str):
+    """Observe the bytes recorded inside the block as render_bytes{region=...}"""
+    start = getattr(_meter, 'bytes', 0)
+    try:
+        yield
+    finally:
+        tracer.observe('render_bytes', getattr(_meter, 'bytes', 0) - start, region=region)
@@ -0,0 +1,115 @@
+"""Process-wide Gemini client and model registry.
+
+The registry configures the SDK once and hands out long-lived model objects,
+so a request only pays for the model call itself. The API key is re-read on
+every lookup (it is a cheap env/secrets read) and the SDK is reconfigured when
+it changes, which lets operators rotate keys without restarting the server.
+An ``api_endpoint`` switches the SDK to its REST transport against that
+host, for proxies, regional endpoints and the load-test fake server.
+
+google.generativeai pulls in a large gRPC/protobuf stack, so it is imported
+lazily on the first model lookup rather than at app start-up.
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+from analysis_backends import AnalysisBackend, ModelUnavailableError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAME = 'gemini-pro'
+
+_genai = None
+_genai_loaded = False
+_genai_lock = threading.Lock()
+
+
+def load_genai():
+    """Import google.generativeai on first use; returns None if it is not installed"""
+    global _genai, _genai_loaded
+    if _genai_loaded:
+        return _genai
+    with _genai_lock:
+        if not _genai_loaded:
+            try:
+                import google.generativeai as genai
+                _genai = genai
+            except ImportError:
+                logger.warning("google-generativeai is not installed; AI analysis will use the fallback")
+            _genai_loaded = True
+    return _genai
+
+
+def gemini_available() -> bool:
+    """Whether the Gemini SDK can be imported (imports it if that has not happened yet)"""
+    return load_genai() is not None
+
+
+class GeminiUnavailableError(ModelUnavailableError):
+    """Raised when no usable Gemini model can be provided"""
+
+
+class GeminiRegistry(AnalysisBackend):
+    """Owns the SDK configuration and a pool of models keyed by name"""
+
+    name = 'gemini'
+
+    def __init__(self, key_provider: Callable[[], Optional[str]],
+                 model_name: str = DEFAULT_MODEL_NAME, genai_module=None,
+                 api_endpoint: Optional[str] = None):
+        # An explicitly passed module overrides the lazily imported SDK
+        self._genai_module = genai_module
+        self.key_provider = key_provider
+        self.model_name = model_name
+        self.api_endpoint = api_endpoint
+        self._api_key: Optional[str] = None
+        self._models: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self.configure_count = 0
+
+    @property
+    def genai(self):
+        return self._genai_module if self._genai_module is not None else load_genai()
+
+    def _ensure_configured(self):
+        api_key = self.key_provider()
+        if not api_key:
+            raise GeminiUnavailableError(
+                "⚠️ Gemini API key not found. Please set the GEMINI_API_KEY environment variable for AI analysis."
+            )
+        if api_key == self._api_key:
+            return
+        options = {}
+        if self.api_endpoint:
+            options = {'transport': 'rest', 'client_options': {'api_endpoint': self.api_endpoint}}
+        try:
+            self.genai.configure(api_key=api_key, **options)
+        except Exception as e:
+            raise GeminiUnavailableError("⚠️ Error configuring Gemini API. Falling back to basic analysis.") from e
+        if self._api_key is not None:
+            logger.info("Gemini API key changed; reconfigured client")
+        self._api_key = api_key
+        self._models.clear()
+        self.configure_count += 1
+
+    def get_model(self, model_name: Optional[str] = None):
+        """Return a shared model instance, configuring the SDK on first use or after key rotation"""
+        if self.genai is None:
+            raise GeminiUnavailableError(
+                "⚠️ Google Generative AI package not installed properly. Running in fallback mode."
+            )
+        name = model_name or self.model_name
+        with self._lock:
+            self._ensure_configured()
+            model = self._models.get(name)
+            if model is None:
+                try:
+                    model = self.genai.GenerativeModel(name)
+                except Exception as e:
+                    raise GeminiUnavailableError(
+                        "⚠️ Could not initialize AI model. Using fallback analysis."
+                    ) from e
+                self._models[name] = model
+            return model
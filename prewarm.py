@@ -0,0 +1,218 @@
+"""Pre-warm the AI analysis cache offline.
+
+The prompt depends on the full answer vector and the language, so there are
+4^9 = 262,144 possible analyses per language - but real traffic is heavily
+concentrated on a small share of them. This job counts (language, answers)
+pairs in stored history or a frequency file, takes the most common ones,
+generates their analyses in rate-limited parallel batches through the same
+AnalysisService the app uses, and writes them into a SQLite cache file.
+Point PHQ9_CACHE_PATH at that file in the deployment and those results pages
+are served without calling the model.
+
+Sources are anything rescore.py reads: the app's SQLite or JSONL response
+store, or a CSV/JSONL/Parquet file with q1..q9, an optional language column
+and an optional count column (one row per distinct vector).
+
+Entries are keyed on the model name and the prompt template's identity
+(version and text hash, see prompts.py), so warm with the model and
+PHQ9_PROMPT_VERSION the deployment uses, and re-warm after changing the prompt. Leave
+PHQ9_CACHE_TTL_SECONDS unset (or long) for a shipped cache, and keep
+PHQ9_CACHE_DISK_MAX_ENTRIES above the number of warmed entries.
+
+Usage:
+    python prewarm.py data/phq9_responses.db -o data/analysis_cache.db --top 5000 --rate 2
+    python prewarm.py frequencies.csv -o analysis_cache.db --count-column n --stub
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Counter as CounterType, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ai_analysis import AnalysisService, breaker_from_env
+from analysis_backends import StubBackend
+from analysis_cache import AnalysisCache
+from assessment import unpack_responses
+from content import DEFAULT_LANGUAGE, TRANSLATIONS
+from gemini_client import DEFAULT_MODEL_NAME, GeminiRegistry
+from prompts import prompt_from_env
+from rescore import DEFAULT_ITEM_COLUMNS, FORMATS, detect_format, read_frames, to_item_matrix
+from scoring import MAX_ITEM_SCORE, NUM_ITEMS
+
+logger = logging.getLogger(__name__)
+
+
+def count_vectors(path: str, input_format: Optional[str] = None, item_columns: Optional[List[str]] = None,
+                  language_column: str = 'language', count_column: Optional[str] = None,
+                  default_language: str = DEFAULT_LANGUAGE,
+                  chunk_size: int = 65536) -> CounterType[Tuple[str, int]]:
+    """Count complete answer vectors as {(language, packed answers): occurrences}.
+
+    Rows with missing or out-of-range answers, or an unsupported language,
+    are skipped.
+    """
+    input_format = input_format or detect_format(path)
+    item_columns = item_columns or DEFAULT_ITEM_COLUMNS
+    counts: CounterType[Tuple[str, int]] = Counter()
+    weights = 1 << (2 * np.arange(NUM_ITEMS, dtype=np.int64))
+    for frame in read_frames(path, input_format, chunk_size, None):
+        items = to_item_matrix(frame, item_columns)
+        complete = ((items >= 0) & (items <= MAX_ITEM_SCORE)).all(axis=1)
+        # Same 2-bits-per-item packing as assessment.pack_responses
+        packed = items.astype(np.int64) @ weights
+        if language_column in frame.columns:
+            languages = frame[language_column].fillna(default_language).astype(str).to_numpy()
+        else:
+            languages = np.full(len(frame), default_language, dtype=object)
+        if count_column:
+            occurrences = frame[count_column].astype(float).fillna(0).astype(np.int64).to_numpy()
+        else:
+            occurrences = np.ones(len(frame), dtype=np.int64)
+        for language, code, n, ok in zip(languages, packed.tolist(), occurrences.tolist(), complete.tolist()):
+            if ok and n > 0 and language in TRANSLATIONS:
+                counts[(language, code)] += n
+    return counts
+
+
+def select_vectors(counts: CounterType[Tuple[str, int]], top: Optional[int] = None, min_count: int = 1,
+                   languages: Optional[Sequence[str]] = None) -> List[Tuple[str, Dict[int, int], int]]:
+    """Most common (language, responses, count) triples, most frequent first"""
+    selected = []
+    for (language, code), n in counts.most_common():
+        if n < min_count:
+            break
+        if languages and language not in languages:
+            continue
+        selected.append((language, dict(enumerate(unpack_responses(code))), n))
+        if top is not None and len(selected) >= top:
+            break
+    return selected
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all threads"""
+
+    def __init__(self, rate: Optional[float], clock=time.monotonic, sleep=time.sleep):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = self._clock()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            self._sleep(start - now)
+
+
+def prewarm(vectors: Sequence[Tuple[str, Dict[int, int], int]], service: AnalysisService,
+            workers: int = 4, rate: Optional[float] = None, batch_size: int = 50) -> Dict[str, int]:
+    """Generate and cache analyses for the given vectors; returns counters"""
+    limiter = RateLimiter(rate)
+    stats = {'selected': len(vectors), 'cached': 0, 'warmed': 0, 'failed': 0, 'covered_occurrences': 0}
+    stats_lock = threading.Lock()
+
+    def warm(item) -> None:
+        language, responses, n = item
+        key = service.cache_key(responses, language)
+        # Peek without counting, so each vector is one lookup in the service's hit rate
+        if service.cache.get(key, record=False) is not None:
+            outcome = 'cached'
+        else:
+            limiter.wait()
+            _, warning = service.analyze(responses, sum(responses.values()), language)
+            # An empty reply comes back as the fallback without a warning and is never cached
+            outcome = 'warmed' if warning is None and service.cache.get(key, record=False) is not None else 'failed'
+        with stats_lock:
+            stats[outcome] += 1
+            if outcome != 'failed':
+                stats['covered_occurrences'] += n
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='phq9-prewarm') as executor:
+        for start in range(0, len(vectors), batch_size):
+            list(executor.map(warm, vectors[start:start + batch_size]))
+            logger.info("%d/%d done (%d warmed, %d already cached, %d failed)",
+                        min(start + batch_size, len(vectors)), len(vectors),
+                        stats['warmed'], stats['cached'], stats['failed'])
+            if service.breaker.state == 'open':
+                logger.error("Circuit breaker opened after repeated model failures; stopping early")
+                break
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-warm the AI analysis cache from response frequencies")
+    parser.add_argument('input', help="Response history or frequency file (CSV, JSONL, Parquet or SQLite store)")
+    parser.add_argument('-o', '--output', required=True, help="SQLite cache file to create or extend")
+    parser.add_argument('--input-format', choices=FORMATS, help="Override format detection for the input")
+    parser.add_argument('--items', help="Comma-separated item columns in question order (default q1..q9)")
+    parser.add_argument('--language-column', default='language', help="Column holding the language (default language)")
+    parser.add_argument('--default-language', default=DEFAULT_LANGUAGE,
+                        help="Language for rows without one (default English)")
+    parser.add_argument('--languages', help="Only warm these comma-separated languages")
+    parser.add_argument('--count-column', help="Column with the number of occurrences of each row's vector")
+    parser.add_argument('--top', type=int, help="Warm at most this many vectors, most common first")
+    parser.add_argument('--min-count', type=int, default=1, help="Skip vectors seen fewer times (default 1)")
+    parser.add_argument('--model', help="Model name (default GEMINI_MODEL or gemini-pro); must match the deployment")
+    parser.add_argument('--workers', type=int, default=4, help="Parallel model calls (default 4)")
+    parser.add_argument('--rate', type=float, default=1.0, help="Model calls per second, 0 for unlimited (default 1)")
+    parser.add_argument('--batch-size', type=int, default=50, help="Vectors per progress batch (default 50)")
+    parser.add_argument('--stub', action='store_true',
+                        help="Use a local stub model instead of Gemini (for tests; model name defaults to 'stub')")
+    parser.add_argument('--stub-latency', type=float, default=0.0, help="Seconds per stub call (default 0)")
+    parser.add_argument('--dry-run', action='store_true', help="Only report what would be warmed")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    item_columns = args.items.split(',') if args.items else None
+    if item_columns is not None and len(item_columns) != NUM_ITEMS:
+        parser.error(f"--items needs exactly {NUM_ITEMS} column names")
+    languages = [language.strip() for language in (args.languages or '').split(',') if language.strip()]
+    unknown = [language for language in languages if language not in TRANSLATIONS]
+    if unknown:
+        parser.error(f"Unsupported languages: {', '.join(unknown)}")
+
+    counts = count_vectors(args.input, args.input_format, item_columns, args.language_column,
+                           args.count_column, args.default_language)
+    vectors = select_vectors(counts, args.top, args.min_count, languages)
+    total = sum(counts.values())
+    covered = sum(n for _, _, n in vectors)
+    print(f"{len(counts)} distinct vectors in {total} assessments; warming {len(vectors)} "
+          f"covering {covered / total if total else 0:.1%} of assessments", file=sys.stderr)
+    if args.dry_run or not vectors:
+        return 0
+
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    if args.stub:
+        registry = StubBackend(args.model or 'stub', args.stub_latency)
+    else:
+        model_name = args.model or os.getenv('GEMINI_MODEL') or DEFAULT_MODEL_NAME
+        registry = GeminiRegistry(lambda: os.getenv('GEMINI_API_KEY'), model_name)
+    cache = AnalysisCache(memory_size=args.batch_size, disk_path=args.output,
+                          disk_max_entries=max(len(vectors), 100_000))
+    service = AnalysisService(cache, registry, breaker_from_env(), prompt=prompt_from_env())
+
+    started = time.perf_counter()
+    stats = prewarm(vectors, service, args.workers, args.rate or None, args.batch_size)
+    cache.disk.close()
+    print(f"Warmed {stats['warmed']}, already cached {stats['cached']}, failed {stats['failed']} "
+          f"in {time.perf_counter() - started:.1f}s; cache covers "
+          f"{stats['covered_occurrences'] / total if total else 0:.1%} of assessments", file=sys.stderr)
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""Versioned prompt templates for the AI analysis.
+
+Each template is a string.Template with $total_score, $language and
+$response_text. Templates are normalized when registered (dedented, trailing
+whitespace stripped, blank-line runs collapsed) unless they opt out, and are
+identified by ``version:hash``, where the hash covers the normalized text, so
+editing a template changes its identity and therefore the analysis cache
+key without anyone remembering to bump a constant.
+
+Templates are compiled per language the first time that language is used:
+the language is substituted once and every (question, answer) line is
+pre-rendered, so building a prompt is a join of nine precomputed lines and
+one substitute().
+
+Version 1 is the original prompt, kept byte for byte so its size can be
+compared; version 2 is the same wording without the indentation.
+estimate_tokens gives a tokenizer-free estimate for budgeting, and running
+this module compares prompt size and cost across versions:
+
+    python prompts.py --versions 1,2 --price-per-million 0.5
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import statistics
+import sys
+import textwrap
+import threading
+from string import Template
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from content import TRANSLATIONS
+from scoring import MAX_ITEM_SCORE, NUM_ITEMS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROMPT_VERSION = '2'
+
+# Words, punctuation marks, and whitespace other than a single space between words
+_PIECE = re.compile(r'\w+|[^\w\s]|\s{2,}|\n')
+
+
+def normalize_whitespace(text: str) -> str:
+    """Dedent, strip trailing whitespace and collapse runs of blank lines"""
+    lines = [line.rstrip() for line in textwrap.dedent(text).split('\n')]
+    kept: List[str] = []
+    for line in lines:
+        if line or (kept and kept[-1]):
+            kept.append(line)
+    return '\n'.join(kept).strip()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count without a tokenizer.
+
+    Words, punctuation and runs of indentation or newlines count one token
+    per four characters (at least one each), which tracks SentencePiece-style
+    tokenizers closely enough for budgeting English and French; accented
+    Yoruba and Igbo words split more finely in practice, so treat their
+    estimates as a floor.
+    """
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _PIECE.findall(text))
+
+
+def prompt_hash(text: str) -> str:
+    """Stable short hash of a prompt or template text"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+class CompiledPrompt:
+    """A template with one language substituted and its answer lines pre-rendered.
+
+    Token estimates are precomputed for the fixed text and for every answer
+    line, so estimating a prompt's size does not re-scan it.
+    """
+
+    __slots__ = ('template', 'lines', 'separator', 'base_tokens', 'line_tokens')
+
+    def __init__(self, template: Template, lines: Tuple[Tuple[str, ...], ...], separator: str):
+        self.template = template
+        self.lines = lines
+        self.separator = separator
+        # The score is at most two digits, one token
+        self.base_tokens = estimate_tokens(template.substitute(total_score='', response_text='')) + 1
+        self.line_tokens = tuple(tuple(estimate_tokens(line + separator) for line in item) for item in lines)
+
+    def render(self, responses: Mapping[int, int], total_score: int) -> str:
+        response_text = self.separator.join(self.lines[i][score] for i, score in responses.items())
+        return self.template.substitute(total_score=total_score, response_text=response_text)
+
+    def estimate_tokens(self, responses: Mapping[int, int]) -> int:
+        return self.base_tokens + sum(self.line_tokens[i][score] for i, score in responses.items())
+
+
+class PromptTemplate:
+    """A registered prompt version, compiled for each language on first use"""
+
+    def __init__(self, version: str, text: str, normalize: bool = True, trailing_newline: bool = False):
+        self.version = version
+        self.text = normalize_whitespace(text) if normalize else text
+        self.hash = prompt_hash(self.text)
+        self.identity = f'{version}:{self.hash}'
+        # Version 1 ended every answer line with a newline; later versions join them
+        self.trailing_newline = trailing_newline
+        self._compiled: Dict[str, CompiledPrompt] = {}
+        self._lock = threading.Lock()
+
+    def compiled(self, language: str) -> CompiledPrompt:
+        """The template compiled for a language; raises KeyError for unknown languages"""
+        prompt = self._compiled.get(language)
+        if prompt is None:
+            with self._lock:
+                prompt = self._compiled.get(language)
+                if prompt is None:
+                    prompt = self._compiled[language] = self._compile(language)
+        return prompt
+
+    def _compile(self, language: str) -> CompiledPrompt:
+        t = TRANSLATIONS[language]
+        end = '\n' if self.trailing_newline else ''
+        lines = tuple(
+            tuple(f"Q{i + 1}: {question} - Answer: {t['options'][score]} (Score: {score}){end}"
+                  for score in range(MAX_ITEM_SCORE + 1))
+            for i, question in enumerate(t['questions'][:NUM_ITEMS])
+        )
+        template = Template(Template(self.text).safe_substitute(language=language))
+        return CompiledPrompt(template, lines, '' if self.trailing_newline else '\n')
+
+    def render(self, responses: Mapping[int, int], total_score: int, language: str) -> str:
+        return self.compiled(language).render(responses, total_score)
+
+    def estimate_tokens(self, responses: Mapping[int, int], language: str) -> int:
+        """Estimated tokens of the rendered prompt, from the precomputed counts"""
+        return self.compiled(language).estimate_tokens(responses)
+
+
+# Original prompt, including the indentation it was written with
+_PROMPT_V1 = """
+            You are a licensed clinical psychologist and mental health professional with expertise in depression assessment and the PHQ-9 screening tool. 
+
+            PATIENT CONTEXT:
+            - A patient has completed the PHQ-9 depression screening questionnaire
+            - Total PHQ-9 Score: $total_score/27
+            - Language: $language
+            
+            DETAILED RESPONSES:
+            $response_text
+            
+            INSTRUCTIONS:
+            Please provide a professional, compassionate, and evidence-based analysis following these guidelines:
+
+            1. **Professional Tone**: Write as a healthcare professional would - caring but clinical
+            2. **Severity Assessment**: Based on standard PHQ-9 scoring:
+               - 0-4: Minimal depression
+               - 5-9: Mild depression  
+               - 10-14: Moderate depression
+               - 15-27: Severe depression
+            
+            3. **Key Elements to Include**:
+               - Brief interpretation of the score in context
+               - Identify specific symptom patterns from responses
+               - Provide appropriate level of urgency for professional help
+               - Suggest 2-3 specific, actionable next steps
+               - Include reassurance and hope where appropriate
+               
+            4. **Important Limitations**:
+               - Emphasize this is a screening tool, not a diagnosis
+               - Recommend professional evaluation for definitive assessment
+               - If score is 15+, emphasize urgency of professional help
+               - If item 9 (self-harm thoughts) > 0, prioritize safety planning
+            
+            5. **Cultural Sensitivity**: 
+               - Be mindful of cultural context for $language speakers
+               - Use appropriate, respectful language
+               
+            6. **Length**: Keep response to 150-200 words, clear and focused
+            
+            Please respond in $language and provide professional mental health guidance appropriate for this PHQ-9 assessment.
+            """
+
+_PROMPT_V2 = """
+You are a licensed clinical psychologist and mental health professional with expertise in depression assessment and the PHQ-9 screening tool.
+
+PATIENT CONTEXT:
+- A patient has completed the PHQ-9 depression screening questionnaire
+- Total PHQ-9 Score: $total_score/27
+- Language: $language
+
+DETAILED RESPONSES:
+$response_text
+
+INSTRUCTIONS:
+Please provide a professional, compassionate, and evidence-based analysis following these guidelines:
+
+1. **Professional Tone**: Write as a healthcare professional would - caring but clinical
+2. **Severity Assessment**: Based on standard PHQ-9 scoring:
+   - 0-4: Minimal depression
+   - 5-9: Mild depression
+   - 10-14: Moderate depression
+   - 15-27: Severe depression
+
+3. **Key Elements to Include**:
+   - Brief interpretation of the score in context
+   - Identify specific symptom patterns from responses
+   - Provide appropriate level of urgency for professional help
+   - Suggest 2-3 specific, actionable next steps
+   - Include reassurance and hope where appropriate
+
+4. **Important Limitations**:
+   - Emphasize this is a screening tool, not a diagnosis
+   - Recommend professional evaluation for definitive assessment
+   - If score is 15+, emphasize urgency of professional help
+   - If item 9 (self-harm thoughts) > 0, prioritize safety planning
+
+5. **Cultural Sensitivity**:
+   - Be mindful of cultural context for $language speakers
+   - Use appropriate, respectful language
+
+6. **Length**: Keep response to 150-200 words, clear and focused
+
+Please respond in $language and provide professional mental health guidance appropriate for this PHQ-9 assessment.
+"""
+
+PROMPT_TEMPLATES: Mapping[str, PromptTemplate] = MappingProxyType({
+    '1': PromptTemplate('1', _PROMPT_V1, normalize=False, trailing_newline=True),
+    '2': PromptTemplate('2', _PROMPT_V2),
+})
+
+
+def get_prompt_template(version: Optional[str] = None) -> PromptTemplate:
+    """A registered template; defaults to DEFAULT_PROMPT_VERSION"""
+    version = version or DEFAULT_PROMPT_VERSION
+    try:
+        return PROMPT_TEMPLATES[version]
+    except KeyError:
+        raise ValueError(f"Unknown prompt version {version!r}; expected one of: {', '.join(PROMPT_TEMPLATES)}") from None
+
+
+def prompt_from_env() -> PromptTemplate:
+    """Template selected by PHQ9_PROMPT_VERSION"""
+    return get_prompt_template(os.getenv('PHQ9_PROMPT_VERSION') or None)
+
+
+def token_budget_from_env() -> Optional[int]:
+    """Estimated prompt tokens above which a prompt is logged and counted, from PHQ9_PROMPT_TOKEN_BUDGET"""
+    budget = int(os.getenv('PHQ9_PROMPT_TOKEN_BUDGET', '0'))
+    return budget or None
+
+
+def size_report(template: PromptTemplate, samples: int = 200, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """Characters and estimated tokens per language over random answer vectors"""
+    import random
+    rng = random.Random(seed)
+    vectors = [{i: rng.randint(0, MAX_ITEM_SCORE) for i in range(NUM_ITEMS)} for _ in range(samples)]
+    report = {}
+    for language in TRANSLATIONS:
+        prompts = [template.render(vector, sum(vector.values()), language) for vector in vectors]
+        tokens = [estimate_tokens(prompt) for prompt in prompts]
+        report[language] = {
+            'chars_median': statistics.median(len(prompt) for prompt in prompts),
+            'tokens_median': statistics.median(tokens),
+            'tokens_max': max(tokens),
+        }
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare prompt size and estimated cost across template versions")
+    parser.add_argument('--versions', default=','.join(PROMPT_TEMPLATES), help="Comma-separated versions (default: all)")
+    parser.add_argument('--samples', type=int, default=200, help="Random answer vectors per language (default 200)")
+    parser.add_argument('--price-per-million', type=float, help="Input price per million tokens, to report cost")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for version in args.versions.split(','):
+        template = get_prompt_template(version)
+        report = size_report(template, args.samples)
+        if args.price_per_million:
+            for figures in report.values():
+                figures['cost_per_1000_prompts'] = figures['tokens_median'] * args.price_per_million / 1000
+        results[template.identity] = report
+        medians = [figures['tokens_median'] for figures in report.values()]
+        print(f"v{version} ({template.hash})  median tokens by language {min(medians):.0f}-{max(medians):.0f}",
+              file=sys.stderr)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
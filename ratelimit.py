@@ -0,0 +1,312 @@
+"""Token-bucket admission control for AI provider calls.
+
+Every model call needs a token from a global bucket sized to the provider
+quota, so a burst of submissions queues briefly instead of turning into a
+burst of 429s. Tokens are handed out by reservation: each request is given
+the next free slot, which serves waiters strictly in arrival order. A request
+whose slot is further away than ``max_wait`` is not admitted and the caller
+serves the fallback analysis straight away.
+
+An optional per-session bucket stops one session from using up the shared
+quota. Buckets are in-process by default; SQLiteTokenBucket shares them
+between processes on one host through a small SQLite file and
+RedisTokenBucket between hosts through a Redis-compatible server.
+"""
+
+import copy
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+# Upper bounds of the histogram buckets; the last bucket is unbounded
+WAIT_BUCKETS_MS = (0, 10, 50, 100, 250, 500, 1000, 2500, 5000)
+QUEUE_DEPTH_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Fixed-bucket histogram with cumulative counts, Prometheus style"""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self._counts = [0] * (len(self.bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = len(self.bounds)
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        buckets, running = {}, 0
+        for bound, count in zip(self.bounds + ('+Inf',), counts):
+            running += count
+            buckets[str(bound)] = running
+        return {'buckets': buckets, 'count': running, 'sum': total}
+
+
+def _reserve(tokens: float, elapsed: float, rate: float, burst: float,
+             max_wait: float) -> Tuple[float, Optional[float]]:
+    """Refill, then try to take one token.
+
+    Returns the new token balance and the wait before the token is usable,
+    or None for the wait if it would exceed max_wait (nothing is taken). The
+    balance goes negative while requests are queued for future tokens.
+    """
+    tokens = min(burst, tokens + elapsed * rate)
+    wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+    if wait > max_wait:
+        return tokens, None
+    return tokens - 1, wait
+
+
+class TokenBucket:
+    """In-process token bucket refilled at ``rate`` tokens per second"""
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """Reserve one token; returns seconds to wait before using it, or None if refused"""
+        with self._lock:
+            now = self._clock()
+            self._tokens, wait = _reserve(self._tokens, now - self._updated, self.rate, self.burst, max_wait)
+            self._updated = now
+            return wait
+
+    def refund(self):
+        """Return a token reserved by a request that was not carried out"""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+
+class SQLiteTokenBucket:
+    """Token bucket whose state lives in SQLite, shared by every process on the host.
+
+    Each reservation is one short IMMEDIATE transaction, so SQLite's file lock
+    serializes processes the same way TokenBucket's mutex serializes threads.
+    """
+
+    def __init__(self, path: str, rate: float, burst: float, name: str = 'gemini'):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self.name = name
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS token_bucket ('
+            ' name TEXT PRIMARY KEY,'
+            ' tokens REAL NOT NULL,'
+            ' updated_at REAL NOT NULL)'
+        )
+
+    def _update(self, change: Callable[[float, float], Tuple[float, Optional[float]]]) -> Optional[float]:
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                now = time.time()
+                row = self._conn.execute(
+                    'SELECT tokens, updated_at FROM token_bucket WHERE name = ?', (self.name,)
+                ).fetchone()
+                tokens, updated_at = row if row is not None else (float(self.burst), now)
+                tokens, result = change(tokens, max(0.0, now - updated_at))
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO token_bucket (name, tokens, updated_at) VALUES (?, ?, ?)',
+                    (self.name, tokens, now),
+                )
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            return result
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        return self._update(lambda tokens, elapsed: _reserve(tokens, elapsed, self.rate, self.burst, max_wait))
+
+    def refund(self):
+        self._update(lambda tokens, elapsed: (min(self.burst, tokens + elapsed * self.rate + 1), None))
+
+    def named(self, name: str, rate: float, burst: float) -> 'SQLiteTokenBucket':
+        """Another bucket in the same file, sharing this one's connection"""
+        bucket = copy.copy(self)
+        bucket.name, bucket.rate, bucket.burst = name, rate, burst
+        return bucket
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Same arithmetic as _reserve, run atomically on the server. A refused
+# reservation and a refund both return -1.
+_REDIS_RESERVE = """
+local rate, burst, max_wait, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or burst
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate)
+local wait = -1
+if ARGV[5] == 'refund' then
+    tokens = math.min(burst, tokens + 1)
+else
+    local needed = 0
+    if tokens < 1 then needed = (1 - tokens) / rate end
+    if needed <= max_wait then
+        tokens = tokens - 1
+        wait = needed
+    end
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+return tostring(wait)
+"""
+
+
+class RedisTokenBucket:
+    """Token bucket kept in a Redis-compatible server, shared by every worker using it.
+
+    Each reservation is one Lua script, so the server serializes workers the
+    way SQLite's file lock does for SQLiteTokenBucket. Time comes from the
+    calling host, so worker clocks should be kept in sync. Idle buckets
+    expire once they would be full again.
+    """
+
+    def __init__(self, client, rate: float, burst: float, name: str = 'gemini', prefix: str = 'phq9:bucket:'):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.client = client
+        self.rate = rate
+        self.burst = burst
+        self.name = name
+        self.prefix = prefix
+        self._script = client.register_script(_REDIS_RESERVE)
+
+    def _call(self, max_wait: float, action: str) -> Optional[float]:
+        wait = float(self._script(keys=[self.prefix + self.name],
+                                  args=[self.rate, self.burst, max_wait, time.time(), action]))
+        return None if wait < 0 else wait
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        return self._call(max_wait, 'reserve')
+
+    def refund(self):
+        self._call(0.0, 'refund')
+
+    def named(self, name: str, rate: float, burst: float) -> 'RedisTokenBucket':
+        """Another bucket on the same server"""
+        return RedisTokenBucket(self.client, rate, burst, name, self.prefix)
+
+    def close(self):
+        pass
+
+
+class AdmissionRejectedError(Exception):
+    """Raised where a call cannot simply return False, e.g. when a whole batch was not admitted"""
+
+
+class AdmissionController:
+    """Decides, per request, whether to wait for a token or fall back immediately"""
+
+    def __init__(self, bucket, max_wait: float = 2.0, session_rate: Optional[float] = None,
+                 session_burst: float = 3, max_sessions: int = 10_000,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep,
+                 share_sessions: bool = False):
+        self.bucket = bucket
+        self.max_wait = max_wait
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+        self.max_sessions = max_sessions
+        # Per-session buckets live next to the global one, so a session keeps its limit across workers
+        self.share_sessions = share_sessions
+        self._clock = clock
+        self._sleep = sleep
+        self._sessions: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._counters = {'admitted': 0, 'rejected_global': 0, 'rejected_session': 0}
+        self.wait_ms = Histogram(WAIT_BUCKETS_MS)
+        self.queue_depth = Histogram(QUEUE_DEPTH_BUCKETS)
+
+    def _session_bucket(self, session_id: Optional[str]):
+        if not self.session_rate or session_id is None:
+            return None
+        with self._lock:
+            bucket = self._sessions.get(session_id)
+            if bucket is None:
+                if self.share_sessions:
+                    bucket = self.bucket.named(f'session:{session_id}', self.session_rate, self.session_burst)
+                else:
+                    bucket = TokenBucket(self.session_rate, self.session_burst, self._clock)
+                self._sessions[session_id] = bucket
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session_id)
+            return bucket
+
+    def admit(self, session_id: Optional[str] = None, global_quota: bool = True) -> bool:
+        """Wait for a token if one is due within max_wait; False means serve the fallback.
+
+        With global_quota=False only the session's limit is checked, for
+        requests whose provider call is batched and admitted per batch.
+        """
+        with self._lock:
+            self.queue_depth.observe(self._waiting)
+
+        session_bucket = self._session_bucket(session_id)
+        if session_bucket is not None and session_bucket.reserve(0.0) is None:
+            self._count('rejected_session')
+            return False
+        if not global_quota:
+            return True
+        wait = self.bucket.reserve(self.max_wait)
+        if wait is None:
+            if session_bucket is not None:
+                session_bucket.refund()
+            self._count('rejected_global')
+            return False
+
+        self.wait_ms.observe(wait * 1000)
+        self._count('admitted')
+        if wait > 0:
+            with self._lock:
+                self._waiting += 1
+            try:
+                self._sleep(wait)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+        return True
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            stats: Dict[str, object] = dict(self._counters)
+            stats['queue_depth'] = self._waiting
+            stats['tracked_sessions'] = len(self._sessions)
+        stats['wait_ms'] = self.wait_ms.snapshot()
+        stats['queue_depth_histogram'] = self.queue_depth.snapshot()
+        return stats
@@ -0,0 +1,192 @@
+"""Bulk PHQ-9 rescoring from the command line.
+
+Reads questionnaires in fixed-size chunks, scores each chunk with
+scoring.score_matrix and appends the results to the output. Memory use is
+bounded by the chunk size, whatever the size of the input.
+
+Supported inputs: CSV, JSONL, Parquet and the app's SQLite response store.
+Item columns default to q1..q9 (the storage schema). JSONL records written by
+the app's JSONL store, which keep the answers in a "responses" list, are
+expanded automatically.
+
+Usage:
+    python rescore.py responses.csv -o scored.csv
+    python rescore.py data/phq9_responses.db -o scored.parquet --id-column id
+"""
+
+import argparse
+import os
+import sys
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from scoring import MISSING, NUM_ITEMS, score_matrix, severity_names
+
+DEFAULT_ITEM_COLUMNS = [f'q{i + 1}' for i in range(NUM_ITEMS)]
+FORMATS = ('csv', 'jsonl', 'parquet', 'sqlite')
+
+Chunk = Tuple[Optional[pd.Series], np.ndarray]
+
+
+def detect_format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    if extension in ('.parquet', '.pq'):
+        return 'parquet'
+    if extension in ('.db', '.sqlite', '.sqlite3'):
+        return 'sqlite'
+    return 'csv'
+
+
+def to_item_matrix(frame: pd.DataFrame, item_columns: List[str]) -> np.ndarray:
+    """Convert item columns to an int8 matrix, with blanks, fractions and junk as MISSING"""
+    if 'responses' in frame.columns and not set(item_columns) <= set(frame.columns):
+        expanded = pd.DataFrame(frame['responses'].tolist(), index=frame.index).iloc[:, :NUM_ITEMS]
+        expanded.columns = item_columns[:expanded.shape[1]]
+        frame = expanded
+    missing_columns = [column for column in item_columns if column not in frame.columns]
+    if missing_columns:
+        raise ValueError(f"Input is missing item columns: {', '.join(missing_columns)}")
+    values = frame[item_columns].apply(pd.to_numeric, errors='coerce')
+    # 2.5 is not an answer; casting would truncate it to a valid 2
+    values = values.where(values == np.floor(values))
+    return values.fillna(MISSING).clip(-128, 127).to_numpy(dtype=np.int8)
+
+
+def read_frames(path: str, input_format: str, chunk_size: int, columns: Optional[List[str]]) -> Iterator[pd.DataFrame]:
+    """Yield raw DataFrames of at most chunk_size rows from any supported input"""
+    if input_format == 'csv':
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns, dtype=str)
+    elif input_format == 'jsonl':
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False)
+    elif input_format == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet input requires pyarrow: pip install pyarrow")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    elif input_format == 'sqlite':
+        import sqlite3
+        conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            yield from pd.read_sql_query('SELECT * FROM responses ORDER BY id', conn, chunksize=chunk_size)
+        finally:
+            conn.close()
+    else:
+        raise ValueError(f"Unknown input format: {input_format!r}")
+
+
+def read_chunks(path: str, input_format: str, item_columns: List[str], id_column: Optional[str],
+                chunk_size: int) -> Iterator[Chunk]:
+    """Yield (ids, item matrix) pairs of at most chunk_size rows"""
+    columns = None
+    if input_format in ('csv', 'parquet'):
+        columns = list(item_columns) + ([id_column] if id_column else [])
+    for frame in read_frames(path, input_format, chunk_size, columns):
+        ids = frame[id_column].reset_index(drop=True) if id_column else None
+        yield ids, to_item_matrix(frame, item_columns)
+
+
+def score_chunk(ids: Optional[pd.Series], items: np.ndarray, max_missing: int,
+                id_column: Optional[str]) -> pd.DataFrame:
+    result = score_matrix(items, max_missing=max_missing)
+    frame = pd.DataFrame({
+        'total_score': result['total_score'],
+        'severity': severity_names(result['severity']),
+        'item9_positive': result['item9_positive'],
+        'missing_items': result['missing_items'],
+        'valid': result['valid'],
+    })
+    if ids is not None:
+        frame.insert(0, id_column, ids)
+    return frame
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV, JSONL or Parquet output"""
+
+    def __init__(self, path: Optional[str], output_format: str):
+        self.path = path
+        self.output_format = output_format
+        self._first = True
+        self._parquet_writer = None
+        if output_format == 'parquet' and not path:
+            raise SystemExit("Parquet output needs an output path (-o)")
+
+    def write(self, frame: pd.DataFrame):
+        if self.output_format == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            target = self.path if self.path else sys.stdout
+            mode = 'w' if self._first else 'a'
+            if self.output_format == 'jsonl':
+                text = frame.to_json(orient='records', lines=True, force_ascii=False)
+                if text and not text.endswith('\n'):
+                    text += '\n'
+                if self.path:
+                    with open(self.path, mode, encoding='utf-8') as f:
+                        f.write(text)
+                else:
+                    sys.stdout.write(text)
+            else:
+                frame.to_csv(target, mode=mode, header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def rescore(input_path: str, output_path: Optional[str] = None, input_format: Optional[str] = None,
+            output_format: Optional[str] = None, item_columns: Optional[List[str]] = None,
+            id_column: Optional[str] = None, chunk_size: int = 65536, max_missing: int = 2) -> int:
+    """Rescore a dataset chunk by chunk; returns the number of rows processed"""
+    input_format = input_format or detect_format(input_path)
+    output_format = output_format or (detect_format(output_path) if output_path else 'csv')
+    if output_format == 'sqlite':
+        raise SystemExit("SQLite is only supported as an input format")
+    item_columns = item_columns or DEFAULT_ITEM_COLUMNS
+    writer = ChunkWriter(output_path, output_format)
+    rows = 0
+    try:
+        for ids, items in read_chunks(input_path, input_format, item_columns, id_column, chunk_size):
+            writer.write(score_chunk(ids, items, max_missing, id_column))
+            rows += len(items)
+    finally:
+        writer.close()
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Rescore PHQ-9 questionnaires in bulk")
+    parser.add_argument('input', help="Input file (CSV, JSONL, Parquet or the app's SQLite store)")
+    parser.add_argument('-o', '--output', help="Output file; CSV to stdout if omitted")
+    parser.add_argument('--input-format', choices=FORMATS, help="Override format detection for the input")
+    parser.add_argument('--output-format', choices=FORMATS[:3], help="Override format detection for the output")
+    parser.add_argument('--items', help="Comma-separated item columns in question order (default q1..q9)")
+    parser.add_argument('--id-column', help="Column copied through to the output to identify rows")
+    parser.add_argument('--chunk-size', type=int, default=65536, help="Rows scored per chunk (default 65536)")
+    parser.add_argument('--max-missing', type=int, default=2,
+                        help="Most unanswered items a questionnaire may have and still be prorated (default 2)")
+    args = parser.parse_args(argv)
+
+    item_columns = args.items.split(',') if args.items else None
+    if item_columns is not None and len(item_columns) != NUM_ITEMS:
+        parser.error(f"--items needs exactly {NUM_ITEMS} column names")
+    rows = rescore(args.input, args.output, args.input_format, args.output_format,
+                   item_columns, args.id_column, args.chunk_size, args.max_missing)
+    print(f"Scored {rows} questionnaires", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""Deadlines, retries and a circuit breaker for calls to the AI provider.
+
+A slow or failing provider must never tie up every session thread. Each call
+gets a per-attempt timeout inside an overall deadline, retryable errors are
+retried with jittered exponential backoff, and after repeated provider
+failures (timeouts, dropped connections, rate limiting and 5xx responses)
+the breaker opens so requests go straight to the fallback analysis until the
+cool-down window has passed. A rejected prompt or a blocked reply says
+nothing about the provider's health and never opens it.
+"""
+
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Provider errors worth retrying, matched by name so google.api_core stays optional
+RETRYABLE_ERROR_NAMES = frozenset({
+    'ResourceExhausted',
+    'TooManyRequests',
+    'ServiceUnavailable',
+    'InternalServerError',
+    'DeadlineExceeded',
+    'GatewayTimeout',
+    'Aborted',
+})
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an error is transient and the call may succeed if repeated"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """Whether an error means the provider is unhealthy: transient errors and every 5xx"""
+    return is_retryable(error) or any(cls.__name__ == 'ServerError' for cls in type(error).__mro__)
+
+
+class CircuitOpenError(Exception):
+    """Raised when the breaker is open and the call was not attempted"""
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when the overall deadline leaves no time for another attempt"""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How long a single call may take and how often it is retried"""
+    max_attempts: int = 3
+    attempt_timeout: float = 20.0
+    deadline: float = 45.0
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number ``attempt`` (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+def call_with_retries(fn: Callable[[float], T], policy: RetryPolicy,
+                      retryable: Callable[[BaseException], bool] = is_retryable,
+                      sleep: Callable[[float], None] = time.sleep,
+                      before_retry: Optional[Callable[[], None]] = None) -> T:
+    """Call ``fn(timeout)`` until it succeeds, fails permanently or the deadline passes.
+
+    ``before_retry`` runs after the backoff and before every attempt but the
+    first, e.g. to take a rate-limit token; whatever it raises ends the retries.
+    """
+    deadline = time.monotonic() + policy.deadline
+    attempt = 0
+    while True:
+        attempt += 1
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceededError(f"AI call deadline of {policy.deadline}s exceeded")
+        try:
+            return fn(min(policy.attempt_timeout, remaining))
+        except Exception as e:
+            if attempt >= policy.max_attempts or not retryable(e):
+                raise
+            delay = policy.backoff(attempt)
+            if time.monotonic() + delay >= deadline:
+                raise
+            logger.info("Retrying AI call after %s (attempt %d, backoff %.2fs)", type(e).__name__, attempt, delay)
+            sleep(delay)
+            if before_retry is not None:
+                before_retry()
+
+
+class CircuitBreaker:
+    """Classic closed/open/half-open breaker.
+
+    ``failure_threshold`` consecutive provider failures open the circuit. Once
+    ``reset_timeout`` seconds have passed a single trial call is let through;
+    its outcome closes the circuit again or re-opens it for another window.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._counters = {'trips': 0, 'rejected': 0, 'successes': 0, 'failures': 0, 'ignored_errors': 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._counters['rejected'] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._counters['successes'] += 1
+            self._consecutive_failures = 0
+            if self._state != self.CLOSED:
+                logger.info("AI circuit breaker closed")
+            self._state = self.CLOSED
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._counters['failures'] += 1
+            self._consecutive_failures += 1
+            state = self._current_state()
+            if state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if state != self.OPEN:
+                    self._counters['trips'] += 1
+                    logger.warning("AI circuit breaker opened after %d consecutive failures",
+                                   self._consecutive_failures)
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._trial_in_flight = False
+
+    def record_ignored(self):
+        """An attempt ended in an error that says nothing about the provider's health"""
+        with self._lock:
+            self._counters['ignored_errors'] += 1
+            # Neither a failure nor a success: a half-open circuit just lets the next call be the trial
+            self._trial_in_flight = False
+
+    def call(self, fn: Callable[[], T],
+             is_failure: Callable[[BaseException], bool] = is_provider_failure) -> T:
+        """Run ``fn`` under the breaker, raising CircuitOpenError if it is open.
+
+        Only exceptions for which ``is_failure`` is true count towards opening
+        the circuit; the rest (a bad request, a local quota rejection) are
+        re-raised without being counted.
+        """
+        if not self.allow():
+            raise CircuitOpenError("AI circuit breaker is open")
+        try:
+            result = fn()
+        except Exception as e:
+            if is_failure(e):
+                self.record_failure()
+            else:
+                self.record_ignored()
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self) -> Dict[str, object]:
+        """State and counters for monitoring"""
+        with self._lock:
+            state = self._current_state()
+            snapshot = dict(self._counters)
+            snapshot['state'] = state
+            snapshot['consecutive_failures'] = self._consecutive_failures
+            snapshot['open_for_seconds'] = (
+                self._clock() - self._opened_at if state == self.OPEN else 0.0
+            )
+            return snapshot
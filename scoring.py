@@ -0,0 +1,80 @@
+"""PHQ-9 scoring with no Streamlit dependency.
+
+get_severity_level maps one total to its band. ``score_matrix`` scores a whole
+(N x 9) int8 matrix in one vectorized pass: total score, severity band,
+item-9 safety flag and missing-item handling.
+
+Missing answers are encoded as -1 (any value outside 0-3 is treated as
+missing). Following the usual PHQ-9 convention, a questionnaire with at
+most ``max_missing`` unanswered items is prorated (mean of the answered
+items x 9, rounded half up); one with more is marked invalid with total and band -1.
+"""
+
+from typing import Dict
+
+import numpy as np
+
+NUM_ITEMS = 9
+MAX_ITEM_SCORE = 3
+MAX_TOTAL_SCORE = NUM_ITEMS * MAX_ITEM_SCORE
+MISSING = -1
+SAFETY_ITEM = 8  # item 9, thoughts of self-harm
+
+SEVERITY_LEVELS = ('minimal', 'mild', 'moderate', 'severe')
+# Inclusive upper bound of every band except the last
+SEVERITY_UPPER_BOUNDS = (4, 9, 14)
+_UPPER_BOUNDS = np.array(SEVERITY_UPPER_BOUNDS, dtype=np.int16)
+
+
+def get_severity_level(score: int) -> str:
+    """Determine severity level based on PHQ-9 score"""
+    if score <= 4:
+        return 'minimal'
+    elif score <= 9:
+        return 'mild'
+    elif score <= 14:
+        return 'moderate'
+    else:
+        return 'severe'
+
+
+def score_matrix(items: np.ndarray, max_missing: int = 2) -> Dict[str, np.ndarray]:
+    """Score N questionnaires at once.
+
+    Returns arrays of length N:
+    - total_score (int16, -1 if invalid)
+    - severity (int8 index into SEVERITY_LEVELS, -1 if invalid)
+    - item9_positive (bool, False when item 9 is missing)
+    - missing_items (int8)
+    - valid (bool)
+    """
+    items = np.asarray(items)
+    if items.ndim != 2 or items.shape[1] != NUM_ITEMS:
+        raise ValueError(f"Expected an (N x {NUM_ITEMS}) matrix, got shape {items.shape}")
+    answered = (items >= 0) & (items <= MAX_ITEM_SCORE)
+    n_answered = answered.sum(axis=1, dtype=np.int8)
+    missing_items = (NUM_ITEMS - n_answered).astype(np.int8)
+    raw = np.where(answered, items, 0).sum(axis=1, dtype=np.int16)
+
+    valid = (missing_items <= max_missing) & (n_answered > 0)
+    # Round half up: np.rint rounds half to even, which would put a prorated 4.5 in 'minimal'
+    prorated = np.floor(raw * NUM_ITEMS / np.maximum(n_answered, 1) + 0.5).astype(np.int16)
+    total = np.where(missing_items == 0, raw, prorated)
+    total = np.where(valid, total, MISSING).astype(np.int16)
+
+    severity = np.searchsorted(_UPPER_BOUNDS, total, side='left').astype(np.int8)
+    severity[~valid] = MISSING
+
+    return {
+        'total_score': total,
+        'severity': severity,
+        'item9_positive': answered[:, SAFETY_ITEM] & (items[:, SAFETY_ITEM] > 0),
+        'missing_items': missing_items,
+        'valid': valid,
+    }
+
+
+def severity_names(codes: np.ndarray) -> np.ndarray:
+    """Map severity codes from score_matrix to names ('' for invalid rows)"""
+    names = np.array(SEVERITY_LEVELS + ('',), dtype=object)
+    return names[np.where(codes < 0, len(SEVERITY_LEVELS), codes)]
@@ -0,0 +1,191 @@
+"""Shared state for running several app workers behind a load balancer.
+
+A backend hands out the pieces that must outlive one worker process: the
+shared analysis cache tier, the Gemini token buckets, the response store and
+a session store. Two backends are provided, selected by PHQ9_SHARED_STATE:
+- sqlite:///path/to/dir - SQLite files in one directory, for workers on one
+  host (or a shared volume with working file locks)
+- redis://host:6379/0 (or rediss://) - any Redis-compatible server, for
+  workers on several hosts. Needs the ``redis`` package, imported on first use.
+
+The session store backs the non-sticky mode (PHQ9_STICKY_SESSIONS=0): the app
+saves a small snapshot of each session under its session id, so a reconnect
+that lands on another worker resumes where it left off. The session id never
+leaves the server. The page URL carries a random resume token instead; it
+expires soon after the session goes idle and is used up when redeemed, so a
+shared or bookmarked link cannot reopen someone else's screening later.
+"""
+
+import functools
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+from analysis_cache import RedisTier, SQLiteTier
+from ratelimit import RedisTokenBucket, SQLiteTokenBucket
+from storage import RedisResponseStore, ResponseStore, SQLiteResponseStore
+
+
+class SQLiteSessionStore:
+    """Session snapshots in a SQLite table; expired rows are purged as new ones are saved"""
+
+    PURGE_EVERY = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._saves = 0
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            ' id TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL)'
+        )
+
+    def load(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value FROM sessions WHERE id = ? AND expires_at > ?', (session_id, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def take(self, session_id: str) -> Optional[str]:
+        """Load and delete in one step, so only one caller gets the value"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute(
+                    'SELECT value FROM sessions WHERE id = ? AND expires_at > ?', (session_id, time.time())
+                ).fetchone()
+                self._conn.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return row[0] if row else None
+
+    def save(self, session_id: str, value: str, ttl: float):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO sessions (id, value, expires_at) VALUES (?, ?, ?)',
+                (session_id, value, now + ttl),
+            )
+            self._saves += 1
+            if self._saves % self.PURGE_EVERY == 0:
+                self._conn.execute('DELETE FROM sessions WHERE expires_at <= ?', (now,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RedisSessionStore:
+    """Session snapshots as Redis keys that expire with the session"""
+
+    def __init__(self, client, prefix: str = 'phq9:session:'):
+        self.client = client
+        self.prefix = prefix
+
+    def load(self, session_id: str) -> Optional[str]:
+        return self.client.get(self.prefix + session_id)
+
+    def take(self, session_id: str) -> Optional[str]:
+        """Load and delete in one step, so only one caller gets the value"""
+        return self.client.getdel(self.prefix + session_id)
+
+    def save(self, session_id: str, value: str, ttl: float):
+        self.client.set(self.prefix + session_id, value, px=int(ttl * 1000))
+
+    def close(self):
+        pass
+
+
+class SQLiteBackend:
+    """One SQLite file per concern, all in one directory"""
+
+    name = 'sqlite'
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.responses_path = os.path.join(directory, 'phq9_responses.db')
+
+    def cache_tier(self, max_entries: int, ttl: Optional[float]) -> SQLiteTier:
+        return SQLiteTier(os.path.join(self.directory, 'analysis_cache.db'), max_entries=max_entries, ttl=ttl)
+
+    def token_bucket(self, rate: float, burst: float) -> SQLiteTokenBucket:
+        return SQLiteTokenBucket(os.path.join(self.directory, 'ratelimit.db'), rate, burst)
+
+    def response_store(self) -> ResponseStore:
+        return SQLiteResponseStore(self.responses_path)
+
+    def session_store(self) -> SQLiteSessionStore:
+        return SQLiteSessionStore(os.path.join(self.directory, 'sessions.db'))
+
+
+class RedisBackend:
+    """Everything on one Redis-compatible server, under a common key prefix"""
+
+    name = 'redis'
+    # Responses are kept as a list on the server, not in a SQLite file the analytics can read
+    responses_path = None
+
+    def __init__(self, url: str, prefix: str = 'phq9:', client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+        self.prefix = prefix
+
+    def cache_tier(self, max_entries: int, ttl: Optional[float]) -> RedisTier:
+        # The server's maxmemory policy bounds the size instead of max_entries
+        return RedisTier(self.client, prefix=self.prefix + 'analysis:', ttl=ttl)
+
+    def token_bucket(self, rate: float, burst: float) -> RedisTokenBucket:
+        return RedisTokenBucket(self.client, rate, burst, prefix=self.prefix + 'bucket:')
+
+    def response_store(self) -> ResponseStore:
+        return RedisResponseStore(self.client, key=self.prefix + 'responses')
+
+    def session_store(self) -> RedisSessionStore:
+        return RedisSessionStore(self.client, prefix=self.prefix + 'session:')
+
+
+_RESUME_PREFIX = 'resume:'
+
+
+def issue_resume_token(store, session_id: str, ttl: float, token: Optional[str] = None) -> str:
+    """A random token that resumes a session once within ``ttl``; pass ``token`` to extend an existing one"""
+    token = token or secrets.token_urlsafe(24)
+    store.save(_RESUME_PREFIX + token, session_id, ttl)
+    return token
+
+
+def redeem_resume_token(store, token: str) -> Optional[str]:
+    """The session id behind a resume token, using the token up; None if unknown, expired or used"""
+    return store.take(_RESUME_PREFIX + token)
+
+
+@functools.lru_cache(maxsize=None)
+def get_backend(url: str):
+    """The backend for a PHQ9_SHARED_STATE URL, created once per process"""
+    scheme = urlparse(url).scheme
+    if scheme == 'sqlite':
+        # sqlite:///abs/dir and sqlite://relative/dir
+        return SQLiteBackend(url[len('sqlite://'):])
+    if scheme in ('redis', 'rediss', 'unix'):
+        return RedisBackend(url)
+    raise ValueError(f"Unknown shared state backend: {url!r}")
+
+
+def backend_from_env():
+    """Backend selected by PHQ9_SHARED_STATE, or None when workers share nothing"""
+    url = os.getenv('PHQ9_SHARED_STATE')
+    return get_backend(url) if url else None
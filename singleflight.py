@@ -0,0 +1,81 @@
+"""Single-flight call coalescing.
+
+When several threads ask for the same key at once, only the first (the
+leader) runs the function; the rest wait for it and receive the same result,
+or the same exception. Once the call finishes the key is forgotten, so this
+only deduplicates *concurrent* work - results that should outlive the call
+belong in a cache.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key"""
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.issued = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn once per concurrent group of callers of key.
+
+        Returns (result, shared), where shared is True for callers that
+        received another caller's result instead of running fn themselves.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.issued += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, call.waiters)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            requests = self.issued + self.coalesced
+            return {
+                'issued': self.issued,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls),
+                'max_waiters': self.max_waiters,
+                'coalesce_rate': self.coalesced / requests if requests else 0.0,
+            }
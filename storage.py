@@ -0,0 +1,263 @@
+"""Durable storage for completed screenings.
+
+Completed assessments are handed to a BatchingWriter, which queues them and
+flushes them to a ResponseStore in batches from a background thread, so the
+submit click never waits on disk. Two stores are provided:
+- SQLiteResponseStore (default): WAL mode, indexed on timestamp, language and
+  severity, with the analytics rollups (see analytics.py) updated in the same
+  transaction as every batch
+- JSONLResponseStore: one JSON object per line in an append-only log
+- RedisResponseStore: JSON records appended to a list on a Redis-compatible
+  server, for workers on several hosts (see shared_state.py)
+"""
+
+import abc
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from analytics import ensure_rollups, refresh_rollups
+from scoring import NUM_ITEMS
+
+logger = logging.getLogger(__name__)
+
+
+def to_row(record: Dict) -> Dict:
+    """Normalize a saved response into a flat, JSON-safe record"""
+    responses = record['responses']
+    if isinstance(responses, dict):
+        responses = [responses.get(i) for i in range(NUM_ITEMS)]
+    return {
+        'timestamp': record['timestamp'],
+        'language': record['language'],
+        'responses': [None if score is None else int(score) for score in responses],
+        'total_score': int(record['total_score']),
+        'severity': record['severity'],
+    }
+
+
+class ResponseStore(abc.ABC):
+    """Interface for response backends; write_batch is only called from the writer thread"""
+
+    @abc.abstractmethod
+    def write_batch(self, records: List[Dict]):
+        """Durably store a batch of to_row() records"""
+
+    def close(self):
+        pass
+
+
+class SQLiteResponseStore(ResponseStore):
+    """Stores one row per assessment with one column per item"""
+
+    ITEM_COLUMNS = [f'q{i + 1}' for i in range(NUM_ITEMS)]
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        items = ', '.join(f'{column} INTEGER' for column in self.ITEM_COLUMNS)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' timestamp TEXT NOT NULL,'
+            ' language TEXT NOT NULL,'
+            ' total_score INTEGER NOT NULL,'
+            f' severity TEXT NOT NULL, {items})'
+        )
+        for column in ('timestamp', 'language', 'severity'):
+            self._conn.execute(f'CREATE INDEX IF NOT EXISTS idx_responses_{column} ON responses ({column})')
+        ensure_rollups(self._conn)
+        # Databases written before the rollups existed are folded in once here
+        refresh_rollups(self._conn)
+        self._conn.commit()
+        self._insert_sql = (
+            'INSERT INTO responses (timestamp, language, total_score, severity, '
+            f'{", ".join(self.ITEM_COLUMNS)}) VALUES ({", ".join("?" * (4 + NUM_ITEMS))})'
+        )
+
+    def write_batch(self, records: List[Dict]):
+        rows = [
+            (r['timestamp'], r['language'], r['total_score'], r['severity'], *r['responses'])
+            for r in records
+        ]
+        with self._conn:
+            self._conn.executemany(self._insert_sql, rows)
+            refresh_rollups(self._conn)
+
+    def close(self):
+        self._conn.close()
+
+
+class JSONLResponseStore(ResponseStore):
+    """Append-only log with one JSON record per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write_batch(self, records: List[Dict]):
+        self._file.write(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class RedisResponseStore(ResponseStore):
+    """Appends JSON records to a Redis list; one RPUSH per batch"""
+
+    def __init__(self, client, key: str = 'phq9:responses'):
+        self.client = client
+        self.key = key
+
+    def write_batch(self, records: List[Dict]):
+        self.client.rpush(self.key, *(json.dumps(r, ensure_ascii=False) for r in records))
+
+
+class BatchingWriter:
+    """Bounded queue drained into a ResponseStore by a background thread.
+
+    ``submit`` never blocks for longer than ``put_timeout``. When the queue is
+    full the record is dropped and counted, which is the backpressure signal
+    to watch in ``metrics()``.
+    """
+
+    def __init__(self, store: ResponseStore, max_queue: int = 10_000, batch_size: int = 200,
+                 flush_interval: float = 0.5, put_timeout: float = 0.0):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue: "queue.Queue[Optional[Dict]]" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._metrics = {
+            'enqueued': 0, 'written': 0, 'dropped': 0, 'batches': 0,
+            'failed_batches': 0, 'max_queue_depth': 0, 'last_flush_ms': 0.0,
+        }
+        self._pending = 0
+        self._drained = threading.Condition(self._lock)
+        self._thread = threading.Thread(target=self._run, name='phq9-response-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, record: Dict) -> bool:
+        """Queue a record for writing; returns False if it was dropped"""
+        row = to_row(record)
+        with self._lock:
+            self._pending += 1
+        try:
+            if self.put_timeout > 0:
+                self._queue.put(row, timeout=self.put_timeout)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self._pending -= 1
+                self._metrics['dropped'] += 1
+                dropped = self._metrics['dropped']
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning("Response queue full; %d records dropped so far", dropped)
+            return False
+        with self._lock:
+            self._metrics['enqueued'] += 1
+            depth = self._queue.qsize()
+            if depth > self._metrics['max_queue_depth']:
+                self._metrics['max_queue_depth'] = depth
+        return True
+
+    def _take_batch(self) -> Optional[List[Dict]]:
+        """Block for the first record, then gather more until the batch is full or the interval passes"""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                record = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if record is None:
+                self._queue.put(None)
+                break
+            batch.append(record)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            self._write(batch)
+            with self._lock:
+                self._pending -= len(batch)
+                if self._pending <= 0:
+                    self._drained.notify_all()
+
+    def _write(self, batch: List[Dict]):
+        started = time.perf_counter()
+        try:
+            self.store.write_batch(batch)
+        except Exception:
+            logger.exception("Failed to write %d responses", len(batch))
+            with self._lock:
+                self._metrics['failed_batches'] += 1
+            return
+        with self._lock:
+            self._metrics['written'] += len(batch)
+            self._metrics['batches'] += 1
+            self._metrics['last_flush_ms'] = (time.perf_counter() - started) * 1000
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far has been written"""
+        with self._lock:
+            return self._drained.wait_for(lambda: self._pending <= 0, timeout)
+
+    def close(self, timeout: float = 5.0):
+        """Drain the queue and close the store.
+
+        If the writer is still busy after ``timeout``, the store is left open
+        rather than closed under a batch in progress.
+        """
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            with self._lock:
+                pending = self._pending
+            logger.warning("Response writer still busy after %.1fs; %d records not yet written, store left open",
+                           timeout, pending)
+            return
+        self.store.close()
+
+    def metrics(self) -> Dict[str, float]:
+        with self._lock:
+            metrics = dict(self._metrics)
+            # Queued or in a batch being written
+            metrics['pending'] = self._pending
+        metrics['queue_depth'] = self._queue.qsize()
+        metrics['queue_capacity'] = self._queue.maxsize
+        return metrics
+
+
+def create_store(backend: str, path: str) -> ResponseStore:
+    """Build a store by name: 'sqlite' or 'jsonl'"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if backend == 'sqlite':
+        return SQLiteResponseStore(path)
+    if backend == 'jsonl':
+        return JSONLResponseStore(path)
+    raise ValueError(f"Unknown storage backend: {backend!r}")
@@ -0,0 +1,170 @@
+import threading
+
+import pytest
+
+from ai_analysis import AnalysisService, analysis_backend_from_env
+from analysis_backends import AnalysisBackend, BatchedBackend, LocalBackend, StubBackend
+from gemini_client import GeminiRegistry
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        AnalysisBackend()
+
+
+def test_stub_is_deterministic():
+    model = StubBackend(model_name='stub-a').get_model()
+    first = model.generate_content('prompt one').text
+    assert model.generate_content('prompt one').text == first
+    assert StubBackend(model_name='stub-a').get_model().generate_content('prompt one').text == first
+    assert model.generate_content('prompt two').text != first
+    assert 'stub-a' in first
+    chunks = model.generate_content('prompt one', stream=True)
+    assert [chunk.text for chunk in chunks] == [first]
+
+
+def test_backend_selection_from_env(monkeypatch):
+    monkeypatch.delenv('PHQ9_ANALYSIS_BACKEND', raising=False)
+    assert isinstance(analysis_backend_from_env(lambda: None, 'gemini-test'), GeminiRegistry)
+
+    monkeypatch.setenv('PHQ9_ANALYSIS_BACKEND', 'stub')
+    monkeypatch.setenv('PHQ9_STUB_LATENCY_SECONDS', '0.25')
+    backend = analysis_backend_from_env(lambda: None)
+    assert isinstance(backend, StubBackend) and backend.latency == 0.25
+
+    monkeypatch.setenv('PHQ9_ANALYSIS_BACKEND', 'local')
+    monkeypatch.delenv('PHQ9_LOCAL_MODEL', raising=False)
+    with pytest.raises(ValueError):
+        analysis_backend_from_env(lambda: None)
+    monkeypatch.setenv('PHQ9_LOCAL_MODEL', '/models/tiny-instruct/')
+    monkeypatch.setenv('PHQ9_LOCAL_MAX_BATCH', '3')
+    monkeypatch.setenv('PHQ9_LOCAL_BATCH_WINDOW_MS', '10')
+    backend = analysis_backend_from_env(lambda: None)
+    assert isinstance(backend, LocalBackend)
+    assert backend.model_name == 'local:tiny-instruct'
+    assert (backend.batcher.max_batch, backend.batcher.window) == (3, 0.01)
+
+    monkeypatch.setenv('PHQ9_ANALYSIS_BACKEND', 'carrier-pigeon')
+    with pytest.raises(ValueError):
+        analysis_backend_from_env(lambda: None)
+
+
+def test_service_wraps_only_remote_backends_for_batching(monkeypatch):
+    monkeypatch.setenv('PHQ9_ANALYSIS_BACKEND', 'stub')
+    monkeypatch.setenv('PHQ9_AI_BATCH_SIZE', '1')
+    service = AnalysisService.from_env(lambda: None)
+    assert isinstance(service.registry, StubBackend) and service.admission is None
+
+    monkeypatch.setenv('PHQ9_AI_BATCH_SIZE', '4')
+    assert isinstance(AnalysisService.from_env(lambda: None).registry, BatchedBackend)
+    monkeypatch.setenv('PHQ9_ANALYSIS_BACKEND', 'local')
+    monkeypatch.setenv('PHQ9_LOCAL_MODEL', 'tiny')
+    assert isinstance(AnalysisService.from_env(lambda: None).registry, LocalBackend)
+
+
+def test_service_caches_stub_analyses(monkeypatch):
+    monkeypatch.setenv('PHQ9_ANALYSIS_BACKEND', 'stub')
+    monkeypatch.setenv('PHQ9_AI_BATCH_SIZE', '1')
+    service = AnalysisService.from_env(lambda: None)
+    responses = {i: 1 for i in range(9)}
+    analysis, warning = service.analyze(responses, 9, 'English')
+    assert warning is None and analysis.startswith('[stub analysis from stub')
+    assert service.analyze(responses, 9, 'English') == (analysis, None)
+
+
+class ScriptedLocalBackend(LocalBackend):
+    """LocalBackend whose batches are recorded and can be held, without torch"""
+
+    def __init__(self):
+        super().__init__('scripted', max_batch=8, window=0.01)
+        self.batches = []
+        self.hold = threading.Event()
+        self.running = threading.Event()
+
+    def _load(self):
+        return None
+
+    def generate_batch(self, prompts):
+        self.batches.append(list(prompts))
+        self.running.set()
+        self.hold.wait(5)
+        return [prompt.upper() for prompt in prompts]
+
+
+def test_local_timeout_cancels_queued_prompt():
+    backend = ScriptedLocalBackend()
+    model = backend.get_model()
+    first = backend.batcher.submit('first')
+    assert backend.running.wait(5)
+
+    # The only batch slot is busy, so this prompt is still queued when it times out
+    with pytest.raises(TimeoutError):
+        model.generate_content('abandoned', request_options={'timeout': 0.05})
+
+    backend.hold.set()
+    assert first.result(5) == 'FIRST'
+    assert model.generate_content('later', request_options={'timeout': 5}).text == 'LATER'
+    assert backend.batches == [['first'], ['later']]
+    backend.batcher.close()
+
+
+@pytest.fixture(scope='module')
+def tiny_model(tmp_path_factory):
+    torch = pytest.importorskip('torch')
+    pytest.importorskip('transformers')
+    tokenizers = pytest.importorskip('tokenizers')
+    from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+
+    path = str(tmp_path_factory.mktemp('tinyllm'))
+    tokenizer = tokenizers.Tokenizer(tokenizers.models.BPE())
+    tokenizer.pre_tokenizer = tokenizers.pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = tokenizers.decoders.ByteLevel()
+    trainer = tokenizers.trainers.BpeTrainer(vocab_size=300, special_tokens=['<pad>', '<s>', '</s>'],
+                                             initial_alphabet=tokenizers.pre_tokenizers.ByteLevel.alphabet())
+    tokenizer.train_from_iterator(['PHQ-9 screening results and recommendations'] * 20, trainer)
+    fast = PreTrainedTokenizerFast(tokenizer_object=tokenizer, pad_token='<pad>', bos_token='<s>', eos_token='</s>')
+    fast.save_pretrained(path)
+    torch.manual_seed(0)
+    config = LlamaConfig(vocab_size=fast.vocab_size, hidden_size=32, intermediate_size=64, num_hidden_layers=1,
+                         num_attention_heads=2, num_key_value_heads=2, pad_token_id=0, bos_token_id=1, eos_token_id=2)
+    LlamaForCausalLM(config).save_pretrained(path)
+    return path
+
+
+def test_local_batch_matches_single_prompts(tiny_model):
+    backend = LocalBackend(tiny_model, max_new_tokens=6, quantize=False)
+    prompts = ['PHQ-9 results', 'screening and recommendations for a longer prompt', 'PHQ']
+    batched = backend.generate_batch(prompts)
+    # Left padding must not change what any prompt generates
+    assert batched == [backend.generate_batch([prompt])[0] for prompt in prompts]
+    assert backend.generate_batch(prompts) == batched
+
+
+def test_local_quantized_model_serves_concurrent_callers(tiny_model):
+    backend = LocalBackend(tiny_model, max_batch=4, window=0.05, max_new_tokens=4)
+    model = backend.get_model()
+    prompts = [f'PHQ-9 results {i}' for i in range(4)]
+    results = [None] * len(prompts)
+
+    def call(i):
+        results[i] = model.generate_content(prompts[i], request_options={'timeout': 60}).text
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(prompts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # int8 activations are scaled per batch, so only check that every caller got its own completion
+    assert all(isinstance(text, str) for text in results)
+    assert backend.batcher.stats()['items'] == 4
+    assert backend.batcher.stats()['batches'] < 4
+    backend.batcher.close()
+
+
+def test_gemini_admission_is_opt_in(monkeypatch):
+    monkeypatch.delenv('PHQ9_ANALYSIS_BACKEND', raising=False)
+    monkeypatch.delenv('PHQ9_AI_RATE_PER_SECOND', raising=False)
+    monkeypatch.delenv('PHQ9_SHARED_STATE', raising=False)
+    assert AnalysisService.from_env(lambda: None).admission is None
+    monkeypatch.setenv('PHQ9_AI_RATE_PER_SECOND', '2')
+    assert AnalysisService.from_env(lambda: None).admission.bucket.rate == 2
@@ -0,0 +1,32 @@
+import pytest
+
+from ai_analysis import AnalysisService
+from analysis_backends import StubBackend
+from analysis_cache import AnalysisCache
+from resilience import CircuitBreaker
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def cache(request, tmp_path):
+    return AnalysisCache(disk_path=str(tmp_path / 'cache.db') if request.param == 'sqlite' else None)
+
+
+def test_peek_does_not_count(cache):
+    assert cache.get('key', record=False) is None
+    cache.set('key', 'analysis')
+    assert cache.get('key', record=False) == 'analysis'
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (0, 0)
+    assert cache.get('key') == 'analysis'
+    assert cache.stats()['hits'] == 1
+
+
+def test_service_counts_one_miss_per_generated_analysis(cache):
+    service = AnalysisService(cache, StubBackend(), CircuitBreaker())
+    responses = {i: 1 for i in range(9)}
+    for _ in range(3):
+        analysis, warning = service.analyze(responses, 9, 'English')
+        assert warning is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['sets']) == (2, 1, 1)
+    assert stats['hit_rate'] == pytest.approx(2 / 3)
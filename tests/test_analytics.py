@@ -0,0 +1,80 @@
+import sqlite3
+import threading
+
+from analytics import load_summary
+from storage import SQLiteResponseStore
+
+
+def record(i):
+    responses = [(i + item) % 4 for item in range(9)]
+    return {'timestamp': f'2024-01-0{1 + i % 3}T12:00:00', 'language': 'English', 'responses': responses,
+            'total_score': sum(responses), 'severity': 'mild'}
+
+
+def totals(path):
+    conn = sqlite3.connect(path)
+    try:
+        rolled = conn.execute('SELECT COALESCE(SUM(n), 0) FROM rollup_daily').fetchone()[0]
+        count, last_id = conn.execute('SELECT COUNT(*), MAX(id) FROM responses').fetchone()
+        watermark = conn.execute("SELECT last_id FROM rollup_state WHERE name = 'rollup_daily'").fetchone()[0]
+        return rolled, count, last_id, watermark
+    finally:
+        conn.close()
+
+
+def test_concurrent_writers_and_readers_fold_each_row_once(tmp_path):
+    path = str(tmp_path / 'responses.db')
+    SQLiteResponseStore(path).close()
+    errors = []
+    done = threading.Event()
+
+    def write(worker):
+        store = SQLiteResponseStore(path)
+        try:
+            for batch in range(25):
+                store.write_batch([record(worker * 100 + batch * 2 + k) for k in range(2)])
+        except Exception as e:
+            errors.append(e)
+        finally:
+            store.close()
+
+    def read():
+        try:
+            while not done.is_set():
+                load_summary(path)
+        except Exception as e:
+            errors.append(e)
+
+    writers = [threading.Thread(target=write, args=(w,)) for w in range(4)]
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    done.set()
+    for thread in readers:
+        thread.join()
+
+    assert not errors
+    rolled, count, last_id, watermark = totals(path)
+    assert count == 200
+    assert rolled == count
+    assert watermark == last_id
+    assert load_summary(path)['assessments'] == count
+
+
+def test_summary_catches_up_rows_written_without_rollups(tmp_path):
+    path = str(tmp_path / 'responses.db')
+    store = SQLiteResponseStore(path)
+    store.write_batch([record(i) for i in range(5)])
+    store.close()
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute('DELETE FROM rollup_daily')
+        conn.execute('DELETE FROM rollup_state')
+    conn.close()
+
+    summary = load_summary(path)
+    assert summary['assessments'] == 5
+    assert sum(summary['score_distribution']) == 5
+    assert totals(path)[0] == 5
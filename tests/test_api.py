@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+import pytest
+
+import api
+
+
+def call(method, path, body=None, headers=()):
+    """Run one request through the ASGI app; returns (status, decoded JSON or text)"""
+    raw = body if isinstance(body, bytes) else (json.dumps(body).encode() if body is not None else b'')
+    messages = [{'type': 'http.request', 'body': raw, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'headers': list(headers)}
+    asyncio.run(api.app(scope, receive, send))
+    status = sent[0]['status']
+    data = b''.join(message.get('body', b'') for message in sent[1:]).decode('utf-8')
+    content_type = dict(sent[0]['headers'])[b'content-type']
+    return status, json.loads(data) if content_type.startswith(b'application/json') else data
+
+
+@pytest.fixture
+def stub_service(monkeypatch):
+    monkeypatch.setenv('PHQ9_ANALYSIS_BACKEND', 'stub')
+    monkeypatch.setenv('PHQ9_AI_BATCH_SIZE', '1')
+    monkeypatch.delenv('PHQ9_CACHE_PATH', raising=False)
+    monkeypatch.delenv('PHQ9_SHARED_STATE', raising=False)
+    monkeypatch.setattr(api, '_service', None)
+    monkeypatch.setattr(api, '_executor', None)
+    yield
+    if api._executor is not None:
+        api._executor.shutdown()
+
+
+def test_score():
+    status, payload = call('POST', '/v1/score', {'responses': [0, 1, 2, 3, 0, 1, 2, 3, 1]})
+    assert status == 200
+    assert payload['total_score'] == 13 and payload['severity'] == 'moderate'
+    assert payload['item9_positive'] is True
+    assert payload['severity_info']['level'] and payload['recommendations_html']
+
+    status, keyed = call('POST', '/v1/score', {'responses': {str(i): 1 for i in range(9)}, 'language': 'French'})
+    assert status == 200 and keyed['total_score'] == 9 and keyed['severity'] == 'mild'
+
+
+@pytest.mark.parametrize('language', [[], {'a': 1}, 3, None, 'Klingon'])
+def test_bad_language_is_a_client_error(language):
+    status, payload = call('POST', '/v1/score', {'responses': [0] * 9, 'language': language})
+    assert status == 400
+    assert payload['error'].startswith('Unsupported language')
+
+
+@pytest.mark.parametrize('body, message', [
+    ({'responses': [0] * 8}, "exactly 9 answers"),
+    ({'responses': [0] * 8 + [4]}, "question 9"),
+    ({'responses': [0] * 8 + [True]}, "question 9"),
+    ({'responses': 'all zeros'}, "must be a list"),
+    ({'responses': {'x': 1}}, "keys must be"),
+    ({}, "must be a list"),
+])
+def test_bad_responses(body, message):
+    status, payload = call('POST', '/v1/score', body)
+    assert status == 400 and message in payload['error']
+
+
+def test_request_errors():
+    assert call('POST', '/v1/score', b'{not json')[0] == 400
+    assert call('POST', '/v1/score', [1, 2])[0] == 400
+    assert call('GET', '/v1/score')[0] == 405
+    assert call('POST', '/v1/nothing-here', {})[0] == 404
+    assert call('POST', '/v1/severity-level', {'score': 28})[0] == 400
+    assert call('POST', '/v1/severity-level', {'score': 12}) == (200, {'score': 12, 'severity': 'moderate'})
+
+
+def test_batch_score():
+    assessments = [{'responses': [3] * 9}, {'responses': [0] * 9, 'language': 'French'}]
+    status, payload = call('POST', '/v1/batch/score', {'assessments': assessments, 'include_content': True})
+    assert status == 200 and payload['count'] == 2
+    assert [(r['total_score'], r['severity'], r['item9_positive']) for r in payload['results']] == [
+        (27, 'severe', True), (0, 'minimal', False)]
+    assert all('recommendations_html' in r for r in payload['results'])
+
+    status, payload = call('POST', '/v1/batch/score', {'assessments': [{'responses': [0] * 9},
+                                                                      {'responses': [0] * 9, 'language': []}]})
+    assert status == 400 and payload['error'].startswith('Assessment 1: Unsupported language')
+    assert call('POST', '/v1/batch/score', {'assessments': []})[0] == 400
+    assert call('POST', '/v1/batch/score', {'assessments': [1]})[0] == 400
+
+
+def test_batch_score_limit(monkeypatch):
+    monkeypatch.setattr(api, 'MAX_BATCH_SCORE', 2)
+    status, payload = call('POST', '/v1/batch/score', {'assessments': [{'responses': [0] * 9}] * 3})
+    assert status == 400 and 'At most 2' in payload['error']
+
+
+def test_analysis(stub_service):
+    status, payload = call('POST', '/v1/analysis', {'responses': [1] * 9}, headers=[(b'x-client-id', b'c1')])
+    assert status == 200
+    assert payload['total_score'] == 9 and payload['severity'] == 'mild'
+    assert payload['analysis'].startswith('[stub analysis') and payload['warning'] is None
+    assert call('POST', '/v1/analysis', {'responses': [1] * 9, 'language': {'a': 1}})[0] == 400
+
+    status, payload = call('POST', '/v1/batch/analysis', {'assessments': [
+        {'responses': [1] * 9}, {'responses': [2] * 9, 'language': 'French'}]})
+    assert status == 200 and payload['count'] == 2
+    assert [r['total_score'] for r in payload['results']] == [9, 18]
+
+    status, metrics = call('GET', '/v1/metrics')
+    assert status == 200 and metrics['cache']['hits'] == 1 and metrics['backend']['name'] == 'stub'
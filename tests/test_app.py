@@ -0,0 +1,85 @@
+import os
+import time
+
+import pytest
+
+streamlit = pytest.importorskip('streamlit')
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.delenv('PHQ9_SHARED_STATE', raising=False)
+    monkeypatch.setenv('PHQ9_STORAGE_BACKEND', 'none')
+    monkeypatch.setenv('PHQ9_ANALYSIS_BACKEND', 'stub')
+    monkeypatch.setenv('PHQ9_AI_BATCH_SIZE', '1')
+    monkeypatch.setenv('PHQ9_QUESTIONNAIRE_MODE', 'form')
+
+    def start(latency, wait=60):
+        monkeypatch.setenv('PHQ9_STUB_LATENCY_SECONDS', str(latency))
+        monkeypatch.setenv('PHQ9_AI_WAIT_SECONDS', str(wait))
+        streamlit.cache_resource.clear()
+        at = AppTest.from_file(APP, default_timeout=30).run()
+        at.button(key='start_assessment').click().run()
+        for i in range(9):
+            at.radio(key=f'form_question_{i}').set_value(1)
+        started = time.monotonic()
+        at.button(key='form_submit_btn').click().run()
+        return at, time.monotonic() - started
+    return start
+
+
+def markdown(at):
+    return '\n'.join(element.value for element in at.markdown)
+
+
+def captions(at):
+    return [element.value for element in at.caption]
+
+
+def test_results_page_does_not_wait_for_the_analysis(app):
+    at, elapsed = app(latency=3)
+    assert not at.exception
+    assert at.session_state.current_page == 'results'
+    assert elapsed < 2
+    assert any('analyzing' in caption for caption in captions(at))
+    assert '[stub analysis' not in markdown(at)
+
+    # The buttons answer straight away while the analysis is still running
+    started = time.monotonic()
+    at.button(key='home_btn').click().run()
+    assert time.monotonic() - started < 2
+    assert at.session_state.current_page == 'home'
+
+
+def test_finished_analysis_replaces_the_pending_card(app):
+    at, _ = app(latency=0.3)
+    deadline = time.monotonic() + 10
+    while not at.session_state.ai_job['future'].done() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    at.run()
+    assert '[stub analysis' in markdown(at)
+    assert not any('analyzing' in caption for caption in captions(at))
+
+
+def test_fallback_once_the_wait_runs_out(app):
+    at, _ = app(latency=5, wait=0.2)
+    time.sleep(0.3)
+    at.run()
+    assert not at.exception
+    assert any('taking longer' in warning.value for warning in at.warning)
+    assert not any('analyzing' in caption for caption in captions(at))
+    assert '[stub analysis' not in markdown(at)
+
+
+def test_results_page_analysis_is_traced(app, monkeypatch):
+    from tracing import tracer
+    monkeypatch.setattr(tracer, 'enabled', True)
+    tracer.reset()
+    at, _ = app(latency=0)
+    at.session_state.ai_job['future'].result(10)
+    spans = {row['labels'] for row in tracer.summaries() if row['metric'] == 'span_seconds'}
+    assert {'span=ai_analysis', 'span=show_results'} <= spans
+    tracer.reset()
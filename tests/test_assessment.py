@@ -0,0 +1,54 @@
+import pickle
+
+import pytest
+
+from assessment import Assessment, pack_responses, unpack_responses
+
+
+@pytest.fixture(params=['English', 'Yorùbá', ''])
+def assessment(request):
+    return Assessment.from_responses({0: 3, 1: 0, 2: 1, 3: 2, 4: 3, 5: 0, 6: 1, 7: 2, 8: 1},
+                                     request.param, timestamp=1700000000.25)
+
+
+def test_bytes_round_trip(assessment):
+    data = assessment.to_bytes()
+    assert len(data) == 13 + len(assessment.language.encode('utf-8'))
+    restored = Assessment.from_bytes(data)
+    assert restored == assessment
+    assert (restored.answers, restored.total_score, restored.severity) == (
+        assessment.answers, assessment.total_score, assessment.severity)
+
+
+def test_english_record_is_20_bytes():
+    assert len(Assessment.from_responses({i: 3 for i in range(9)}, 'English').to_bytes()) == 20
+
+
+def test_pickle_and_json_round_trip(assessment):
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        assert pickle.loads(pickle.dumps(assessment, protocol)) == assessment
+    assert Assessment.from_json(assessment.to_json()) == assessment
+    assert hash(Assessment.from_json(assessment.to_json())) == hash(assessment)
+
+
+def test_fields(assessment):
+    assert assessment.answers == (3, 0, 1, 2, 3, 0, 1, 2, 1)
+    assert assessment.total_score == 13
+    assert assessment.severity == 'moderate'
+    assert assessment.item9_positive
+    assert assessment.responses == dict(enumerate(assessment.answers))
+
+
+def test_is_frozen(assessment):
+    with pytest.raises(AttributeError):
+        assessment.total_score = 0
+    with pytest.raises(AttributeError):
+        del assessment.language
+
+
+def test_rejects_out_of_range_answers():
+    with pytest.raises(ValueError):
+        pack_responses({i: 4 if i == 8 else 0 for i in range(9)})
+    with pytest.raises(ValueError):
+        Assessment(1 << 18, 'English')
+    assert unpack_responses(pack_responses({i: i % 4 for i in range(9)})) == tuple(i % 4 for i in range(9))
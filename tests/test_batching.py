@@ -0,0 +1,220 @@
+import json
+import threading
+import time
+
+import pytest
+
+from analysis_backends import AnalysisBackend, BatchedBackend, ModelResponse, combine_prompts, parse_batch_response
+from batching import MicroBatcher
+from ratelimit import AdmissionRejectedError
+
+
+class Recorder:
+    """Batch function that records its batches and can hold them"""
+
+    def __init__(self, results=None):
+        self.batches = []
+        self.hold = threading.Event()
+        self.hold.set()
+        self.running = threading.Event()
+        self.results = results
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        self.running.set()
+        self.hold.wait(5)
+        return self.results(items) if self.results else [item * 10 for item in items]
+
+
+def test_full_batch_dispatches_without_waiting_for_the_window():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_batch=4, window=5.0)
+    started = time.monotonic()
+    futures = [batcher.submit(i) for i in range(4)]
+    assert [future.result(2) for future in futures] == [0, 10, 20, 30]
+    assert time.monotonic() - started < 2
+    assert fn.batches == [[0, 1, 2, 3]]
+    batcher.close()
+
+
+def test_window_closes_a_partial_batch():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_batch=100, window=0.05)
+    futures = [batcher.submit(i) for i in range(3)]
+    assert [future.result(2) for future in futures] == [0, 10, 20]
+    assert fn.batches == [[0, 1, 2]]
+    assert batcher.stats()['mean_batch_size'] == 3
+    batcher.close()
+
+
+def test_exceptions_fail_only_their_own_item():
+    error = ValueError("bad item")
+    batcher = MicroBatcher(Recorder(lambda items: [error if item == 1 else item for item in items]),
+                           max_batch=3, window=1.0)
+    futures = [batcher.submit(i) for i in range(3)]
+    assert futures[0].result(2) == 0
+    assert futures[1].exception(2) is error
+    assert futures[2].result(2) == 2
+    batcher.close()
+
+
+def test_failed_or_short_batch_fails_every_item():
+    def fail(items):
+        raise RuntimeError("provider down")
+
+    batcher = MicroBatcher(fail, max_batch=2, window=1.0)
+    futures = [batcher.submit(i) for i in range(2)]
+    assert all(isinstance(future.exception(2), RuntimeError) for future in futures)
+    batcher.close()
+
+    batcher = MicroBatcher(lambda items: items[:1], max_batch=2, window=1.0)
+    futures = [batcher.submit(i) for i in range(2)]
+    assert all(isinstance(future.exception(2), ValueError) for future in futures)
+    batcher.close()
+
+
+def test_cancelled_items_are_left_out():
+    fn = Recorder()
+    fn.hold.clear()
+    batcher = MicroBatcher(fn, max_batch=8, window=0.01)
+    first = batcher.submit('first')
+    assert fn.running.wait(2)
+    # The only slot is busy, so these stay queued
+    abandoned = batcher.submit('abandoned')
+    kept = batcher.submit('kept')
+    assert abandoned.cancel()
+    fn.hold.set()
+    assert first.result(2) == 'first' * 10
+    assert kept.result(2) == 'kept' * 10
+    assert fn.batches == [['first'], ['kept']]
+    assert batcher.stats()['items'] == 2
+    batcher.close()
+
+
+def test_concurrent_batches_and_growth_under_load():
+    fn = Recorder()
+    fn.hold.clear()
+    batcher = MicroBatcher(fn, max_batch=4, window=0.01, concurrency=2)
+    futures = [batcher.submit(0)]
+    assert fn.running.wait(2)
+    futures.append(batcher.submit(1))
+    deadline = time.monotonic() + 2
+    while len(fn.batches) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert fn.batches == [[0], [1]]
+    # Both slots busy: new items pile up into one full batch
+    futures.extend(batcher.submit(i) for i in range(2, 6))
+    time.sleep(0.1)
+    fn.hold.set()
+    assert [future.result(2) for future in futures] == [i * 10 for i in range(6)]
+    assert fn.batches[2] == [2, 3, 4, 5]
+    batcher.close()
+
+
+def test_close_runs_queued_items_then_stops():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_batch=8, window=0.5)
+    futures = [batcher.submit(i) for i in range(3)]
+    batcher.close()
+    assert all(future.done() for future in futures)
+    assert [future.result() for future in futures] == [0, 10, 20]
+    assert batcher._thread is None
+    # A later submit starts a fresh dispatcher
+    assert batcher.submit(7).result(2) == 70
+    batcher.close()
+
+
+def test_invalid_sizes_are_rejected():
+    with pytest.raises(ValueError):
+        MicroBatcher(Recorder(), max_batch=0)
+    with pytest.raises(ValueError):
+        MicroBatcher(Recorder(), concurrency=0)
+
+
+def reply(*entries):
+    return json.dumps([{'id': request_id, 'answer': answer} for request_id, answer in entries])
+
+
+def test_parse_places_answers_by_echoed_id():
+    assert parse_batch_response(reply((2, 'second'), (1, 'first'), (3, 'third')), 3) == ['first', 'second', 'third']
+    assert parse_batch_response(reply(('2', ' second '), (1, 'first')), 2) == ['first', 'second']
+
+
+def test_parse_fenced_reply():
+    text = f"Here are the answers:\n```json\n{reply((1, 'a'), (2, 'b'))}\n```"
+    assert parse_batch_response(text, 2) == ['a', 'b']
+
+
+def test_parse_short_duplicate_and_unknown_ids_are_missing():
+    assert parse_batch_response(reply((1, 'a')), 3) == ['a', None, None]
+    assert parse_batch_response(reply((1, 'a'), (1, 'b'), (2, 'c')), 2) == [None, 'c']
+    assert parse_batch_response(reply((1, 'a'), (1, 'b'), (1, 'c')), 1) == [None]
+    assert parse_batch_response(reply((0, 'x'), (4, 'y'), (True, 'z'), (2, '  ')), 3) == [None, None, None]
+
+
+def test_parse_rejects_positional_and_malformed_replies():
+    # A bare list of strings says nothing about which answer is whose
+    assert parse_batch_response(json.dumps(['a', 'b']), 2) == [None, None]
+    assert parse_batch_response('[{"id": 1, "answer": "a"', 2) == [None, None]
+    assert parse_batch_response('no json here', 2) == [None, None]
+    assert parse_batch_response('{"id": 1, "answer": "a"}', 1) == [None]
+
+
+class ScriptedModel:
+    def __init__(self, replies):
+        self.replies = replies
+        self.prompts = []
+
+    def generate_content(self, prompt, stream=False, request_options=None, **kwargs):
+        self.prompts.append(prompt)
+        return ModelResponse(self.replies(prompt))
+
+
+class ScriptedBackend(AnalysisBackend):
+    name = 'scripted'
+    model_name = 'scripted-model'
+
+    def __init__(self, replies):
+        self.model = ScriptedModel(replies)
+
+    def get_model(self):
+        return self.model
+
+
+def single_answer(prompt):
+    return f'alone: {prompt}'
+
+
+def test_batched_backend_fans_reordered_answers_back_by_id():
+    def replies(prompt):
+        if '<request id=' not in prompt:
+            return single_answer(prompt)
+        # Reordered, with request 3 answered twice: 3 must be asked again alone
+        return reply((2, 'answer for b'), (3, 'one'), (1, 'answer for a'), (3, 'two'))
+
+    inner = ScriptedBackend(replies)
+    backend = BatchedBackend(inner, max_batch=3, window=1.0)
+    assert backend.generate_batch([('a', 5.0), ('b', 5.0), ('c', None)]) == [
+        'answer for a', 'answer for b', 'alone: c']
+    assert inner.model.prompts[0] == combine_prompts(['a', 'b', 'c'])
+    assert inner.model.prompts[1:] == ['c']
+
+
+def test_batched_backend_passes_a_single_prompt_through():
+    inner = ScriptedBackend(single_answer)
+    assert BatchedBackend(inner).generate_batch([('only', None)]) == ['alone: only']
+    assert inner.model.prompts == ['only']
+
+
+class Closed:
+    def admit(self, session_id=None, global_quota=True):
+        return False
+
+
+def test_batch_without_quota_is_rejected_without_calling_the_model():
+    inner = ScriptedBackend(single_answer)
+    backend = BatchedBackend(inner, max_batch=2, window=1.0, admission=Closed())
+    futures = [backend.batcher.submit((prompt, None)) for prompt in ('a', 'b')]
+    assert all(isinstance(future.exception(2), AdmissionRejectedError) for future in futures)
+    assert inner.model.prompts == []
+    backend.batcher.close()
@@ -0,0 +1,24 @@
+import pytest
+
+from content import TRANSLATIONS
+from fragments import LOCALIZED_FRAGMENTS, SHARED_FRAGMENTS, get_fragment
+
+
+@pytest.mark.parametrize('name', sorted(SHARED_FRAGMENTS))
+def test_untranslated_regions_are_cached_once_for_every_language(name):
+    english = get_fragment(name, 'English')
+    assert english.size == len(english.html.encode('utf-8'))
+    assert all(get_fragment(name, language) is english for language in TRANSLATIONS)
+
+
+def test_footer_is_rendered_per_language():
+    assert set(LOCALIZED_FRAGMENTS) == {'footer'}
+    for language in ('English', 'French'):
+        footer = get_fragment('footer', language)
+        assert TRANSLATIONS[language]['privacy_note'] in footer.html
+        assert get_fragment('footer', language) is footer
+
+
+def test_unknown_region():
+    with pytest.raises(KeyError):
+        get_fragment('sidebar', 'English')
@@ -0,0 +1,35 @@
+from ai_analysis import AnalysisService
+from analysis_backends import AnalysisBackend, ModelResponse, StubBackend
+from analysis_cache import AnalysisCache
+from prewarm import prewarm
+from resilience import CircuitBreaker
+
+
+class EmptyForFrench(AnalysisBackend):
+    name = 'scripted'
+    model_name = 'scripted'
+
+    def get_model(self):
+        return self
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        response = ModelResponse('' if 'French' in prompt else 'An analysis.')
+        return [response] if stream else response
+
+
+def vectors():
+    return [('English', {i: 1 for i in range(9)}, 5), ('French', {i: 2 for i in range(9)}, 3)]
+
+
+def test_prewarm_counts_and_skips_cached_entries():
+    service = AnalysisService(AnalysisCache(), StubBackend(), CircuitBreaker())
+    stats = prewarm(vectors(), service, workers=2)
+    assert (stats['warmed'], stats['cached'], stats['failed'], stats['covered_occurrences']) == (2, 0, 0, 8)
+    stats = prewarm(vectors(), service, workers=2)
+    assert (stats['warmed'], stats['cached'], stats['failed']) == (0, 2, 0)
+
+
+def test_empty_analysis_counts_as_failed():
+    service = AnalysisService(AnalysisCache(), EmptyForFrench(), CircuitBreaker())
+    stats = prewarm(vectors(), service, workers=2)
+    assert (stats['warmed'], stats['failed'], stats['covered_occurrences']) == (1, 1, 5)
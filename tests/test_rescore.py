@@ -0,0 +1,83 @@
+import json
+
+import pandas as pd
+import pytest
+
+from rescore import main, rescore, to_item_matrix
+from scoring import MISSING
+from storage import SQLiteResponseStore
+
+ITEMS = [f'q{i + 1}' for i in range(9)]
+
+
+def test_to_item_matrix_marks_blanks_fractions_and_junk_missing():
+    frame = pd.DataFrame([['2.5', '', 'x', '3', '1.0', '0', '7', '-1', '2']], columns=ITEMS, dtype=str)
+    assert to_item_matrix(frame, ITEMS).tolist() == [[MISSING, MISSING, MISSING, 3, 1, 0, 7, MISSING, 2]]
+
+
+def test_to_item_matrix_expands_jsonl_responses():
+    frame = pd.DataFrame({'responses': [[1] * 9, [0, 1, 2, 3, 0, 1, 2, 3, 0]]})
+    assert to_item_matrix(frame, ITEMS).tolist() == [[1] * 9, [0, 1, 2, 3, 0, 1, 2, 3, 0]]
+    with pytest.raises(ValueError):
+        to_item_matrix(pd.DataFrame({'q1': [1]}), ITEMS)
+
+
+def write_csv(path, rows):
+    pd.DataFrame([[f'r{i}'] + answers for i, answers in enumerate(rows)], columns=['id'] + ITEMS).to_csv(
+        path, index=False)
+
+
+def test_csv_rescore_bands_prorates_and_rejects(tmp_path):
+    source, target = tmp_path / 'in.csv', tmp_path / 'out.csv'
+    write_csv(source, [
+        [0, 1, 1, 1, 1, 0, 0, 0, 0],        # 4, minimal
+        [1, 1, 1, 1, 1, 0, 0, 0, 0],        # 5, mild
+        [2, 2, 2, 2, 2, 0, 0, 0, 0],        # 10, moderate
+        [3, 3, 3, 3, 3, 0, 0, 0, 0],        # 15, severe
+        [1, 1, 1, 1, '', 0, 0, 0, 0],       # 4 over 8 items prorates to 4.5, rounded up to mild
+        [1, 1, 1, '', '', 1, 1, 1, 0],      # 6 over 7 items prorates to 7.7
+        [2.5, 1, 1, 1, 1, 1, 1, 1, 1],      # a fraction is missing, not 2
+        [1, 1, 1, '', '', '', 1, 1, 1],     # too many missing
+    ])
+    assert rescore(str(source), str(target), id_column='id', chunk_size=3) == 8
+    scored = pd.read_csv(target, keep_default_na=False)
+    assert scored['id'].tolist() == [f'r{i}' for i in range(8)]
+    assert scored['total_score'].tolist() == [4, 5, 10, 15, 5, 8, 9, -1]
+    assert scored['severity'].tolist() == ['minimal', 'mild', 'moderate', 'severe', 'mild', 'mild', 'mild', '']
+    assert scored['missing_items'].tolist() == [0, 0, 0, 0, 1, 2, 1, 3]
+    assert scored['valid'].tolist() == [True] * 7 + [False]
+
+
+def test_jsonl_and_parquet_round_trip(tmp_path):
+    pytest.importorskip('pyarrow')
+    source, target = tmp_path / 'in.jsonl', tmp_path / 'out.parquet'
+    records = [{'timestamp': 't', 'language': 'English', 'responses': [3] * 9},
+               {'timestamp': 't', 'language': 'English', 'responses': [0] * 8 + [1]}]
+    source.write_text(''.join(json.dumps(record) + '\n' for record in records))
+    assert rescore(str(source), str(target)) == 2
+    scored = pd.read_parquet(target)
+    assert scored['total_score'].tolist() == [27, 1]
+    assert scored['item9_positive'].tolist() == [True, True]
+
+
+def test_sqlite_store_input(tmp_path):
+    path = str(tmp_path / 'responses.db')
+    store = SQLiteResponseStore(path)
+    store.write_batch([{'timestamp': '2024-01-01T00:00:00', 'language': 'English', 'responses': answers,
+                        'total_score': sum(answers), 'severity': 'n/a'}
+                       for answers in ([1] * 9, [2] * 9, [0] * 9)])
+    store.close()
+    target = tmp_path / 'out.jsonl'
+    assert main([path, '-o', str(target), '--id-column', 'id', '--chunk-size', '2']) == 0
+    scored = [json.loads(line) for line in target.read_text().splitlines()]
+    assert [(r['id'], r['total_score'], r['severity']) for r in scored] == [
+        (1, 9, 'mild'), (2, 18, 'severe'), (3, 0, 'minimal')]
+
+
+def test_max_missing_option(tmp_path):
+    source, target = tmp_path / 'in.csv', tmp_path / 'out.csv'
+    write_csv(source, [[1, 1, 1, '', '', '', 1, 1, 1]])
+    main([str(source), '-o', str(target), '--max-missing', '3'])
+    assert pd.read_csv(target)['total_score'].tolist() == [9]
+    with pytest.raises(SystemExit):
+        main([str(source), '--items', 'q1,q2'])
@@ -0,0 +1,231 @@
+import pytest
+
+from ai_analysis import AnalysisService
+from analysis_backends import AnalysisBackend, ModelResponse
+from analysis_cache import AnalysisCache
+from ratelimit import AdmissionController, AdmissionRejectedError, TokenBucket
+from resilience import (CircuitBreaker, CircuitOpenError, DeadlineExceededError, RetryPolicy, call_with_retries,
+                        is_provider_failure)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ServiceUnavailable(Exception):
+    """Stands in for google.api_core's 503, matched by name"""
+
+
+class ServerError(Exception):
+    pass
+
+
+class BadGateway(ServerError):
+    pass
+
+
+class InvalidArgument(Exception):
+    pass
+
+
+def fail(error):
+    def fn():
+        raise error
+    return fn
+
+
+def trip(breaker, error=None):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(Exception):
+            breaker.call(fail(error or ServiceUnavailable()))
+
+
+def test_provider_failures():
+    assert is_provider_failure(TimeoutError())
+    assert is_provider_failure(DeadlineExceededError())
+    assert is_provider_failure(ConnectionResetError())
+    assert is_provider_failure(ServiceUnavailable())
+    assert is_provider_failure(BadGateway())
+    assert not is_provider_failure(InvalidArgument())
+    assert not is_provider_failure(ValueError("response blocked by safety filters"))
+    assert not is_provider_failure(AdmissionRejectedError())
+
+
+def test_opens_after_consecutive_provider_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=Clock())
+    trip(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: 'never called')
+    snapshot = breaker.snapshot()
+    assert snapshot['trips'] == 1 and snapshot['failures'] == 3 and snapshot['rejected'] == 1
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=3, clock=Clock())
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            breaker.call(fail(TimeoutError()))
+    assert breaker.call(lambda: 'ok') == 'ok'
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            breaker.call(fail(TimeoutError()))
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.parametrize('error', [InvalidArgument(), ValueError('blocked'), AdmissionRejectedError()])
+def test_request_errors_never_open_the_circuit(error):
+    breaker = CircuitBreaker(failure_threshold=3, clock=Clock())
+    for _ in range(10):
+        with pytest.raises(type(error)):
+            breaker.call(fail(error))
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.snapshot()['ignored_errors'] == 10
+    assert breaker.snapshot()['failures'] == 0
+
+
+def test_request_errors_do_not_hide_provider_failures():
+    breaker = CircuitBreaker(failure_threshold=3, clock=Clock())
+    for error in (TimeoutError(), InvalidArgument(), TimeoutError(), InvalidArgument(), TimeoutError()):
+        with pytest.raises(Exception):
+            breaker.call(fail(error))
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_trial_success_closes():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    trip(breaker)
+    clock.now = 29
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now = 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    # Only one trial at a time
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.call(lambda: 'ok') == 'ok'
+
+
+def test_half_open_trial_failure_reopens():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    trip(breaker)
+    clock.now = 30
+    with pytest.raises(ServiceUnavailable):
+        breaker.call(fail(ServiceUnavailable()))
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.snapshot()['trips'] == 2
+    clock.now = 59
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: 'too early')
+    clock.now = 60
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_trial_with_request_error_frees_the_trial():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    trip(breaker)
+    clock.now = 30
+    with pytest.raises(InvalidArgument):
+        breaker.call(fail(InvalidArgument()))
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_retries_only_retryable_errors():
+    policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+    attempts = []
+
+    def flaky(timeout):
+        attempts.append(timeout)
+        if len(attempts) < 3:
+            raise ServiceUnavailable()
+        return 'ok'
+
+    assert call_with_retries(flaky, policy, sleep=lambda _: None) == 'ok'
+    assert len(attempts) == 3
+
+    attempts.clear()
+
+    def rejected(timeout):
+        attempts.append(timeout)
+        raise InvalidArgument()
+
+    with pytest.raises(InvalidArgument):
+        call_with_retries(rejected, policy, sleep=lambda _: None)
+    assert len(attempts) == 1
+
+
+def test_before_retry_runs_before_every_retry_only():
+    policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+    events = []
+
+    def flaky(timeout):
+        events.append('call')
+        raise ServiceUnavailable()
+
+    with pytest.raises(ServiceUnavailable):
+        call_with_retries(flaky, policy, sleep=lambda _: None, before_retry=lambda: events.append('token'))
+    assert events == ['call', 'token', 'call', 'token', 'call']
+
+    def no_quota():
+        raise AdmissionRejectedError()
+
+    events.clear()
+    with pytest.raises(AdmissionRejectedError):
+        call_with_retries(flaky, policy, sleep=lambda _: None, before_retry=no_quota)
+    assert events == ['call']
+
+
+class ResourceExhausted(Exception):
+    """Stands in for google.api_core's 429, matched by name"""
+
+
+class RateLimited(AnalysisBackend):
+    name = 'gemini'
+    model_name = 'scripted'
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def get_model(self):
+        return self
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ResourceExhausted()
+        return ModelResponse('An analysis.')
+
+
+def service_with_tokens(backend, tokens):
+    admission = AdmissionController(TokenBucket(rate=0.001, burst=tokens), max_wait=0)
+    policy = RetryPolicy(max_attempts=5, base_delay=0, max_delay=0)
+    return AnalysisService(AnalysisCache(), backend, CircuitBreaker(), retry_policy=lambda: policy,
+                           admission=admission)
+
+
+def test_retries_take_admission_tokens():
+    backend = RateLimited(failures=2)
+    analysis, warning = service_with_tokens(backend, tokens=3).analyze({i: 1 for i in range(9)}, 9, 'English')
+    assert (analysis, warning) == ('An analysis.', None)
+    assert backend.calls == 3
+
+    # Two tokens pay for the first attempt and one retry; the next retry is not admitted
+    backend = RateLimited(failures=5)
+    service = service_with_tokens(backend, tokens=2)
+    analysis, warning = service.analyze({i: 1 for i in range(9)}, 9, 'English')
+    assert 'busy' in warning
+    assert backend.calls == 2
+    assert service.admission.stats()['admitted'] == 2
+    assert service.admission.stats()['rejected_global'] == 1
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from scoring import MISSING, NUM_ITEMS, SEVERITY_LEVELS, get_severity_level, score_matrix, severity_names
+
+
+def row(total, missing=0):
+    """An answer vector with the given raw total spread over the answered items"""
+    answers = [MISSING] * missing + [0] * (NUM_ITEMS - missing)
+    for i in range(missing, NUM_ITEMS):
+        answers[i] = min(3, total)
+        total -= answers[i]
+    assert total == 0
+    return answers
+
+
+@pytest.mark.parametrize('total, band', [(0, 'minimal'), (4, 'minimal'), (5, 'mild'), (9, 'mild'),
+                                         (10, 'moderate'), (14, 'moderate'), (15, 'severe'), (27, 'severe')])
+def test_bands_at_each_threshold(total, band):
+    result = score_matrix(np.array([row(total)], dtype=np.int8))
+    assert result['total_score'].tolist() == [total]
+    assert severity_names(result['severity']).tolist() == [band]
+    assert get_severity_level(total) == band
+
+
+def test_matches_get_severity_level_for_every_total():
+    result = score_matrix(np.array([row(total) for total in range(28)], dtype=np.int8))
+    assert result['total_score'].tolist() == list(range(28))
+    assert [SEVERITY_LEVELS[code] for code in result['severity']] == [get_severity_level(t) for t in range(28)]
+    assert result['valid'].all() and not result['missing_items'].any()
+
+
+@pytest.mark.parametrize('raw, missing, total, band', [
+    (4, 1, 5, 'mild'),          # 4.5 rounds up, not to the even 4
+    (12, 1, 14, 'moderate'),    # 13.5
+    (8, 1, 9, 'mild'),          # 9.0
+    (3, 2, 4, 'minimal'),       # 3.86
+    (7, 2, 9, 'mild'),          # 9.0
+    (10, 2, 13, 'moderate'),    # 12.86
+    (21, 2, 27, 'severe'),
+])
+def test_prorates_one_or_two_missing_items(raw, missing, total, band):
+    result = score_matrix(np.array([row(raw, missing)], dtype=np.int8))
+    assert result['total_score'].tolist() == [total]
+    assert severity_names(result['severity']).tolist() == [band]
+    assert result['missing_items'].tolist() == [missing]
+    assert result['valid'].tolist() == [True]
+
+
+def test_rejects_rows_with_too_many_missing_items():
+    items = np.array([row(6, 3), row(0, 9), row(6, 2)], dtype=np.int8)
+    result = score_matrix(items)
+    assert result['valid'].tolist() == [False, False, True]
+    assert result['total_score'].tolist() == [-1, -1, 8]
+    assert severity_names(result['severity']).tolist() == ['', '', 'mild']
+    assert score_matrix(items, max_missing=3)['valid'].tolist() == [True, False, True]
+    assert score_matrix(items, max_missing=0)['valid'].tolist() == [False, False, False]
+
+
+def test_out_of_range_answers_count_as_missing():
+    items = np.array([[4, 1, 1, 1, 1, 1, 1, 1, 1], [-5, 1, 1, 1, 1, 1, 1, 1, 1]], dtype=np.int8)
+    result = score_matrix(items)
+    assert result['missing_items'].tolist() == [1, 1]
+    assert result['total_score'].tolist() == [9, 9]
+
+
+def test_item9_flag():
+    items = np.array([row(0), [0] * 8 + [1], [1] * 8 + [MISSING]], dtype=np.int8)
+    assert score_matrix(items)['item9_positive'].tolist() == [False, True, False]
+
+
+def test_rejects_wrong_shape():
+    with pytest.raises(ValueError):
+        score_matrix(np.zeros((2, 8), dtype=np.int8))
+    with pytest.raises(ValueError):
+        score_matrix(np.zeros(9, dtype=np.int8))
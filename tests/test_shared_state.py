@@ -0,0 +1,118 @@
+import json
+import os
+import time
+
+import pytest
+
+from shared_state import RedisBackend, SQLiteBackend, issue_resume_token, redeem_resume_token
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def backend(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteBackend(str(tmp_path / 'shared'))
+    fakeredis = pytest.importorskip('fakeredis')
+    return RedisBackend('redis://test', client=fakeredis.FakeRedis(decode_responses=True))
+
+
+def test_session_store_round_trip_and_expiry(backend):
+    store = backend.session_store()
+    store.save('a', '{"page": "home"}', ttl=60)
+    store.save('b', 'short-lived', ttl=0.05)
+    assert store.load('a') == '{"page": "home"}'
+    assert store.load('missing') is None
+    time.sleep(0.1)
+    assert store.load('b') is None
+
+
+def test_session_store_take_is_single_use(backend):
+    store = backend.session_store()
+    store.save('a', 'value', ttl=60)
+    assert store.take('a') == 'value'
+    assert store.take('a') is None
+    assert store.load('a') is None
+
+
+def test_resume_tokens(backend):
+    store = backend.session_store()
+    token = issue_resume_token(store, 'session-1', ttl=60)
+    other = issue_resume_token(store, 'session-1', ttl=60)
+    assert token != other and 'session-1' not in token
+    assert redeem_resume_token(store, token) == 'session-1'
+    assert redeem_resume_token(store, token) is None
+    assert redeem_resume_token(store, 'made-up') is None
+
+    expiring = issue_resume_token(store, 'session-2', ttl=0.05)
+    assert issue_resume_token(store, 'session-2', ttl=60, token=expiring) == expiring
+    time.sleep(0.1)
+    assert redeem_resume_token(store, expiring) == 'session-2'
+
+
+def test_cache_tier(backend):
+    tier = backend.cache_tier(max_entries=100, ttl=None)
+    assert tier.get('key') is None
+    tier.set('key', 'analysis')
+    assert tier.get('key') == 'analysis'
+
+
+def test_token_bucket_is_shared(backend):
+    first = backend.token_bucket(rate=0.001, burst=2)
+    second = backend.token_bucket(rate=0.001, burst=2)
+    assert first.reserve(0.0) == 0
+    assert second.reserve(0.0) == 0
+    assert first.reserve(0.0) is None
+
+
+def test_response_store(backend):
+    store = backend.response_store()
+    record = {'timestamp': '2024-01-01T00:00:00', 'language': 'English', 'responses': [1] * 9,
+              'total_score': 9, 'severity': 'mild'}
+    store.write_batch([record, record])
+    if backend.name == 'redis':
+        assert [json.loads(r) for r in backend.client.lrange('phq9:responses', 0, -1)] == [record, record]
+    else:
+        from analytics import load_summary
+        assert load_summary(backend.responses_path)['assessments'] == 2
+    store.close()
+
+
+def test_app_resumes_session_from_url_token(tmp_path, monkeypatch):
+    streamlit = pytest.importorskip('streamlit')
+    from streamlit.testing.v1 import AppTest
+
+    monkeypatch.setenv('PHQ9_SHARED_STATE', f'sqlite://{tmp_path}/shared')
+    monkeypatch.setenv('PHQ9_STICKY_SESSIONS', '0')
+    monkeypatch.setenv('PHQ9_STORAGE_BACKEND', 'none')
+    monkeypatch.setenv('PHQ9_ANALYSIS_BACKEND', 'stub')
+    monkeypatch.setenv('PHQ9_QUESTIONNAIRE_MODE', 'paged')
+    streamlit.cache_resource.clear()
+
+    first = AppTest.from_file(APP, default_timeout=60).run()
+    token = first.query_params['resume']
+    assert 'sid' not in first.query_params
+    assert first.session_state.session_id not in token
+    first.button(key='start_assessment').click().run()
+    for i in range(3):
+        first.radio(key=f'question_{i}').set_value(2).run()
+        first.button(key='next_btn').click().run()
+
+    # A reconnect, possibly to another worker, presents the URL's token
+    second = AppTest.from_file(APP, default_timeout=60)
+    second.query_params['resume'] = token
+    second.run()
+    assert not second.exception
+    assert second.session_state.session_id == first.session_state.session_id
+    assert second.session_state.current_page == 'questionnaire'
+    assert second.session_state.current_question == 3
+    assert {i: second.session_state.responses[i] for i in range(3)} == {0: 2, 1: 2, 2: 2}
+    new_token = second.query_params['resume']
+    assert new_token != token
+
+    # The old link is used up
+    third = AppTest.from_file(APP, default_timeout=60)
+    third.query_params['resume'] = token
+    third.run()
+    assert third.session_state.session_id != first.session_state.session_id
+    assert third.session_state.current_page == 'home'
@@ -0,0 +1,65 @@
+import logging
+import threading
+
+import pytest
+
+from storage import BatchingWriter, JSONLResponseStore, ResponseStore
+
+
+def record(score=1):
+    return {'timestamp': '2024-01-01T00:00:00', 'language': 'English', 'responses': [score] * 9,
+            'total_score': 9 * score, 'severity': 'mild'}
+
+
+class SlowStore(ResponseStore):
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.records = []
+        self.closed = False
+
+    def write_batch(self, records):
+        self.started.set()
+        self.release.wait(5)
+        if self.closed:
+            raise RuntimeError("write on a closed store")
+        self.records.extend(records)
+
+    def close(self):
+        self.closed = True
+
+
+def test_response_store_is_abstract():
+    with pytest.raises(TypeError):
+        ResponseStore()
+
+
+def test_writer_flushes_in_batches(tmp_path):
+    store = JSONLResponseStore(str(tmp_path / 'responses.jsonl'))
+    writer = BatchingWriter(store, batch_size=10, flush_interval=0.01)
+    for _ in range(25):
+        assert writer.submit(record())
+    assert writer.flush(timeout=5)
+    metrics = writer.metrics()
+    assert metrics['written'] == 25 and metrics['pending'] == 0
+    writer.close()
+    assert len((tmp_path / 'responses.jsonl').read_text().splitlines()) == 25
+
+
+def test_close_leaves_store_open_while_a_batch_is_being_written(caplog):
+    store = SlowStore()
+    writer = BatchingWriter(store, batch_size=10, flush_interval=0.01)
+    writer.submit(record())
+    writer.submit(record())
+    assert store.started.wait(5)
+
+    with caplog.at_level(logging.WARNING, logger='storage'):
+        writer.close(timeout=0.05)
+    assert not store.closed
+    assert writer.metrics()['pending'] == 2
+    assert '2 records not yet written' in caplog.text
+
+    store.release.set()
+    assert writer.flush(timeout=5)
+    assert len(store.records) == 2
+    assert writer.metrics()['failed_batches'] == 0
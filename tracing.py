@@ -0,0 +1,223 @@
+"""Lightweight timing and counters for the hot paths.
+
+Spans (``with tracer.span('name')`` or ``@traced()``) record wall time into
+per-name summaries; ``observe`` and ``count`` record sizes and events. Each
+summary keeps a count, a sum and a window of recent samples for percentiles.
+
+Tracing is off unless PHQ9_TRACING=1. When off, ``span`` returns a shared
+no-op context manager and ``traced`` functions call straight through, so the
+cost is one attribute check per call.
+
+Metrics render as Prometheus text (``render_prometheus``), served by the API
+at /metrics, and FileExporter rewrites the same text to a file periodically
+for node_exporter's textfile collector or anything else that tails files.
+"""
+
+import contextlib
+import functools
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+_NOOP = contextlib.nullcontext()
+
+
+class Summary:
+    """Count, sum and a sliding window of samples for percentiles"""
+
+    __slots__ = ('count', 'total', 'samples')
+
+    def __init__(self, window: int):
+        self.count = 0
+        self.total = 0.0
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def quantiles(self, quantiles=QUANTILES) -> Dict[float, float]:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: math.nan for q in quantiles}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in quantiles}
+
+
+def _labels(labels: Dict[str, object]) -> LabelSet:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: LabelSet, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+
+class Tracer:
+    """Process-wide store of summaries and counters"""
+
+    def __init__(self, enabled: bool = False, window: int = 1024, prefix: str = 'phq9_'):
+        self.enabled = enabled
+        self.window = window
+        self.prefix = prefix
+        self._summaries: Dict[Tuple[str, LabelSet], Summary] = {}
+        self._counters: Dict[Tuple[str, LabelSet], float] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'Tracer':
+        return cls(enabled=os.getenv('PHQ9_TRACING', '0') == '1',
+                   window=int(os.getenv('PHQ9_TRACING_WINDOW', '1024')))
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one sample of a summary metric (seconds, characters, ...)"""
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = Summary(self.window)
+            summary.observe(value)
+
+    def count(self, name: str, amount: float = 1, **labels):
+        """Increment a counter"""
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextlib.contextmanager
+    def _span(self, name: str, labels: Dict[str, object]):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('span_seconds', time.perf_counter() - start, span=name, **labels)
+
+    def span(self, name: str, **labels):
+        """Context manager timing a block as span_seconds{span=name}"""
+        if not self.enabled:
+            return _NOOP
+        return self._span(name, labels)
+
+    def traced(self, name: Optional[str] = None):
+        """Decorator timing every call of a function as a span"""
+        def decorate(fn: Callable) -> Callable:
+            span_name = name or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with self._span(span_name, {}):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def reset(self):
+        with self._lock:
+            self._summaries.clear()
+            self._counters.clear()
+
+    def summaries(self) -> List[Dict[str, object]]:
+        """One row per summary with count, mean and percentiles, for display"""
+        with self._lock:
+            items = [(name, labels, summary.count, summary.total, summary.quantiles())
+                     for (name, labels), summary in self._summaries.items()]
+        rows = []
+        for name, labels, count, total, quantiles in sorted(items, key=lambda item: (item[0], item[1])):
+            row = {'metric': name, 'labels': ', '.join(f'{k}={v}' for k, v in labels), 'count': count,
+                   'mean': total / count if count else math.nan}
+            row.update({f'p{int(q * 100)}': value for q, value in quantiles.items()})
+            rows.append(row)
+        return rows
+
+    def counters(self) -> List[Dict[str, object]]:
+        with self._lock:
+            items = sorted(self._counters.items())
+        return [{'metric': name, 'labels': ', '.join(f'{k}={v}' for k, v in labels), 'value': value}
+                for (name, labels), value in items]
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            summaries = [(name, labels, summary.count, summary.total, summary.quantiles())
+                         for (name, labels), summary in self._summaries.items()]
+            counters = list(self._counters.items())
+        lines = []
+        seen = set()
+        for name, labels, count, total, quantiles in sorted(summaries, key=lambda item: (item[0], item[1])):
+            metric = self.prefix + name
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f'# TYPE {metric} summary')
+            for q, value in quantiles.items():
+                lines.append(f'{metric}{_format_labels(labels, (("quantile", str(q)),))} {value}')
+            lines.append(f'{metric}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{metric}_count{_format_labels(labels)} {count}')
+        for (name, labels), value in sorted(counters):
+            metric = self.prefix + name + '_total'
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric}{_format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+class FileExporter:
+    """Rewrites a file with the current metrics every ``interval`` seconds"""
+
+    def __init__(self, tracer: Tracer, path: str, interval: float = 15.0):
+        self.tracer = tracer
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='phq9-metrics-exporter', daemon=True)
+        self._thread.start()
+
+    def export(self):
+        # Write then rename, so readers never see a half-written file
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.tracer.render_prometheus())
+        os.replace(tmp_path, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.export()
+            except OSError:
+                logger.exception("Could not write metrics to %s", self.path)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=self.interval)
+        self.export()
+
+
+def file_exporter_from_env(tracer: 'Tracer') -> Optional[FileExporter]:
+    """Start a FileExporter if PHQ9_METRICS_FILE is set"""
+    path = os.getenv('PHQ9_METRICS_FILE')
+    if not path:
+        return None
+    return FileExporter(tracer, path, float(os.getenv('PHQ9_METRICS_FILE_INTERVAL', '15')))
+
+
+tracer = Tracer.from_env()
+span = tracer.span
+traced = tracer.traced